@@ -8,7 +8,7 @@ from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
 from . import models
-from .notification_service import NotificationService
+from .notification_service import NotificationService, invalidate_recipient_cache
 import json
 import logging
 from enum import Enum
@@ -155,6 +155,7 @@ class AdminService:
             old_role = user.role
             user.role = new_role
             self.db.commit()
+            invalidate_recipient_cache()
             
             # Create audit log
             self._create_audit_log(
@@ -5,7 +5,7 @@ import asyncio
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
-from app.notification_service import get_notification_service
+from app.notification_service import get_notification_service, drain_email_queue
 from app import models
 import logging
 
@@ -34,6 +34,7 @@ class BackgroundTaskManager:
     async def stop_periodic_tasks(self):
         """Stop all periodic tasks"""
         self.running = False
+        await drain_email_queue()
     
     async def daily_application_summary(self):
         """Send daily application summary to HR at 9 AM"""
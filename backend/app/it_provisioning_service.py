@@ -7,8 +7,10 @@ import secrets
 import string
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from . import models
+from .database import transactional
 import hashlib
 import json
 
@@ -17,6 +19,7 @@ class ITProvisioningService:
     def __init__(self, db: Session):
         self.db = db
     
+    @transactional
     def provision_all_resources(
         self, 
         employee_id: int, 
@@ -49,10 +52,14 @@ class ITProvisioningService:
         if floor_access is None:
             floor_access = [1, 2]  # Ground floor and first floor by default
         
+        # Each resource gets a savepoint so a failure only undoes that resource;
+        # everything is committed together at the end
+        
         # 1. Create company email
         if provision_email:
             try:
-                email_result = self._create_company_email(employee)
+                with self.db.begin_nested():
+                    email_result = self._create_company_email(employee)
                 results["provisioned_resources"]["email"] = email_result
                 self._log_action(employee_id, "email", email_result.get("id"), "created", "success")
             except Exception as e:
@@ -62,7 +69,8 @@ class ITProvisioningService:
         # 2. Create VPN credentials
         if provision_vpn:
             try:
-                vpn_result = self._create_vpn_credentials(employee)
+                with self.db.begin_nested():
+                    vpn_result = self._create_vpn_credentials(employee)
                 results["provisioned_resources"]["vpn"] = vpn_result
                 self._log_action(employee_id, "vpn", vpn_result.get("id"), "created", "success")
             except Exception as e:
@@ -72,7 +80,8 @@ class ITProvisioningService:
         # 3. Create access card
         if provision_access_card:
             try:
-                card_result = self._create_access_card(employee, access_level, building_access, floor_access)
+                with self.db.begin_nested():
+                    card_result = self._create_access_card(employee, access_level, building_access, floor_access)
                 results["provisioned_resources"]["access_card"] = card_result
                 self._log_action(employee_id, "access_card", card_result.get("id"), "created", "success")
             except Exception as e:
@@ -82,7 +91,8 @@ class ITProvisioningService:
         # 4. Assign assets (laptop, monitor, etc.)
         if assign_assets:
             try:
-                asset_results = self._assign_assets(employee)
+                with self.db.begin_nested():
+                    asset_results = self._assign_assets(employee)
                 results["provisioned_resources"]["assets"] = asset_results
                 for asset in asset_results:
                     self._log_action(employee_id, "asset", asset.get("id"), "assigned", "success")
@@ -123,8 +133,7 @@ class ITProvisioningService:
         )
         
         self.db.add(employee_email)
-        self.db.commit()
-        self.db.refresh(employee_email)
+        self.db.flush()  # Get the ID
         
         return {
             "id": employee_email.id,
@@ -168,8 +177,7 @@ class ITProvisioningService:
         )
         
         self.db.add(vpn_credential)
-        self.db.commit()
-        self.db.refresh(vpn_credential)
+        self.db.flush()  # Get the ID
         
         return {
             "id": vpn_credential.id,
@@ -208,8 +216,7 @@ class ITProvisioningService:
         )
         
         self.db.add(access_card)
-        self.db.commit()
-        self.db.refresh(access_card)
+        self.db.flush()  # Get the ID
         
         return {
             "id": access_card.id,
@@ -267,7 +274,7 @@ class ITProvisioningService:
                     "serial_number": new_asset.serial_number
                 })
         
-        self.db.commit()
+        self.db.flush()
         return assigned_assets
     
     def _log_action(
@@ -334,6 +341,13 @@ class ITProvisioningService:
         random_suffix = ''.join(secrets.choice(string.digits) for _ in range(4))
         return f"{prefix}-{timestamp}-{random_suffix}"
     
+    def has_email_and_vpn(self, employee_id: int) -> Tuple[bool, bool]:
+        """Whether the employee has a company email and VPN credentials, in one query"""
+        return self.db.query(
+            exists().where(models.EmployeeEmail.employee_id == employee_id),
+            exists().where(models.VPNCredential.employee_id == employee_id)
+        ).one()
+    
     def get_employee_it_resources(self, employee_id: int) -> Dict:
         """Get all IT resources for an employee"""
         employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Float, Text, JSON, Time, Numeric
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Float, Text, JSON, Time, Numeric, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -12,6 +12,14 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String, default="employee") # admin, hr, employee, candidate
 
+    employee = relationship("Employee", back_populates="user", uselist=False)
+    notification_preference = relationship("NotificationPreference", back_populates="user", uselist=False)
+
+    __table_args__ = (
+        # Active HR/manager/admin lookups for notification recipients
+        Index("idx_users_role_active", "role", "is_active", postgresql_where=(is_active == True)),
+    )
+
 class Job(Base):
     __tablename__ = "jobs"
 
@@ -77,6 +85,10 @@ class Application(Base):
     
     job = relationship("Job")
 
+    __table_args__ = (
+        Index("idx_applications_applied_date", "applied_date"),
+    )
+
 class Interview(Base):
     __tablename__ = "interviews"
 
@@ -235,8 +247,12 @@ class Employee(Base):
     onboarding_status = Column(String, default="initiated")  # initiated, manager_prep, it_setup, compliance, induction, completed
     it_setup_status = Column(String, default="pending")  # pending, ready
     
-    user = relationship("User")
+    user = relationship("User", back_populates="employee")
     documents = relationship("EmployeeDocument", back_populates="employee")
+    onboarding_approvals = relationship("OnboardingApproval", back_populates="employee")
+    it_tickets = relationship(
+        "ITProvisioningTicket", back_populates="employee", order_by="ITProvisioningTicket.id.desc()"
+    )
 
 class EmployeeDocument(Base):
     __tablename__ = "employee_documents"
@@ -339,6 +355,15 @@ class Payroll(Base):
     calculated_by_user = relationship("User", foreign_keys=[calculated_by])
     approved_by_user = relationship("User", foreign_keys=[approved_by])
 
+    __table_args__ = (
+        # One payroll per employee and month; target of the payroll upsert
+        Index("uq_payroll_employee_month", "employee_id", "month", unique=True),
+        # Approved payrolls for a month (bulk payslip distribution)
+        Index("idx_payroll_month_status", "month", "status"),
+        # Keyset pagination: ORDER BY month DESC, id DESC
+        Index("idx_payroll_month_id", "month", "id"),
+    )
+
 class SalaryStructure(Base):
     __tablename__ = "salary_structures"
     id = Column(Integer, primary_key=True, index=True)
@@ -464,6 +489,11 @@ class PerformanceReview(Base):
     employee = relationship("Employee")
     reviewer = relationship("User")
 
+    __table_args__ = (
+        # Performance scoring/trends: employee_id = ... AND review_date >= ...
+        Index("idx_performance_reviews_employee_date", "employee_id", "review_date"),
+    )
+
 class Survey(Base):
     __tablename__ = "surveys"
 
@@ -584,6 +614,11 @@ class Attendance(Base):
     wfh_request = relationship("WFHRequest", foreign_keys=[wfh_request_id])
     approver = relationship("User", foreign_keys=[approved_by])
 
+    __table_args__ = (
+        # Per-employee month ranges (payroll): employee_id = ... AND date >= ... AND date < ...
+        Index("idx_attendance_employee_date", "employee_id", "date"),
+    )
+
 class LeaveBalance(Base):
     __tablename__ = "leave_balances"
     id = Column(Integer, primary_key=True, index=True)
@@ -630,6 +665,11 @@ class Goal(Base):
     
     employee = relationship("Employee")
 
+    __table_args__ = (
+        # Goal counts per employee, completed ones answered from the index
+        Index("idx_goals_employee_status", "employee_id", "status"),
+    )
+
 # ============================================
 # ENGAGEMENT MODELS
 # ============================================
@@ -766,6 +806,11 @@ class Feedback(Base):
     employee = relationship("Employee")
     reviewer = relationship("User")
 
+    __table_args__ = (
+        # Performance scoring: employee_id = ... AND created_at >= ...
+        Index("idx_feedbacks_employee_created", "employee_id", "created_at"),
+    )
+
 # KPI and Advanced Performance Models
 class KPI(Base):
     __tablename__ = "kpis"
@@ -1329,7 +1374,7 @@ class NotificationPreference(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    user = relationship("User")
+    user = relationship("User", back_populates="notification_preference")
 
 class NotificationLog(Base):
     __tablename__ = "notification_logs"
@@ -1610,9 +1655,16 @@ class OnboardingApproval(Base):
     it_provisioning_status = Column(String, default="not_started")  # not_started, requested, in_progress, completed, failed
     compliance_approved_at = Column(DateTime, nullable=True)  # When compliance gate was passed
     
-    employee = relationship("Employee")
+    employee = relationship("Employee", back_populates="onboarding_approvals", lazy="selectin")
     reviewer = relationship("User")
 
+    __table_args__ = (
+        # One record per employee and stage; target of the get-or-create upsert
+        Index("uq_onboarding_approvals_employee_stage", "employee_id", "approval_stage", unique=True),
+        # HR review queue: WHERE approval_stage = ... AND status = 'pending'
+        Index("idx_onboarding_approvals_pending_stage", "approval_stage", postgresql_where=(status == "pending")),
+    )
+
 class ITProvisioningTicket(Base):
     __tablename__ = "it_provisioning_tickets"
     
@@ -1650,10 +1702,15 @@ class ITProvisioningTicket(Base):
     it_notes = Column(Text, nullable=True)
     employee_instructions = Column(Text, nullable=True)
     
-    employee = relationship("Employee")
+    employee = relationship("Employee", back_populates="it_tickets")
     approval = relationship("OnboardingApproval")
     assigned_it_admin = relationship("User")
 
+    __table_args__ = (
+        # Latest ticket per employee
+        Index("idx_it_tickets_employee_id", "employee_id", "id"),
+    )
+
 class OnboardingStatusLog(Base):
     __tablename__ = "onboarding_status_logs"
     
@@ -3,13 +3,31 @@ Multi-Channel Notification Service
 Supports: Email, SMS, WhatsApp
 """
 import os
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+import random
+import time
+import weakref
+from collections import namedtuple
+from typing import Optional, List, Dict, Any, Sequence, Set, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, joinedload
 from app import models
+from app.database import SessionLocal
+import orjson
 import smtplib
+from html import escape
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from itertools import groupby
+from operator import attrgetter
+
+logger = logging.getLogger(__name__)
 
 # ============================================
 # CONFIGURATION
@@ -22,6 +40,11 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@company.com")
 
+# Postmark batch API (optional; falls back to SMTP when unset)
+POSTMARK_SERVER_TOKEN = os.getenv("POSTMARK_SERVER_TOKEN", "")
+POSTMARK_BATCH_URL = "https://api.postmarkapp.com/email/batch"
+POSTMARK_BATCH_LIMIT = 500  # messages per request
+
 # Twilio Configuration (for SMS)
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
@@ -31,14 +54,439 @@ TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "")
 WHATSAPP_API_KEY = os.getenv("WHATSAPP_API_KEY", "")
 WHATSAPP_PHONE_NUMBER = os.getenv("WHATSAPP_PHONE_NUMBER", "")
 
+# Redis pub/sub for real-time in-app notifications (optional)
+REDIS_URL = os.getenv("REDIS_URL", "")
+REALTIME_CHANNEL = "notifications:{user_id}"
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Shared Redis client for real-time events, or None when not configured"""
+    global _redis_client
+    if _redis_client is None and REDIS_AVAILABLE and REDIS_URL:
+        _redis_client = aioredis.from_url(REDIS_URL)
+    return _redis_client
+
+# Notification log rows buffered inside a batch before they are written
+LOG_BUFFER_SIZE = 64
+
+# Detail lines per job in the daily application summary email
+SUMMARY_APPLICATIONS_PER_JOB = 20
+
+# HR/approver recipient lists are identical across bursts of events
+RECIPIENT_CACHE_TTL = 30  # seconds
+Recipient = namedtuple("Recipient", ["id", "email"])
+_recipient_cache: Dict[tuple, tuple] = {}  # roles -> (expires_at, recipients)
+_recipient_cache_version = 0  # bumped on invalidation
+
+
+def invalidate_recipient_cache():
+    """Drop cached recipient lists after a user's role or active flag changes"""
+    global _recipient_cache_version
+    _recipient_cache_version += 1
+    _recipient_cache.clear()
+
+# Upper bound on SMTP sessions open at once during fan-out, per event loop;
+# asyncio primitives can't be shared across loops, and payroll and asset
+# acknowledgment run their own loops next to the server's
+EMAIL_CONCURRENCY = 10
+_email_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _email_semaphore() -> asyncio.Semaphore:
+    """The SMTP concurrency limit for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _email_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _email_semaphores[loop] = asyncio.Semaphore(EMAIL_CONCURRENCY)
+    return semaphore
+
+# Upper bound on real-time publishes in flight during a bulk fan-out
+REALTIME_CONCURRENCY = 16
+
+# Placeholder swapped for the real recipient in a cached MIME payload
+_TO_PLACEHOLDER = b"__TO__"
+
+# Same header encoding as send_message(), with SMTP line endings
+_SMTP_POLICY = policy.compat32.clone(linesep="\r\n")
+
+# Retry policy for transient provider errors (429, 5xx, timeouts)
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5  # seconds
+RETRY_MAX_DELAY = 8.0  # seconds
+
+# ============================================
+# RETRIES
+# ============================================
+
+class TransientSendError(Exception):
+    """Provider rejected the request with a retryable status (429/5xx)"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Read a Retry-After header given in seconds"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Whether a failed send is worth retrying; auth/validation errors are not"""
+    
+    if isinstance(exc, TransientSendError):
+        return True
+    
+    # SMTP: dropped connections and 4xx replies are temporary, 5xx are permanent
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    
+    try:
+        import requests
+        if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+            return True
+    except ImportError:
+        pass
+    
+    # Twilio REST errors carry the HTTP status
+    status = getattr(exc, "status", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+async def _call_with_retry(func, *args, **kwargs):
+    """Run a blocking provider call in a thread, retrying transient failures
+    with full-jitter exponential backoff"""
+    
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        try:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        except Exception as exc:
+            if attempt == RETRY_MAX_ATTEMPTS - 1 or not _is_transient(exc):
+                raise
+            
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            retry_after = getattr(exc, "retry_after", None)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, RETRY_MAX_DELAY))
+            
+            logger.warning(
+                "Transient send failure (%s), retry %d/%d in %.2fs",
+                exc, attempt + 1, RETRY_MAX_ATTEMPTS - 1, delay
+            )
+            await asyncio.sleep(delay)
+
+async def _gather_bounded(coros, limit: int) -> list:
+    """asyncio.gather() with at most `limit` coroutines running at once"""
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run(coro):
+        async with semaphore:
+            return await coro
+    
+    return await asyncio.gather(*[run(coro) for coro in coros])
+
+# ============================================
+# MESSAGE BUILDING
+# ============================================
+
+def _has_address(to_email: Any) -> bool:
+    """Whether a recipient can go on the wire at all (users without an email have None)"""
+    return isinstance(to_email, str) and bool(to_email.strip())
+
+
+@lru_cache(maxsize=128)
+def _build_message(subject: str, body: str, html_body: Optional[str] = None) -> bytes:
+    """Serialise a MIME message once per (subject, body, html) with a placeholder recipient"""
+    
+    msg = MIMEMultipart('alternative')
+    msg['From'] = FROM_EMAIL
+    msg['To'] = _TO_PLACEHOLDER.decode()
+    msg['Subject'] = subject
+    
+    # Add plain text
+    msg.attach(MIMEText(body, 'plain'))
+    
+    # Add HTML if provided
+    if html_body:
+        msg.attach(MIMEText(html_body, 'html'))
+    
+    return msg.as_bytes(policy=_SMTP_POLICY)
+
+def _smtp_send(to_email: str, payload: bytes) -> None:
+    """Deliver a serialised message over a fresh SMTP session (blocking)"""
+    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+        server.starttls()
+        if SMTP_USERNAME and SMTP_PASSWORD:
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        server.sendmail(FROM_EMAIL, [to_email], payload)
+
+
+def _smtp_send_many(envelopes: List[Tuple[str, bytes]], delivered: Set[int]) -> Dict[int, str]:
+    """Deliver many serialised messages over one SMTP session (blocking)
+
+    Indexes already in ``delivered`` are skipped, so a retried call after a
+    dropped connection never re-sends. Returns per-message rejection errors.
+    """
+    failures = {}
+    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+        server.starttls()
+        if SMTP_USERNAME and SMTP_PASSWORD:
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        for index, (to_email, payload) in enumerate(envelopes):
+            if index in delivered or index in failures:
+                continue
+            try:
+                server.sendmail(FROM_EMAIL, [to_email], payload)
+                delivered.add(index)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                # Rejected by the server; the session is still usable
+                failures[index] = str(e)
+    return failures
+
+
+def _postmark_batch_post(payload: List[dict]) -> List[dict]:
+    """POST one batch of messages to Postmark, flagging retryable statuses (blocking)"""
+    import requests
+    
+    response = requests.post(
+        POSTMARK_BATCH_URL,
+        headers={
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "X-Postmark-Server-Token": POSTMARK_SERVER_TOKEN
+        },
+        data=orjson.dumps(payload),
+        timeout=30
+    )
+    if response.status_code == 429 or response.status_code >= 500:
+        raise TransientSendError(
+            f"Postmark API error {response.status_code}: {response.text}",
+            retry_after=_parse_retry_after(response.headers.get("Retry-After"))
+        )
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+
+@lru_cache(maxsize=4096)
+def _wa_addr(phone: str) -> str:
+    """Normalise a phone number to Twilio's whatsapp: address form"""
+    return phone if phone.startswith("whatsapp:") else f"whatsapp:{phone}"
+
+
+@lru_cache(maxsize=256)
+def _short_text(title: str, message: str) -> str:
+    """Single-line text used for SMS/WhatsApp, shared across a bulk send"""
+    return f"{title}: {message}"
+
+# ============================================
+# EMAIL TEMPLATES
+# ============================================
+
+# Templates are plain str.format strings built once at import. Values going
+# into HTML bodies are escaped, since names and reasons are user input.
+
+def _render_html(template: str, fields: Dict[str, Any]) -> str:
+    """Fill an HTML email template with escaped field values"""
+    return template.format(**{key: escape(str(value)) for key, value in fields.items()})
+
+
+_WFH_PENDING_HTML = """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <div style="background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0;">
+                <h2 style="margin: 0;">🏠 WFH Request Pending Approval</h2>
+            </div>
+            
+            <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
+                <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 15px;">
+                    <h3 style="color: #333; margin-top: 0;">📋 Request Details</h3>
+                    <table style="width: 100%; border-collapse: collapse;">
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Employee:</td><td>{employee_name}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Department:</td><td>{department}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Position:</td><td>{position}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">WFH Date:</td><td>{request_date}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Reason:</td><td>{reason}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Submitted:</td><td>{submitted}</td></tr>
+                    </table>
+                </div>
+                
+                <div style="background: white; padding: 20px; border-radius: 8px;">
+                    <h3 style="color: #333; margin-top: 0;">🚀 Quick Actions</h3>
+                    <p>Review and approve/reject this WFH request:</p>
+                    <a href="https://yourapp.com/dashboard/attendance" style="background: #28a745; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block; margin-right: 10px;">✅ Approve</a>
+                    <a href="https://yourapp.com/dashboard/attendance" style="background: #dc3545; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">❌ Reject</a>
+                </div>
+            </div>
+        </div>
+        """
+
+_WFH_PENDING_TEXT = """
+WFH Request Pending Approval
+
+Employee: {employee_name}
+Department: {department}
+Position: {position}
+WFH Date: {request_date}
+Reason: {reason}
+Submitted: {submitted}
+
+Please review and approve/reject this request in the attendance dashboard:
+https://yourapp.com/dashboard/attendance
+""".strip()
+
+_HR_NEW_APPLICATION_HTML = """
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0;">
+                <h2 style="margin: 0;">🎯 New Job Application Received</h2>
+            </div>
+            
+            <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
+                <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 15px;">
+                    <h3 style="color: #333; margin-top: 0;">📋 Application Details</h3>
+                    <table style="width: 100%; border-collapse: collapse;">
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Position:</td><td>{job_title}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Candidate:</td><td>{candidate_name}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Email:</td><td>{candidate_email}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Phone:</td><td>{phone}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Source:</td><td>{source}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">Applied:</td><td>{applied}</td></tr>
+                        <tr><td style="padding: 8px 0; font-weight: bold;">AI Fit Score:</td><td>{ai_fit_score}%</td></tr>
+                    </table>
+                </div>
+                
+                <div style="background: white; padding: 20px; border-radius: 8px;">
+                    <h3 style="color: #333; margin-top: 0;">🚀 Quick Actions</h3>
+                    <p>Review this application in your recruitment dashboard:</p>
+                    <a href="https://yourapp.com/recruitment" style="background: #007bff; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block; margin-right: 10px;">View Application</a>
+                    <a href="https://yourapp.com/recruitment/applications/{application_id}" style="background: #28a745; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">Review Details</a>
+                </div>
+            </div>
+        </div>
+        """
+
+_HR_NEW_APPLICATION_TEXT = """
+New job application received:
+
+Position: {job_title}
+Candidate: {candidate_name}
+Email: {candidate_email}
+Phone: {phone}
+Source: {source}
+Applied: {applied}
+AI Fit Score: {ai_fit_score}%
+
+Review the application in the recruitment dashboard:
+https://yourapp.com/recruitment
+""".strip()
+
+_MISSING_CHECKOUT_TEXT = """
+Missing checkout has been reported:
+
+Employee: {employee_name}
+Department: {department}
+Date: {date}
+Check-in Time: {check_in}
+Reason: {reason}
+
+Please review and approve/reject this attendance record.
+
+Review Link: https://yourapp.com/dashboard/attendance
+""".strip()
+
+_SUMMARY_HEADER_HTML = """
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <div style="background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0;">
+                    <h2 style="margin: 0;">📊 Daily Application Summary</h2>
+                    <p style="margin: 10px 0 0 0; opacity: 0.9;">{today}</p>
+                </div>
+                
+                <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
+                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 15px;">
+                        <h3 style="color: #333; margin-top: 0;">🎯 {total} New Applications Received</h3>
+            """
+
+_SUMMARY_JOB_HTML = """
+                        <div style="border-left: 4px solid #007bff; padding-left: 15px; margin: 15px 0;">
+                            <h4 style="color: #007bff; margin: 0 0 10px 0;">{job_title} ({count} applications)</h4>
+                """
+
+_SUMMARY_APPLICATION_HTML = """
+                            <div style="background: #f8f9fa; padding: 10px; margin: 5px 0; border-radius: 4px;">
+                                <strong>{candidate_name}</strong> - {candidate_email}<br>
+                                <small>Applied: {applied} | Score: {ai_fit_score}%</small>
+                            </div>
+                    """
+
+_SUMMARY_FOOTER_HTML = """
+                    </div>
+                    
+                    <div style="background: white; padding: 20px; border-radius: 8px;">
+                        <a href="https://yourapp.com/recruitment" style="background: #007bff; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">Review All Applications</a>
+                    </div>
+                </div>
+            </div>
+            """
+
+_SUMMARY_HEADER_TEXT = """
+Daily Application Summary - {today}
+
+{total} new applications received in the last 24 hours:
+
+"""
+
+_SUMMARY_JOB_TEXT = "\n{job_title} ({count} applications):\n"
+
+_SUMMARY_APPLICATION_TEXT = "  • {candidate_name} ({candidate_email}) - Score: {ai_fit_score}%\n"
+
+_SUMMARY_FOOTER_TEXT = "\nReview all applications: https://yourapp.com/recruitment"
+
 # ============================================
 # NOTIFICATION SERVICE CLASS
 # ============================================
 
+def _single_transaction(func):
+    """Commit every notification row a notify_* call writes in one transaction"""
+    
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        with self.notification_batch():
+            result = await func(self, *args, **kwargs)
+        if not self._batch_depth:
+            # Push real-time events only once their rows are committed
+            events, self._pending_realtime = self._pending_realtime, []
+            await self._publish_realtime(events)
+        return result
+    
+    return wrapper
+
+
 class NotificationService:
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, redis=None):
         self.db = db
+        self.redis = redis if redis is not None else get_redis_client()
+        self._batch_depth = 0
+        self._log_buffer: List[Tuple[Optional[str], Dict[str, Any]]] = []
+        self._pending_realtime: List[Tuple[int, dict]] = []  # held until the batch commits
+        self._recipients: Dict[tuple, tuple] = {}  # roles -> recipients, for this request
     
     # ========================================
     # EMAIL NOTIFICATIONS
@@ -53,25 +501,25 @@ class NotificationService:
     ) -> bool:
         """Send email notification"""
         
+        if not _has_address(to_email):
+            self._log_notification(
+                user_email=to_email,
+                type="email",
+                subject=subject,
+                message=body,
+                status="failed",
+                error_message="Missing recipient address"
+            )
+            return False
+        
         try:
-            msg = MIMEMultipart('alternative')
-            msg['From'] = FROM_EMAIL
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add plain text
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Add HTML if provided
-            if html_body:
-                msg.attach(MIMEText(html_body, 'html'))
+            payload = _build_message(subject, body, html_body).replace(
+                _TO_PLACEHOLDER, to_email.encode(), 1
+            )
             
-            # Send email
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                if SMTP_USERNAME and SMTP_PASSWORD:
-                    server.login(SMTP_USERNAME, SMTP_PASSWORD)
-                server.send_message(msg)
+            # Send email off the event loop so concurrent sends overlap
+            async with _email_semaphore():
+                await _call_with_retry(_smtp_send, to_email, payload)
             
             # Log notification
             self._log_notification(
@@ -84,7 +532,7 @@ class NotificationService:
             
             return True
             
-        except Exception as e:
+        except (smtplib.SMTPException, OSError) as e:
             # Log failed notification
             self._log_notification(
                 user_email=to_email,
@@ -96,159 +544,112 @@ class NotificationService:
             )
             return False
     
-    # ========================================
-    # SMS NOTIFICATIONS (Twilio)
-    # ========================================
-    
-    async def send_sms(
-        self,
-        to_phone: str,
-        message: str
-    ) -> bool:
-        """Send SMS notification via Twilio"""
-        
-        if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN:
-            self._log_notification(
-                user_phone=to_phone,
-                type="sms",
-                subject="SMS",
-                message=message,
-                status="failed",
-                error_message="Twilio credentials not configured"
-            )
-            return False
-        
-        try:
-            from twilio.rest import Client
-            
-            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-            
-            message = client.messages.create(
-                body=message,
-                from_=TWILIO_PHONE_NUMBER,
-                to=to_phone
-            )
-            
-            # Log successful notification
-            self._log_notification(
-                user_phone=to_phone,
-                type="sms",
-                subject="SMS",
-                message=message.body,
-                status="sent",
-                external_id=message.sid
-            )
+    @_single_transaction
+    async def send_email_batch(self, messages: List[Dict[str, Any]]) -> List[bool]:
+        """Send many emails, one provider request per POSTMARK_BATCH_LIMIT messages
+        
+        Each message is a dict of send_email() keyword arguments.
+        """
+        
+        if not messages:
+            return []
+        
+        if not POSTMARK_SERVER_TOKEN:
+            return await self._send_batch_over_smtp(messages)
+        
+        results = []
+        for start in range(0, len(messages), POSTMARK_BATCH_LIMIT):
+            chunk = messages[start:start + POSTMARK_BATCH_LIMIT]
+            payload = []
+            for message in chunk:
+                item = {
+                    "From": FROM_EMAIL,
+                    "To": message["to_email"],
+                    "Subject": message["subject"],
+                    "TextBody": message["body"]
+                }
+                if message.get("html_body"):
+                    item["HtmlBody"] = message["html_body"]
+                payload.append(item)
             
-            return True
+            try:
+                async with _email_semaphore():
+                    replies = await _call_with_retry(_postmark_batch_post, payload)
+            except (TransientSendError, OSError, ValueError) as e:
+                replies = [{"ErrorCode": -1, "Message": str(e)}] * len(chunk)
             
-        except Exception as e:
-            # Log failed notification
-            self._log_notification(
-                user_phone=to_phone,
-                type="sms",
-                subject="SMS",
-                message=message,
-                status="failed",
-                error_message=str(e)
-            )
-            return False
-    
-    # ========================================
-    # WHATSAPP NOTIFICATIONS
-    # ========================================
+            for message, reply in zip(chunk, replies):
+                sent = reply.get("ErrorCode") == 0
+                self._log_notification(
+                    user_email=message["to_email"],
+                    type="email",
+                    subject=message["subject"],
+                    message=message["body"],
+                    status="sent" if sent else "failed",
+                    error_message=None if sent else reply.get("Message")
+                )
+                results.append(sent)
+        
+        return results
     
-    async def send_whatsapp(
+    async def send_email_many(
         self,
-        to_phone: str,
-        message: str,
-        template_name: Optional[str] = None
-    ) -> bool:
-        """Send WhatsApp notification"""
+        recipients: List[str],
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None
+    ) -> List[bool]:
+        """Send one pre-rendered email to many recipients"""
         
-        if not WHATSAPP_API_KEY:
-            self._log_notification(
-                user_phone=to_phone,
-                type="whatsapp",
-                subject="WhatsApp",
-                message=message,
-                status="failed",
-                error_message="WhatsApp API key not configured"
-            )
-            return False
+        return await self.send_email_batch([
+            {"to_email": to_email, "subject": subject, "body": body, "html_body": html_body}
+            for to_email in recipients
+        ])
+    
+    async def _send_batch_over_smtp(self, messages: List[Dict[str, Any]]) -> List[bool]:
+        """Send a batch through a single SMTP session instead of one per message"""
+        
+        # Messages without an address fail on their own; the rest still go out
+        unaddressed = {
+            index: "Missing recipient address"
+            for index, message in enumerate(messages)
+            if not _has_address(message["to_email"])
+        }
+        envelopes = [
+            (
+                message["to_email"],
+                _build_message(
+                    message["subject"], message["body"], message.get("html_body")
+                ).replace(_TO_PLACEHOLDER, message["to_email"].encode(), 1)
+            ) if index not in unaddressed else (None, b"")
+            for index, message in enumerate(messages)
+        ]
+        # _smtp_send_many() skips indexes already marked delivered
+        delivered = set(unaddressed)
         
         try:
-            # Using Twilio WhatsApp API
-            if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-                from twilio.rest import Client
-                
-                client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                
-                # Format phone number for WhatsApp
-                whatsapp_to = f"whatsapp:{to_phone}"
-                whatsapp_from = f"whatsapp:{WHATSAPP_PHONE_NUMBER}"
-                
-                message = client.messages.create(
-                    body=message,
-                    from_=whatsapp_from,
-                    to=whatsapp_to
-                )
-                
-                # Log successful notification
-                self._log_notification(
-                    user_phone=to_phone,
-                    type="whatsapp",
-                    subject="WhatsApp",
-                    message=message.body,
-                    status="sent",
-                    external_id=message.sid
-                )
-                
-                return True
-            
-            # Alternative: Direct WhatsApp Business API
-            else:
-                import requests
-                
-                url = "https://graph.facebook.com/v17.0/YOUR_PHONE_NUMBER_ID/messages"
-                headers = {
-                    "Authorization": f"Bearer {WHATSAPP_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                data = {
-                    "messaging_product": "whatsapp",
-                    "to": to_phone,
-                    "type": "text",
-                    "text": {"body": message}
-                }
-                
-                response = requests.post(url, headers=headers, json=data)
-                
-                if response.status_code == 200:
-                    # Log successful notification
-                    self._log_notification(
-                        user_phone=to_phone,
-                        type="whatsapp",
-                        subject="WhatsApp",
-                        message=message,
-                        status="sent",
-                        external_id=response.json().get("messages", [{}])[0].get("id")
-                    )
-                    return True
-                else:
-                    raise Exception(f"WhatsApp API error: {response.text}")
-            
-        except Exception as e:
-            # Log failed notification
+            async with _email_semaphore():
+                failures = await _call_with_retry(_smtp_send_many, envelopes, delivered)
+        except (smtplib.SMTPException, OSError) as e:
+            failures = {
+                index: str(e) for index in range(len(messages)) if index not in delivered
+            }
+        failures.update(unaddressed)
+        
+        results = []
+        for index, message in enumerate(messages):
+            error = failures.get(index)
             self._log_notification(
-                user_phone=to_phone,
-                type="whatsapp",
-                subject="WhatsApp",
-                message=message,
-                status="failed",
-                error_message=str(e)
+                user_email=message["to_email"],
+                type="email",
+                subject=message["subject"],
+                message=message["body"],
+                status="failed" if error else "sent",
+                error_message=error
             )
-            return False
+            results.append(error is None)
+        
+        return results
     
     # ========================================
     # IN-APP NOTIFICATIONS
@@ -291,8 +692,61 @@ class NotificationService:
             
             return True
             
-        except Exception as e:
-            print(f"Error creating in-app notification: {str(e)}")
+        except SQLAlchemyError:
+            self._rollback()
+            logger.exception("create_notification failed")
+            return False
+    
+    async def create_notifications_bulk(
+        self,
+        user_ids: List[int],
+        title: str,
+        message: str,
+        type: str = "info",
+        action_url: Optional[str] = None,
+        notification_data: Optional[dict] = None
+    ) -> bool:
+        """Create the same in-app notification for many users in one transaction"""
+        
+        if not user_ids:
+            return True
+        
+        try:
+            created_at = datetime.utcnow()
+            rows = [
+                models.InAppNotification(
+                    user_id=user_id,
+                    title=title,
+                    message=message,
+                    type=type,
+                    action_url=action_url,
+                    notification_data=notification_data or {},
+                    created_at=created_at
+                )
+                for user_id in user_ids
+            ]
+            
+            self.db.bulk_save_objects(rows, return_defaults=True)
+            self.db.commit()
+            
+            # Fan out real-time events once everything is persisted
+            await _gather_bounded([
+                self._send_realtime_notification(row.user_id, {
+                    "id": row.id,
+                    "title": title,
+                    "message": message,
+                    "type": type,
+                    "action_url": action_url,
+                    "created_at": created_at.isoformat()
+                })
+                for row in rows
+            ], REALTIME_CONCURRENCY)
+            
+            return True
+            
+        except SQLAlchemyError:
+            self._rollback()
+            logger.exception("create_notifications_bulk failed")
             return False
     
     # ========================================
@@ -312,45 +766,60 @@ class NotificationService:
         
         results = {}
         
-        # Get user details
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            return {"error": "User not found"}
+        # In-app only needs neither the user's email nor the employee's phone
+        user = employee = None
+        if any(channel in channels for channel in ("email", "sms", "whatsapp")):
+            # Get user details with the employee (for phone number) in one round trip
+            row = self.db.query(models.User, models.Employee).outerjoin(
+                models.Employee, models.Employee.user_id == models.User.id
+            ).filter(models.User.id == user_id).first()
+            if not row:
+                return {"error": "User not found"}
+            user, employee = row
         
-        # Get employee details for phone number
-        employee = self.db.query(models.Employee).filter(models.Employee.user_id == user_id).first()
+        tasks = {}
         
-        # Send in-app notification
+        # In-app notification
         if "in_app" in channels:
-            results["in_app"] = await self.create_notification(
+            tasks["in_app"] = self.create_notification(
                 user_id=user_id,
                 title=title,
                 message=message
             )
         
-        # Send email notification
+        # Email notification
         if "email" in channels and user.email:
-            results["email"] = await self.send_email(
+            tasks["email"] = self.send_email(
                 to_email=user.email,
                 subject=email_subject or title,
                 body=message,
                 html_body=email_html
             )
         
-        # Send SMS notification
+        # SMS notification
         if "sms" in channels and employee and employee.phone:
-            results["sms"] = await self.send_sms(
+            tasks["sms"] = self.send_sms(
                 to_phone=employee.phone,
-                message=f"{title}: {message}"
+                message=_short_text(title, message)
             )
         
-        # Send WhatsApp notification
+        # WhatsApp notification
         if "whatsapp" in channels and employee and employee.phone:
-            results["whatsapp"] = await self.send_whatsapp(
-                to_phone=employee.phone,
-                message=f"{title}: {message}"
+            tasks["whatsapp"] = self.send_whatsapp(
+                employee.phone,
+                message=_short_text(title, message)
             )
         
+        # Channels are independent, so dispatch them concurrently
+        if tasks:
+            keys, coros = zip(*tasks.items())
+            values = await asyncio.gather(*coros, return_exceptions=True)
+            for key, value in zip(keys, values):
+                if isinstance(value, BaseException):
+                    logger.error("%s notification to user %s failed", key, user_id, exc_info=value)
+                    value = False
+                results[key] = value
+        
         return results
     
     # ========================================
@@ -487,53 +956,38 @@ class NotificationService:
             self.db.commit()
             return True
             
-        except Exception as e:
-            print(f"Error updating notification preferences: {str(e)}")
+        except SQLAlchemyError:
+            self._rollback()
+            logger.exception("update_notification_preferences failed for user %s", user_id)
             return False
     
     # ========================================
     # HELPER METHODS
     # ========================================
     
-    def _log_notification(
-        self,
-        user_email: Optional[str] = None,
-        user_phone: Optional[str] = None,
-        type: str = "email",
-        subject: str = "",
-        message: str = "",
-        status: str = "sent",
-        error_message: Optional[str] = None,
-        external_id: Optional[str] = None
-    ):
-        """Log notification for tracking and debugging"""
-        
+    async def _send_realtime_notification(self, user_id: int, notification_data: dict):
+        """Publish a real-time notification for the user's WebSocket connections"""
+        if self.redis is None:
+            return
         try:
-            log_entry = models.NotificationLog(
-                recipient_email=user_email,
-                recipient_phone=user_phone,
-                notification_type=type,
-                subject=subject,
-                message=message,
-                status=status,
-                error_message=error_message,
-                external_id=external_id
+            await self.redis.publish(
+                REALTIME_CHANNEL.format(user_id=user_id),
+                orjson.dumps(notification_data)
             )
-            
-            self.db.add(log_entry)
-            self.db.commit()
-            
-        except Exception as e:
-            print(f"Error logging notification: {str(e)}")
+        except Exception:
+            logger.exception("_send_realtime_notification failed for user %s", user_id)
     
-    async def _send_realtime_notification(self, user_id: int, notification_data: dict):
-        """Send real-time notification via WebSocket"""
-        try:
-            # This would integrate with WebSocket manager
-            # For now, just pass
-            pass
-        except Exception as e:
-            print(f"Error sending real-time notification: {str(e)}")
+    async def _publish_realtime(self, events: List[Tuple[int, dict]]):
+        """Publish (user_id, payload) events, or hold them while a batch is open"""
+        if self.redis is None or not events:
+            return
+        if self._batch_depth:
+            self._pending_realtime.extend(events)
+            return
+        await _gather_bounded([
+            self._send_realtime_notification(user_id, payload)
+            for user_id, payload in events
+        ], REALTIME_CONCURRENCY)
     
     # ========================================
     # BULK NOTIFICATIONS
@@ -556,6 +1010,10 @@ class NotificationService:
             "total": len(user_ids)
         }
         
+        # In-app notifications are persisted together after the loop,
+        # grouped by their rendered (title, message)
+        in_app_batches: Dict[tuple, List[Dict[str, Any]]] = {}
+        
         for user_id in user_ids:
             try:
                 # Get user preferences
@@ -569,7 +1027,7 @@ class NotificationService:
                 
                 # Prepare template data if provided
                 if template_name and template_data:
-                    user = self.db.query(models.User).filter(models.User.id == user_id).first()
+                    user = self.db.get(models.User, user_id)
                     employee = self.db.query(models.Employee).filter(models.Employee.user_id == user_id).first()
                     
                     template_data.update({
@@ -580,18 +1038,25 @@ class NotificationService:
                     title = template.get("title", title)
                     message = template.get("message", message)
                 
-                # Send notification
-                result = await self.send_multi_channel_notification(
-                    user_id=user_id,
-                    title=title,
-                    message=message,
-                    channels=user_channels
-                )
+                # Send external channels now, in-app ones in bulk below
+                external_channels = [c for c in user_channels if c != "in_app"]
+                result = {}
+                if external_channels:
+                    result = await self.send_multi_channel_notification(
+                        user_id=user_id,
+                        title=title,
+                        message=message,
+                        channels=external_channels
+                    )
                 
-                results["successful"].append({
+                entry = {
                     "user_id": user_id,
                     "channels": result
-                })
+                }
+                results["successful"].append(entry)
+                
+                if "in_app" in user_channels and "error" not in result:
+                    in_app_batches.setdefault((title, message), []).append(entry)
                 
             except Exception as e:
                 results["failed"].append({
@@ -599,7 +1064,36 @@ class NotificationService:
                     "error": str(e)
                 })
         
+        # One missing user must not fail the whole batch on the foreign key
+        batched_ids = {entry["user_id"] for entries in in_app_batches.values() for entry in entries}
+        existing_ids = set()
+        if batched_ids:
+            existing_ids = {
+                row.id for row in self.db.query(models.User.id).filter(
+                    models.User.id.in_(batched_ids)
+                ).all()
+            }
+        
+        for (batch_title, batch_message), entries in in_app_batches.items():
+            for entry in entries:
+                if entry["user_id"] not in existing_ids:
+                    entry["channels"] = {"error": "User not found"}
+            entries = [entry for entry in entries if entry["user_id"] in existing_ids]
+            if not entries:
+                continue
+            
+            created = await self.create_notifications_bulk(
+                user_ids=[entry["user_id"] for entry in entries],
+                title=batch_title,
+                message=batch_message
+            )
+            for entry in entries:
+                entry["channels"]["in_app"] = created
+        
         return results
+    
+    # ========================================
+    # SMS NOTIFICATIONS (Twilio)
     # ========================================
     
     async def send_sms(
@@ -610,7 +1104,7 @@ class NotificationService:
         """Send SMS notification via Twilio"""
         
         if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN:
-            print("Twilio credentials not configured")
+            logger.warning("Twilio credentials not configured")
             return False
         
         try:
@@ -619,7 +1113,8 @@ class NotificationService:
             
             client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
             
-            message_obj = client.messages.create(
+            message_obj = await _call_with_retry(
+                client.messages.create,
                 body=message,
                 from_=TWILIO_PHONE_NUMBER,
                 to=to_phone
@@ -660,7 +1155,7 @@ class NotificationService:
         """Send WhatsApp notification via Twilio WhatsApp API"""
         
         if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN:
-            print("Twilio credentials not configured")
+            logger.warning("Twilio credentials not configured")
             return False
         
         try:
@@ -670,12 +1165,12 @@ class NotificationService:
             client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
             
             # WhatsApp numbers must be in format: whatsapp:+1234567890
-            if not to_whatsapp.startswith("whatsapp:"):
-                to_whatsapp = f"whatsapp:{to_whatsapp}"
+            to_whatsapp = _wa_addr(to_whatsapp)
             
-            from_whatsapp = f"whatsapp:{WHATSAPP_PHONE_NUMBER}"
+            from_whatsapp = _wa_addr(WHATSAPP_PHONE_NUMBER)
             
-            message_obj = client.messages.create(
+            message_obj = await _call_with_retry(
+                client.messages.create,
                 body=message,
                 from_=from_whatsapp,
                 to=to_whatsapp
@@ -718,7 +1213,7 @@ class NotificationService:
         """Send notification via multiple channels based on user preferences"""
         
         # Get user preferences
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
+        user = self.db.get(models.User, user_id)
         if not user:
             return {"success": False, "error": "User not found"}
         
@@ -765,9 +1260,7 @@ class NotificationService:
     ):
         """Notify candidate that application was received"""
         
-        app = self.db.query(models.Application).filter(
-            models.Application.id == application_id
-        ).first()
+        app = self.db.get(models.Application, application_id)
         
         if not app:
             return
@@ -789,7 +1282,7 @@ Recruitment Team
         """.strip()
         
         # Send email
-        await self.send_email(
+        await enqueue_email(
             to_email=app.candidate_email,
             subject=subject,
             body=message
@@ -800,84 +1293,29 @@ Recruitment Team
             whatsapp_msg = f"Hi {app.candidate_name}, your application for {app.job.title} has been received. Application ID: {app.id}"
             await self.send_whatsapp(to_whatsapp=app.phone, message=whatsapp_msg)
     
+    @_single_transaction
     async def notify_hr_new_application(
         self,
         application_id: int
     ):
         """Notify HR/Admin about new job application with detailed information"""
-        
-        app = self.db.query(models.Application).filter(
-            models.Application.id == application_id
-        ).first()
-        
-        if not app:
-            return
-        
-        # Get all HR and Admin users
-        hr_users = self.db.query(models.User).filter(
-            models.User.role.in_(['hr', 'admin']),
-            models.User.is_active == True
-        ).all()
-        
-        for hr_user in hr_users:
-            subject = f"🔔 New Application Alert - {app.job.title}"
-            
-            # Create detailed HTML email
-            html_message = f"""
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">🎯 New Job Application Received</h2>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
-                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 15px;">
-                        <h3 style="color: #333; margin-top: 0;">📋 Application Details</h3>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Position:</td><td>{app.job.title}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Candidate:</td><td>{app.candidate_name}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Email:</td><td>{app.candidate_email}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Phone:</td><td>{app.phone or 'Not provided'}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Source:</td><td>{app.source or 'Direct'}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Applied:</td><td>{app.applied_date.strftime('%B %d, %Y at %I:%M %p')}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">AI Fit Score:</td><td>{app.ai_fit_score or 'N/A'}%</td></tr>
-                        </table>
-                    </div>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 8px;">
-                        <h3 style="color: #333; margin-top: 0;">🚀 Quick Actions</h3>
-                        <p>Review this application in your recruitment dashboard:</p>
-                        <a href="https://yourapp.com/recruitment" style="background: #007bff; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block; margin-right: 10px;">View Application</a>
-                        <a href="https://yourapp.com/recruitment/applications/{app.id}" style="background: #28a745; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">Review Details</a>
-                    </div>
-                </div>
-            </div>
-            """
-            
-            plain_message = f"""
-New job application received:
-
-Position: {app.job.title}
-Candidate: {app.candidate_name}
-Email: {app.candidate_email}
-Phone: {app.phone or 'Not provided'}
-Source: {app.source or 'Direct'}
-Applied: {app.applied_date.strftime('%B %d, %Y at %I:%M %p')}
-AI Fit Score: {app.ai_fit_score or 'N/A'}%
-
-Review the application in the recruitment dashboard:
-https://yourapp.com/recruitment
-            """.strip()
-            
-            # Send email notification
-            await self.send_email(
-                to_email=hr_user.email,
-                subject=subject,
-                body=plain_message,
-                html_body=html_message
-            )
-            
-            # Create in-app notification
-            await self.create_in_app_notification(
+        
+        # Get all HR and Admin users; nothing to build without recipients
+        hr_users = self._get_active_recipients(['hr', 'admin'])
+        if not hr_users:
+            return
+        
+        app = self.db.get(models.Application, application_id)
+        
+        if not app:
+            return
+        
+        # Email all HR users the same rendered message
+        await self._send_hr_app_email(hr_users, app)
+        
+        # Create in-app notifications in one transaction
+        await self.create_in_app_notifications_bulk([
+            dict(
                 user_id=hr_user.id,
                 title="New Application Received",
                 message=f"New application for {app.job.title} from {app.candidate_name}",
@@ -890,6 +1328,33 @@ https://yourapp.com/recruitment
                     "job_title": app.job.title
                 }
             )
+            for hr_user in hr_users
+        ])
+    
+    async def _send_hr_app_email(self, hr_users, app) -> None:
+        """Queue an email to HR users about a new job application"""
+        
+        subject = f"🔔 New Application Alert - {app.job.title}"
+        fields = {
+            "job_title": app.job.title,
+            "candidate_name": app.candidate_name,
+            "candidate_email": app.candidate_email,
+            "phone": app.phone or 'Not provided',
+            "source": app.source or 'Direct',
+            "applied": app.applied_date.strftime('%B %d, %Y at %I:%M %p'),
+            "ai_fit_score": app.ai_fit_score or 'N/A',
+            "application_id": app.id
+        }
+        html_message = _render_html(_HR_NEW_APPLICATION_HTML, fields)
+        plain_message = _HR_NEW_APPLICATION_TEXT.format(**fields)
+        
+        # Send email notification
+        await enqueue_email_many(
+            [hr_user.email for hr_user in hr_users],
+            subject,
+            plain_message,
+            html_message
+        )
     
     async def create_in_app_notification(
         self,
@@ -913,26 +1378,82 @@ https://yourapp.com/recruitment
         )
         
         self.db.add(notification)
-        self.db.commit()
-        self.db.refresh(notification)
-        
-        # Here you would typically emit a WebSocket event for real-time updates
-        # await self.emit_real_time_notification(user_id, notification)
+        # Flush so the INSERT returns the id without a refresh after commit
+        self.db.flush()
+        notification_id = notification.id
+        self._commit()
+        
+        await self._publish_realtime([(user_id, {
+            "id": notification_id,
+            "title": title,
+            "message": message,
+            "type": type,
+            "action_url": action_url
+        })])
         
         return notification
     
+    async def create_in_app_notifications_bulk(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert many in-app notifications in one transaction
+        
+        Each row holds create_in_app_notification() keyword arguments.
+        """
+        
+        if not rows:
+            return 0
+        
+        created_at = datetime.utcnow()
+        rows = [
+            {
+                "type": "info",
+                "action_url": None,
+                "notification_data": None,
+                **row,
+                "is_read": False,
+                "created_at": created_at
+            }
+            for row in rows
+        ]
+        # One multi-row INSERT; RETURNING gives the ids back in row order
+        notification_ids = self.db.scalars(
+            insert(models.InAppNotification).returning(
+                models.InAppNotification.id, sort_by_parameter_order=True
+            ),
+            rows
+        ).all()
+        self._commit()
+        
+        await self._publish_realtime([
+            (row["user_id"], {
+                "id": notification_id,
+                "title": row["title"],
+                "message": row["message"],
+                "type": row["type"],
+                "action_url": row["action_url"]
+            })
+            for row, notification_id in zip(rows, notification_ids)
+        ])
+        
+        return len(rows)
+    
+    @_single_transaction
     async def notify_application_status_change(
         self,
         application_id: int,
         old_status: str,
         new_status: str,
-        changed_by_user_id: int = None
+        changed_by_user_id: int = None,
+        hr_users: Optional[Sequence[Recipient]] = None
     ):
         """Enhanced notification for application status changes"""
         
-        app = self.db.query(models.Application).filter(
-            models.Application.id == application_id
-        ).first()
+        app = self.db.get(
+            models.Application,
+            application_id,
+            options=[
+                joinedload(models.Application.job)
+            ]
+        )
         
         if not app:
             return
@@ -940,21 +1461,20 @@ https://yourapp.com/recruitment
         # Notify candidate
         await self.notify_status_change(application_id, new_status)
         
-        # Notify HR/Admin about status change
-        hr_users = self.db.query(models.User).filter(
-            models.User.role.in_(['hr', 'admin']),
-            models.User.is_active == True
-        ).all()
+        # Notify HR/Admin about status change, except whoever made it
+        if hr_users is None:
+            hr_users = self._get_active_recipients(['hr', 'admin'])
+        hr_users = [hr_user for hr_user in hr_users if hr_user.id != changed_by_user_id]
+        if not hr_users:
+            return
         
         changed_by = None
         if changed_by_user_id:
-            changed_by = self.db.query(models.User).filter(models.User.id == changed_by_user_id).first()
+            changed_by = self.db.get(models.User, changed_by_user_id)
         
-        for hr_user in hr_users:
-            if hr_user.id == changed_by_user_id:  # Don't notify the person who made the change
-                continue
-                
-            await self.create_in_app_notification(
+        # Create in-app notifications in one transaction
+        await self.create_in_app_notifications_bulk([
+            dict(
                 user_id=hr_user.id,
                 title="Application Status Updated",
                 message=f"{app.candidate_name}'s application for {app.job.title} moved from {old_status} to {new_status}",
@@ -967,106 +1487,122 @@ https://yourapp.com/recruitment
                     "changed_by": changed_by.full_name if changed_by else "System"
                 }
             )
+            for hr_user in hr_users
+        ])
     
-    async def send_bulk_application_alerts(self):
+    async def send_bulk_application_alerts(self, hr_users: Optional[Sequence[Recipient]] = None):
         """Send daily/weekly summary of applications to HR"""
         
         from datetime import datetime, timedelta
         
-        # Get applications from last 24 hours
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_applications = self.db.query(models.Application).filter(
-            models.Application.applied_date >= yesterday
-        ).all()
+        # Get HR users; skip the summary query entirely if nobody would get it
+        if hr_users is None:
+            hr_users = self._get_active_recipients(['hr', 'admin'])
+        if not hr_users:
+            return
         
-        if not recent_applications:
+        # Rank the last 24 hours of applications within each job in the
+        # database, keeping the job's total alongside the capped detail rows
+        # (applied_date is stored as naive UTC)
+        cutoff = func.timezone('utc', func.now()) - timedelta(days=1)
+        ranked = self.db.query(
+            models.Application.job_id,
+            models.Application.candidate_name,
+            models.Application.candidate_email,
+            models.Application.applied_date,
+            models.Application.ai_fit_score,
+            func.row_number().over(
+                partition_by=models.Application.job_id,
+                order_by=models.Application.applied_date.desc()
+            ).label("rank"),
+            func.count().over(
+                partition_by=models.Application.job_id
+            ).label("job_count")
+        ).filter(
+            models.Application.applied_date >= cutoff
+        ).subquery()
+        
+        rows = self.db.query(
+            ranked,
+            models.Job.title.label("job_title")
+        ).outerjoin(
+            models.Job, models.Job.id == ranked.c.job_id
+        ).filter(
+            ranked.c.rank <= SUMMARY_APPLICATIONS_PER_JOB
+        ).order_by(
+            models.Job.title, ranked.c.job_id, ranked.c.rank
+        ).execution_options(stream_results=True).yield_per(500)
+        
+        # Rows arrive grouped by job, so they can be streamed off a
+        # server-side cursor and grouped without a dict of lists
+        job_applications = []
+        for _, group in groupby(rows, key=attrgetter("job_id")):
+            apps = list(group)
+            job_title = apps[0].job_title or "Unknown Position"
+            job_applications.append((job_title, apps[0].job_count, apps))
+        
+        if not job_applications:
             return
         
-        # Get HR users
-        hr_users = self.db.query(models.User).filter(
-            models.User.role.in_(['hr', 'admin']),
-            models.User.is_active == True
-        ).all()
+        total_applications = sum(count for _, count, _ in job_applications)
         
-        # Group applications by job
-        job_applications = {}
-        for app in recent_applications:
-            job_title = app.job.title if app.job else "Unknown Position"
-            if job_title not in job_applications:
-                job_applications[job_title] = []
-            job_applications[job_title].append(app)
+        # Nothing in the summary depends on the recipient, so build it once
+        today = datetime.now().strftime('%B %d, %Y')
+        subject = f"📊 Daily Application Summary - {total_applications} New Applications"
         
-        for hr_user in hr_users:
-            subject = f"📊 Daily Application Summary - {len(recent_applications)} New Applications"
-            
-            html_message = f"""
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                <div style="background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">📊 Daily Application Summary</h2>
-                    <p style="margin: 10px 0 0 0; opacity: 0.9;">{datetime.now().strftime('%B %d, %Y')}</p>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
-                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 15px;">
-                        <h3 style="color: #333; margin-top: 0;">🎯 {len(recent_applications)} New Applications Received</h3>
-            """
-            
-            for job_title, apps in job_applications.items():
-                html_message += f"""
-                        <div style="border-left: 4px solid #007bff; padding-left: 15px; margin: 15px 0;">
-                            <h4 style="color: #007bff; margin: 0 0 10px 0;">{job_title} ({len(apps)} applications)</h4>
-                """
-                
-                for app in apps:
-                    html_message += f"""
-                            <div style="background: #f8f9fa; padding: 10px; margin: 5px 0; border-radius: 4px;">
-                                <strong>{app.candidate_name}</strong> - {app.candidate_email}<br>
-                                <small>Applied: {app.applied_date.strftime('%I:%M %p')} | Score: {app.ai_fit_score or 'N/A'}%</small>
-                            </div>
-                    """
-                
-                html_message += "</div>"
-            
-            html_message += f"""
-                    </div>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 8px;">
-                        <a href="https://yourapp.com/recruitment" style="background: #007bff; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">Review All Applications</a>
-                    </div>
-                </div>
-            </div>
-            """
-            
-            plain_message = f"""
-Daily Application Summary - {datetime.now().strftime('%B %d, %Y')}
-
-{len(recent_applications)} new applications received in the last 24 hours:
-
-"""
-            
-            for job_title, apps in job_applications.items():
-                plain_message += f"\n{job_title} ({len(apps)} applications):\n"
-                for app in apps:
-                    plain_message += f"  • {app.candidate_name} ({app.candidate_email}) - Score: {app.ai_fit_score or 'N/A'}%\n"
-            
-            plain_message += f"\nReview all applications: https://yourapp.com/recruitment"
+        html_parts = [_SUMMARY_HEADER_HTML.format(today=today, total=total_applications)]
+        plain_parts = [_SUMMARY_HEADER_TEXT.format(today=today, total=total_applications)]
+        
+        for job_title, count, apps in job_applications:
+            html_parts.append(_render_html(_SUMMARY_JOB_HTML, {"job_title": job_title, "count": count}))
+            html_parts.extend(
+                _render_html(_SUMMARY_APPLICATION_HTML, {
+                    "candidate_name": app.candidate_name,
+                    "candidate_email": app.candidate_email,
+                    "applied": app.applied_date.strftime('%I:%M %p'),
+                    "ai_fit_score": app.ai_fit_score or 'N/A'
+                })
+                for app in apps
+            )
+            html_parts.append("</div>")
             
-            await self.send_email(
-                to_email=hr_user.email,
-                subject=subject,
-                body=plain_message,
-                html_body=html_message
+            plain_parts.append(_SUMMARY_JOB_TEXT.format(job_title=job_title, count=count))
+            plain_parts.extend(
+                _SUMMARY_APPLICATION_TEXT.format(
+                    candidate_name=app.candidate_name,
+                    candidate_email=app.candidate_email,
+                    ai_fit_score=app.ai_fit_score or 'N/A'
+                )
+                for app in apps
             )
+        
+        html_parts.append(_SUMMARY_FOOTER_HTML)
+        plain_parts.append(_SUMMARY_FOOTER_TEXT)
+        
+        html_message = "".join(html_parts)
+        plain_message = "".join(plain_parts)
+        
+        messages = [
+            {
+                "to_email": hr_user.email,
+                "subject": subject,
+                "body": plain_message,
+                "html_body": html_message
+            }
+            for hr_user in hr_users
+        ]
+        
+        # Hand the whole batch to the email workers instead of waiting on SMTP
+        await enqueue_email_batch(messages)
     
+    @_single_transaction
     async def notify_interview_scheduled(
         self,
         interview_id: int
     ):
         """Notify candidate about scheduled interview"""
         
-        interview = self.db.query(models.Interview).filter(
-            models.Interview.id == interview_id
-        ).first()
+        interview = self.db.get(models.Interview, interview_id)
         
         if not interview:
             return
@@ -1089,7 +1625,7 @@ Recruitment Team
         """.strip()
         
         # Send email
-        await self.send_email(
+        await enqueue_email(
             to_email=app.candidate_email,
             subject=subject,
             body=message
@@ -1107,9 +1643,7 @@ Recruitment Team
     ):
         """Notify candidate about application status change"""
         
-        app = self.db.query(models.Application).filter(
-            models.Application.id == application_id
-        ).first()
+        app = self.db.get(models.Application, application_id)
         
         if not app:
             return
@@ -1138,12 +1672,13 @@ Recruitment Team
         """.strip()
         
         # Send email
-        await self.send_email(
+        await enqueue_email(
             to_email=app.candidate_email,
             subject=subject,
             body=message
         )
     
+    @_single_transaction
     async def notify_document_upload_required(
         self,
         application_id: int,
@@ -1151,9 +1686,7 @@ Recruitment Team
     ):
         """Notify candidate to upload required documents"""
         
-        app = self.db.query(models.Application).filter(
-            models.Application.id == application_id
-        ).first()
+        app = self.db.get(models.Application, application_id)
         
         if not app:
             return
@@ -1175,7 +1708,7 @@ Recruitment Team
         """.strip()
         
         # Send email
-        await self.send_email(
+        await enqueue_email(
             to_email=app.candidate_email,
             subject=subject,
             body=message
@@ -1190,12 +1723,11 @@ Recruitment Team
     # WFH REQUEST NOTIFICATIONS
     # ========================================
     
+    @_single_transaction
     async def notify_wfh_request_submitted(self, wfh_request_id: int):
         """Notify employee that WFH request was submitted successfully"""
         
-        wfh_request = self.db.query(models.WFHRequest).filter(
-            models.WFHRequest.id == wfh_request_id
-        ).first()
+        wfh_request = self.db.get(models.WFHRequest, wfh_request_id)
         
         if not wfh_request or not wfh_request.employee:
             return
@@ -1222,7 +1754,7 @@ HR Team
         """.strip()
         
         # Send email notification
-        await self.send_email(
+        await enqueue_email(
             to_email=user.email,
             subject=subject,
             body=message
@@ -1242,80 +1774,58 @@ HR Team
             }
         )
     
-    async def notify_wfh_request_pending_approval(self, wfh_request_id: int):
+    @_single_transaction
+    async def notify_wfh_request_pending_approval(
+        self,
+        wfh_request_id: int,
+        approvers: Optional[Sequence[Recipient]] = None
+    ):
         """Notify managers/HR about pending WFH request"""
         
-        wfh_request = self.db.query(models.WFHRequest).filter(
-            models.WFHRequest.id == wfh_request_id
-        ).first()
+        # Get all managers, HR, and admin users; nothing to build without recipients
+        if approvers is None:
+            approvers = self._get_active_recipients(['manager', 'hr', 'admin'])
+        if not approvers:
+            return
+        
+        wfh_request = self.db.get(
+            models.WFHRequest,
+            wfh_request_id,
+            options=[
+                joinedload(models.WFHRequest.employee).joinedload(models.Employee.user)
+            ]
+        )
         
         if not wfh_request or not wfh_request.employee:
             return
         
         employee = wfh_request.employee
         
-        # Get all managers, HR, and admin users
-        approvers = self.db.query(models.User).filter(
-            models.User.role.in_(['manager', 'hr', 'admin']),
-            models.User.is_active == True
-        ).all()
+        # The email is the same for every approver, so render it once
+        employee_name = f"{employee.first_name} {employee.last_name}"
+        fields = {
+            "employee_name": employee_name,
+            "department": employee.department or 'N/A',
+            "position": employee.position or 'N/A',
+            "request_date": wfh_request.request_date.strftime('%B %d, %Y (%A)'),
+            "reason": wfh_request.reason,
+            "submitted": wfh_request.created_at.strftime('%B %d, %Y at %I:%M %p')
+        }
+        subject = f"🏠 WFH Request Pending Approval - {employee_name}"
+        html_message = _render_html(_WFH_PENDING_HTML, fields)
+        plain_message = _WFH_PENDING_TEXT.format(**fields)
+        
+        # Email all approvers in one batch
+        await enqueue_email_many(
+            [approver.email for approver in approvers],
+            subject,
+            plain_message,
+            html_message
+        )
         
-        for approver in approvers:
-            subject = f"🏠 WFH Request Pending Approval - {employee.first_name} {employee.last_name}"
-            
-            html_message = f"""
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                <div style="background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%); color: white; padding: 20px; border-radius: 8px 8px 0 0;">
-                    <h2 style="margin: 0;">🏠 WFH Request Pending Approval</h2>
-                </div>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
-                    <div style="background: white; padding: 20px; border-radius: 8px; margin-bottom: 15px;">
-                        <h3 style="color: #333; margin-top: 0;">📋 Request Details</h3>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Employee:</td><td>{employee.first_name} {employee.last_name}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Department:</td><td>{employee.department or 'N/A'}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Position:</td><td>{employee.position or 'N/A'}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">WFH Date:</td><td>{wfh_request.request_date.strftime('%B %d, %Y (%A)')}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Reason:</td><td>{wfh_request.reason}</td></tr>
-                            <tr><td style="padding: 8px 0; font-weight: bold;">Submitted:</td><td>{wfh_request.created_at.strftime('%B %d, %Y at %I:%M %p')}</td></tr>
-                        </table>
-                    </div>
-                    
-                    <div style="background: white; padding: 20px; border-radius: 8px;">
-                        <h3 style="color: #333; margin-top: 0;">🚀 Quick Actions</h3>
-                        <p>Review and approve/reject this WFH request:</p>
-                        <a href="https://yourapp.com/dashboard/attendance" style="background: #28a745; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block; margin-right: 10px;">✅ Approve</a>
-                        <a href="https://yourapp.com/dashboard/attendance" style="background: #dc3545; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">❌ Reject</a>
-                    </div>
-                </div>
-            </div>
-            """
-            
-            plain_message = f"""
-WFH Request Pending Approval
-
-Employee: {employee.first_name} {employee.last_name}
-Department: {employee.department or 'N/A'}
-Position: {employee.position or 'N/A'}
-WFH Date: {wfh_request.request_date.strftime('%B %d, %Y (%A)')}
-Reason: {wfh_request.reason}
-Submitted: {wfh_request.created_at.strftime('%B %d, %Y at %I:%M %p')}
-
-Please review and approve/reject this request in the attendance dashboard:
-https://yourapp.com/dashboard/attendance
-            """.strip()
-            
-            # Send email notification
-            await self.send_email(
-                to_email=approver.email,
-                subject=subject,
-                body=plain_message,
-                html_body=html_message
-            )
-            
-            # Create in-app notification
-            await self.create_in_app_notification(
+        # Create in-app notifications in one transaction
+        await self.create_in_app_notifications_bulk([
+            dict(
                 user_id=approver.id,
                 title="WFH Request Pending",
                 message=f"{employee.first_name} {employee.last_name} requested WFH for {wfh_request.request_date.strftime('%B %d, %Y')}",
@@ -1328,7 +1838,10 @@ https://yourapp.com/dashboard/attendance
                     "reason": wfh_request.reason
                 }
             )
+            for approver in approvers
+        ])
     
+    @_single_transaction
     async def notify_wfh_request_decision(
         self, 
         wfh_request_id: int, 
@@ -1338,9 +1851,15 @@ https://yourapp.com/dashboard/attendance
     ):
         """Notify employee about WFH request approval/rejection"""
         
-        wfh_request = self.db.query(models.WFHRequest).filter(
-            models.WFHRequest.id == wfh_request_id
-        ).first()
+        wfh_request = self.db.get(
+            models.WFHRequest,
+            wfh_request_id,
+            options=[
+                joinedload(models.WFHRequest.employee)
+                .joinedload(models.Employee.user)
+                .joinedload(models.User.notification_preference)
+            ]
+        )
         
         if not wfh_request or not wfh_request.employee:
             return
@@ -1349,16 +1868,18 @@ https://yourapp.com/dashboard/attendance
         user = employee.user
         
         # Get approver details
-        approver = self.db.query(models.User).filter(
-            models.User.id == approved_by_user_id
-        ).first()
+        approver = self.db.get(
+            models.User,
+            approved_by_user_id,
+            options=[
+                joinedload(models.User.employee)
+            ]
+        )
         
         approver_name = "Manager"
         if approver:
-            # Try to get approver's employee profile for full name
-            approver_employee = self.db.query(models.Employee).filter(
-                models.Employee.user_id == approver.id
-            ).first()
+            # Use approver's employee profile for full name
+            approver_employee = approver.employee
             if approver_employee:
                 approver_name = f"{approver_employee.first_name} {approver_employee.last_name}"
             else:
@@ -1409,16 +1930,14 @@ You can submit a new WFH request for a different date if needed.
 HR Team"""
         
         # Send email notification
-        await self.send_email(
+        await enqueue_email(
             to_email=user.email,
             subject=subject,
             body=message
         )
         
         # Send SMS/WhatsApp for urgent notifications
-        notification_prefs = self.db.query(models.NotificationPreference).filter(
-            models.NotificationPreference.user_id == user.id
-        ).first()
+        notification_prefs = user.notification_preference
         
         if notification_prefs:
             quick_message = f"WFH request for {wfh_request.request_date.strftime('%b %d')} has been {status_text.lower()} by {approver_name}"
@@ -1452,10 +1971,15 @@ HR Team"""
             }
         )
     
+    @_single_transaction
     async def notify_wfh_reminder(self, wfh_request_id: int):
         """Send reminder to employee about approved WFH the day before"""
         
-        wfh_request = self.db.query(models.WFHRequest).filter(
+        wfh_request = self.db.query(models.WFHRequest).options(
+            joinedload(models.WFHRequest.employee)
+            .joinedload(models.Employee.user)
+            .joinedload(models.User.notification_preference)
+        ).filter(
             models.WFHRequest.id == wfh_request_id,
             models.WFHRequest.status == "approved"
         ).first()
@@ -1487,16 +2011,14 @@ HR Team
         """.strip()
         
         # Send email
-        await self.send_email(
+        await enqueue_email(
             to_email=user.email,
             subject=subject,
             body=message
         )
         
         # Send WhatsApp reminder if enabled
-        notification_prefs = self.db.query(models.NotificationPreference).filter(
-            models.NotificationPreference.user_id == user.id
-        ).first()
+        notification_prefs = user.notification_preference
         
         if notification_prefs and notification_prefs.whatsapp_enabled and notification_prefs.whatsapp_number:
             whatsapp_msg = f"🏠 *WFH Reminder*\n\nYou have approved WFH tomorrow ({wfh_request.request_date.strftime('%b %d, %Y')}). Don't forget to mark attendance!"
@@ -1509,50 +2031,39 @@ HR Team
     # ATTENDANCE NOTIFICATIONS
     # ========================================
     
-    async def notify_late_attendance_flagged(self, attendance_id: int):
+    @_single_transaction
+    async def notify_late_attendance_flagged(
+        self,
+        attendance_id: int,
+        approvers: Optional[Sequence[Recipient]] = None
+    ):
         """Notify managers about late attendance that needs approval"""
         
-        attendance = self.db.query(models.Attendance).filter(
-            models.Attendance.id == attendance_id
-        ).first()
+        # Get managers/HR/admin; nothing to build without recipients
+        if approvers is None:
+            approvers = self._get_active_recipients(['manager', 'hr', 'admin'])
+        if not approvers:
+            return
+        
+        attendance = self.db.get(
+            models.Attendance,
+            attendance_id,
+            options=[
+                joinedload(models.Attendance.employee)
+            ]
+        )
         
         if not attendance or not attendance.employee:
             return
         
         employee = attendance.employee
         
-        # Get managers/HR/admin
-        approvers = self.db.query(models.User).filter(
-            models.User.role.in_(['manager', 'hr', 'admin']),
-            models.User.is_active == True
-        ).all()
+        # Email all approvers the same rendered message
+        await self._send_late_attendance_email(approvers, attendance, employee)
         
-        for approver in approvers:
-            subject = f"⏰ Late Attendance Alert - {employee.first_name} {employee.last_name}"
-            
-            message = f"""
-Late attendance requires your approval:
-
-Employee: {employee.first_name} {employee.last_name}
-Department: {employee.department or 'N/A'}
-Date: {attendance.date.strftime('%B %d, %Y')}
-Check-in Time: {attendance.check_in.strftime('%I:%M %p')}
-Work Mode: {attendance.work_mode.upper()}
-Location: {attendance.location_address or 'N/A'}
-
-Please review and approve/reject this attendance record.
-
-Review Link: https://yourapp.com/dashboard/attendance
-            """.strip()
-            
-            await self.send_email(
-                to_email=approver.email,
-                subject=subject,
-                body=message
-            )
-            
-            # Create in-app notification
-            await self.create_in_app_notification(
+        # Create in-app notifications in one transaction
+        await self.create_in_app_notifications_bulk([
+            dict(
                 user_id=approver.id,
                 title="Late Attendance Alert",
                 message=f"{employee.first_name} {employee.last_name} checked in late at {attendance.check_in.strftime('%I:%M %p')}",
@@ -1565,7 +2076,36 @@ Review Link: https://yourapp.com/dashboard/attendance
                     "work_mode": attendance.work_mode
                 }
             )
+            for approver in approvers
+        ])
+    
+    async def _send_late_attendance_email(self, approvers, attendance, employee) -> None:
+        """Queue an email to approvers about a late check-in"""
+        
+        subject = f"⏰ Late Attendance Alert - {employee.first_name} {employee.last_name}"
+        
+        message = f"""
+Late attendance requires your approval:
+
+Employee: {employee.first_name} {employee.last_name}
+Department: {employee.department or 'N/A'}
+Date: {attendance.date.strftime('%B %d, %Y')}
+Check-in Time: {attendance.check_in.strftime('%I:%M %p')}
+Work Mode: {attendance.work_mode.upper()}
+Location: {attendance.location_address or 'N/A'}
+
+Please review and approve/reject this attendance record.
+
+Review Link: https://yourapp.com/dashboard/attendance
+        """.strip()
+        
+        await enqueue_email_many(
+            [approver.email for approver in approvers],
+            subject,
+            message
+        )
     
+    @_single_transaction
     async def notify_attendance_approved_rejected(
         self, 
         attendance_id: int, 
@@ -1575,9 +2115,7 @@ Review Link: https://yourapp.com/dashboard/attendance
     ):
         """Notify employee about attendance approval/rejection"""
         
-        attendance = self.db.query(models.Attendance).filter(
-            models.Attendance.id == attendance_id
-        ).first()
+        attendance = self.db.get(models.Attendance, attendance_id)
         
         if not attendance or not attendance.employee:
             return
@@ -1586,15 +2124,17 @@ Review Link: https://yourapp.com/dashboard/attendance
         user = employee.user
         
         # Get approver details
-        approver = self.db.query(models.User).filter(
-            models.User.id == approved_by_user_id
-        ).first()
+        approver = self.db.get(
+            models.User,
+            approved_by_user_id,
+            options=[
+                joinedload(models.User.employee)
+            ]
+        )
         
         approver_name = "Manager"
         if approver:
-            approver_employee = self.db.query(models.Employee).filter(
-                models.Employee.user_id == approver.id
-            ).first()
+            approver_employee = approver.employee
             if approver_employee:
                 approver_name = f"{approver_employee.first_name} {approver_employee.last_name}"
         
@@ -1624,7 +2164,7 @@ Attendance Details:
         message += "\nBest regards,\nHR Team"
         
         # Send email
-        await self.send_email(
+        await enqueue_email(
             to_email=user.email,
             subject=subject,
             body=message
@@ -1647,61 +2187,67 @@ Attendance Details:
             }
         )
     
+    @_single_transaction
     async def notify_missing_checkout_reported(self, attendance_id: int):
         """Notify managers about reported missing checkout"""
         
-        attendance = self.db.query(models.Attendance).filter(
-            models.Attendance.id == attendance_id
-        ).first()
+        # Get managers/HR/admin; nothing to build without recipients
+        managers = self._get_active_recipients(['manager', 'hr', 'admin'])
+        if not managers:
+            return
+        
+        attendance = self.db.get(
+            models.Attendance,
+            attendance_id,
+            options=[
+                joinedload(models.Attendance.employee)
+            ]
+        )
         
         if not attendance or not attendance.employee:
             return
         
         employee = attendance.employee
         
-        # Get managers/HR/admin
-        managers = self.db.query(models.User).filter(
-            models.User.role.in_(['manager', 'hr', 'admin']),
-            models.User.is_active == True
-        ).all()
+        # Only the recipient changes, so render the email and in-app text once
+        employee_name = f"{employee.first_name} {employee.last_name}"
+        date_label = attendance.date.strftime('%B %d, %Y')
+        subject = f"📤 Missing Checkout Reported - {employee_name}"
+        message = _MISSING_CHECKOUT_TEXT.format(
+            employee_name=employee_name,
+            department=employee.department or 'N/A',
+            date=date_label,
+            check_in=attendance.check_in.strftime('%I:%M %p'),
+            reason=attendance.flagged_reason or 'No reason provided'
+        )
+        in_app_message = f"{employee_name} reported missing checkout for {date_label}"
+        notification_data = {
+            "attendance_id": attendance.id,
+            "employee_name": employee_name,
+            "date": attendance.date.isoformat(),
+            "reason": attendance.flagged_reason
+        }
         
-        for manager in managers:
-            subject = f"📤 Missing Checkout Reported - {employee.first_name} {employee.last_name}"
-            
-            message = f"""
-Missing checkout has been reported:
-
-Employee: {employee.first_name} {employee.last_name}
-Department: {employee.department or 'N/A'}
-Date: {attendance.date.strftime('%B %d, %Y')}
-Check-in Time: {attendance.check_in.strftime('%I:%M %p')}
-Reason: {attendance.flagged_reason or 'No reason provided'}
-
-Please review and approve/reject this attendance record.
-
-Review Link: https://yourapp.com/dashboard/attendance
-            """.strip()
-            
-            await self.send_email(
-                to_email=manager.email,
-                subject=subject,
-                body=message
-            )
-            
-            # Create in-app notification
-            await self.create_in_app_notification(
-                user_id=manager.id,
-                title="Missing Checkout Reported",
-                message=f"{employee.first_name} {employee.last_name} reported missing checkout for {attendance.date.strftime('%B %d, %Y')}",
-                type="warning",
-                action_url="/dashboard/attendance",
-                notification_data={
-                    "attendance_id": attendance.id,
-                    "employee_name": f"{employee.first_name} {employee.last_name}",
-                    "date": attendance.date.isoformat(),
-                    "reason": attendance.flagged_reason
-                }
-            )
+        # Shared aliases should get the email only once
+        emails = list(dict.fromkeys(manager.email for manager in managers))
+        
+        # Emails go out in the background; only the in-app rows are awaited
+        await enqueue_email_many(emails, subject, message)
+        
+        try:
+            await self.create_in_app_notifications_bulk([
+                dict(
+                    user_id=manager.id,
+                    title="Missing Checkout Reported",
+                    message=in_app_message,
+                    type="warning",
+                    action_url="/dashboard/attendance",
+                    notification_data=notification_data
+                )
+                for manager in managers
+            ])
+        except SQLAlchemyError:
+            logger.exception("Missing checkout in-app notifications failed")
 
     # ========================================
     # HELPER METHODS
@@ -1717,26 +2263,232 @@ Review Link: https://yourapp.com/dashboard/attendance
         status: str = "sent",
         error_message: Optional[str] = None
     ):
-        """Log notification to database"""
+        """Log notification to database
+        
+        Inside notification_batch() rows are buffered and written together
+        when the batch ends or the buffer fills.
+        """
+        
+        self._log_buffer.append((user_email, {
+            "type": type,
+            "subject": subject,
+            "message": message,
+            "status": status,
+            "error_message": error_message
+        }))
+        if not self._batch_depth or len(self._log_buffer) >= LOG_BUFFER_SIZE:
+            self._flush_logs()
+    
+    def _flush_logs(self):
+        """Write buffered notification logs with one user lookup and one INSERT"""
         
-        # Find user by email or phone
-        user_id = None
-        if user_email:
-            user = self.db.query(models.User).filter(models.User.email == user_email).first()
-            if user:
-                user_id = user.id
+        buffer, self._log_buffer = self._log_buffer, []
+        if not buffer:
+            return
         
-        log = models.NotificationLog(
-            user_id=user_id,
-            type=type,
-            subject=subject,
-            message=message,
-            status=status,
-            error_message=error_message
-        )
+        try:
+            # Find users by email
+            emails = {email for email, _ in buffer if email}
+            user_ids = {}
+            if emails:
+                user_ids = dict(self.db.query(models.User.email, models.User.id).filter(
+                    models.User.email.in_(emails)
+                ).all())
+            
+            self.db.bulk_insert_mappings(models.NotificationLog, [
+                {**fields, "user_id": user_ids.get(email)}
+                for email, fields in buffer
+            ])
+            self._commit()
+            
+        except SQLAlchemyError:
+            self._rollback()
+            logger.exception("_log_notification failed")
+    
+    def _get_active_recipients(self, roles: List[str]) -> tuple:
+        """Active users holding any of the given roles, cached for RECIPIENT_CACHE_TTL
+        
+        The list is also pinned on this service instance, so every notify_*
+        call in one request sees the same recipients.
+        """
+        
+        key = tuple(sorted(roles))
+        if key in self._recipients:
+            return self._recipients[key]
+        
+        now = time.monotonic()
+        cached = _recipient_cache.get(key)
+        if cached and cached[0] > now:
+            self._recipients[key] = cached[1]
+            return cached[1]
+        
+        # Column rows rather than User instances; no ORM hydration needed
+        version = _recipient_cache_version
+        rows = self.db.query(models.User.id, models.User.email).filter(
+            models.User.role.in_(key),
+            models.User.is_active == True
+        ).all()
+        recipients = tuple(Recipient(row.id, row.email) for row in rows)
+        
+        # A role change that landed mid-query may not be reflected; don't cache it
+        if version == _recipient_cache_version:
+            _recipient_cache[key] = (now + RECIPIENT_CACHE_TTL, recipients)
+        self._recipients[key] = recipients
+        return recipients
+    
+    def _rollback(self):
+        """Reset a failed session so later calls don't each hit PendingRollbackError"""
+        try:
+            self.db.rollback()
+        except SQLAlchemyError:
+            logger.exception("Session rollback failed")
+    
+    @contextmanager
+    def notification_batch(self):
+        """Defer notification commits until the outermost batch exits
+        
+        Like database.transaction(), the outermost batch commits only if
+        its block finished and rolls the session back if it raised.
+        """
+        
+        self._batch_depth += 1
+        try:
+            yield
+        except Exception:
+            if self._batch_depth == 1:
+                # Nothing from the batch is kept or announced
+                self._log_buffer.clear()
+                self._pending_realtime.clear()
+                self._rollback()
+            raise
+        else:
+            if self._batch_depth == 1:
+                self._flush_logs()
+                try:
+                    self.db.commit()
+                except SQLAlchemyError:
+                    self._pending_realtime.clear()
+                    self._rollback()
+                    logger.exception("Notification batch commit failed")
+        finally:
+            self._batch_depth -= 1
+    
+    def _commit(self):
+        """Commit now, or just flush when inside notification_batch()"""
         
-        self.db.add(log)
-        self.db.commit()
+        if self._batch_depth:
+            self.db.flush()
+        else:
+            self.db.commit()
+
+# ============================================
+# OUTBOUND EMAIL QUEUE
+# ============================================
+
+# The queue is in memory: anything still queued when the process stops is lost.
+# It lives on the server's event loop, started from the app lifespan; callers on
+# any other loop (asyncio.run() in payroll, asset acknowledgment's own loops)
+# send inline instead, since workers on a short-lived loop die with it.
+EMAIL_QUEUE_WORKERS = 4
+_email_queue: Optional[asyncio.Queue] = None
+_email_queue_loop: Optional[asyncio.AbstractEventLoop] = None
+_email_workers: List[asyncio.Task] = []
+
+
+def start_email_queue() -> None:
+    """Create the email queue and its workers on the running loop (call on startup)"""
+    global _email_queue, _email_queue_loop
+    
+    _email_queue = asyncio.Queue()
+    _email_queue_loop = asyncio.get_running_loop()
+    _email_workers[:] = [
+        asyncio.create_task(_email_worker(_email_queue))
+        for _ in range(EMAIL_QUEUE_WORKERS)
+    ]
+
+
+async def stop_email_queue():
+    """Deliver what's queued, then stop the workers (call on shutdown)"""
+    global _email_queue, _email_queue_loop
+    
+    await drain_email_queue()
+    for worker in _email_workers:
+        worker.cancel()
+    await asyncio.gather(*_email_workers, return_exceptions=True)
+    _email_workers.clear()
+    _email_queue = None
+    _email_queue_loop = None
+
+
+async def enqueue_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None
+) -> None:
+    """Queue an email for the background workers and return immediately"""
+    
+    await enqueue_email_batch([{
+        "to_email": to_email,
+        "subject": subject,
+        "body": body,
+        "html_body": html_body
+    }])
+
+
+async def enqueue_email_many(
+    recipients: List[str],
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None
+) -> None:
+    """Queue one pre-rendered email to many recipients"""
+    
+    await enqueue_email_batch([
+        {"to_email": to_email, "subject": subject, "body": body, "html_body": html_body}
+        for to_email in recipients
+    ])
+
+
+async def enqueue_email_batch(messages: List[Dict[str, Any]]) -> None:
+    """Queue several emails to go out through one send_email_batch() call,
+    or send them inline when not running on the queue's loop"""
+    
+    if not messages:
+        return
+    
+    if _email_queue is not None and asyncio.get_running_loop() is _email_queue_loop:
+        _email_queue.put_nowait(messages)
+        return
+    
+    await _deliver_email_batch(messages)
+
+
+async def drain_email_queue():
+    """Wait for queued emails to be delivered (call on shutdown)"""
+    if _email_queue is not None:
+        await _email_queue.join()
+
+
+async def _deliver_email_batch(messages: List[Dict[str, Any]]):
+    """Send a batch with a session of its own, since the caller's may be gone"""
+    db = SessionLocal()
+    try:
+        await NotificationService(db).send_email_batch(messages)
+    except Exception:
+        logger.exception("Batch of %d emails failed", len(messages))
+    finally:
+        db.close()
+
+
+async def _email_worker(email_queue: asyncio.Queue):
+    """Deliver queued emails until cancelled"""
+    while True:
+        messages = await email_queue.get()
+        try:
+            await _deliver_email_batch(messages)
+        finally:
+            email_queue.task_done()
 
 # ============================================
 # SINGLETON INSTANCE
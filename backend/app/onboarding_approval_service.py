@@ -4,15 +4,35 @@ Handles the gatekeeper model for onboarding workflow where IT provisioning
 only happens after compliance approval
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Dict, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
 from . import models
+from .database import transactional
 from .notification_service import NotificationService
 from .it_provisioning_service import ITProvisioningService
 import json
 import secrets
-import string
+
+
+# (form completed, documents verified, compliance approved, IT provisioned)
+# -> (phase number, phase name)
+ONBOARDING_PHASES = {
+    (False, False, False, False): (2, "Information Form"),
+    (True, False, False, False): (3, "Document Upload"),
+    (True, True, False, False): (3, "Compliance Review"),
+    (True, True, True, False): (4, "IT Provisioning"),
+    (True, True, True, True): (5, "Induction & Activation"),
+}
+
+
+@lru_cache(maxsize=1)
+def _ticket_date(ordinal: int) -> str:
+    """YYYYMMDD for a day ordinal, formatted once per day"""
+    return date.fromordinal(ordinal).strftime("%Y%m%d")
 
 
 class OnboardingApprovalService:
@@ -21,42 +41,38 @@ class OnboardingApprovalService:
         self.notification_service = NotificationService(db)
         self.it_service = ITProvisioningService(db)
     
+    @transactional
     def get_compliance_status(self, employee_id: int) -> Dict:
         """
         Get compliance gate status for an employee
         """
-        employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+        employee = self.db.get(models.Employee, employee_id)
         if not employee:
             return {"error": "Employee not found"}
         
         # Get or create onboarding approval record
-        approval = self.db.query(models.OnboardingApproval).filter(
-            models.OnboardingApproval.employee_id == employee_id,
-            models.OnboardingApproval.approval_stage == "compliance_review"
-        ).first()
+        approval = self._get_or_create_approval(employee_id)
         
-        if not approval:
-            approval = models.OnboardingApproval(
-                employee_id=employee_id,
-                approval_stage="compliance_review",
-                status="pending"
-            )
-            self.db.add(approval)
-            self.db.commit()
-            self.db.refresh(approval)
+        return self._compliance_status(employee, approval)
+    
+    def _compliance_status(self, employee: models.Employee, approval: models.OnboardingApproval) -> Dict:
+        """Build the compliance gate status from an already loaded employee and approval"""
         
         # Check form completion
         form_completed = employee.profile_summary is not None
         
-        # Check document verification
-        documents = self.db.query(models.EmployeeDocument).filter(
-            models.EmployeeDocument.employee_id == employee_id
-        ).all()
+        # Check document verification (counted in the database)
+        total_documents, verified_documents = self.db.query(
+            func.count(models.EmployeeDocument.id),
+            func.count(models.EmployeeDocument.id).filter(models.EmployeeDocument.is_verified == True)
+        ).filter(
+            models.EmployeeDocument.employee_id == employee.id
+        ).one()
         
-        documents_verified = len(documents) > 0 and all(doc.is_verified for doc in documents)
+        documents_verified = total_documents > 0 and total_documents == verified_documents
         
         return {
-            "employee_id": employee_id,
+            "employee_id": employee.id,
             "compliance_gate_status": approval.status,
             "form_completed": form_completed,
             "documents_verified": documents_verified,
@@ -67,6 +83,7 @@ class OnboardingApprovalService:
             "compliance_approved_at": approval.compliance_approved_at.isoformat() if approval.compliance_approved_at else None
         }
     
+    @transactional
     def submit_for_compliance_review(self, employee_id: int) -> Dict:
         """Submit employee data for compliance review"""
         employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
@@ -77,24 +94,8 @@ class OnboardingApprovalService:
         if not employee.profile_summary:
             return {"success": False, "message": "Employee information form must be completed first"}
         
-        # Get or create approval record
-        approval = self.db.query(models.OnboardingApproval).filter(
-            models.OnboardingApproval.employee_id == employee_id,
-            models.OnboardingApproval.approval_stage == "compliance_review"
-        ).first()
-        
-        if not approval:
-            approval = models.OnboardingApproval(
-                employee_id=employee_id,
-                approval_stage="compliance_review",
-                status="pending"
-            )
-            self.db.add(approval)
-        
-        approval.status = "pending"
-        approval.form_data_locked = True  # Lock form data for review
-        
-        self.db.commit()
+        # Create or reset the approval record, locking form data for review
+        self._get_or_create_approval(employee_id, status="pending", form_data_locked=True)
         
         return {
             "success": True,
@@ -102,63 +103,68 @@ class OnboardingApprovalService:
             "status": "pending_review"
         }
     
+    @transactional
     def approve_compliance_and_request_it(self, request_data: Dict, reviewer_id: int) -> Dict:
         """Approve compliance and create IT provisioning ticket (GATEKEEPER)"""
         employee_id = request_data["employee_id"]
         
-        employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
-        if not employee:
-            return {"success": False, "message": "Employee not found"}
-        
-        # Get approval record
-        approval = self.db.query(models.OnboardingApproval).filter(
-            models.OnboardingApproval.employee_id == employee_id,
-            models.OnboardingApproval.approval_stage == "compliance_review"
-        ).first()
+        # Approve compliance in one UPDATE; no row back means there was
+        # nothing to approve
+        approved_at = datetime.utcnow()
+        approval_id = self.db.execute(
+            update(models.OnboardingApproval)
+            .where(
+                models.OnboardingApproval.employee_id == employee_id,
+                models.OnboardingApproval.approval_stage == "compliance_review"
+            )
+            .values(
+                status="approved",
+                reviewed_by=reviewer_id,
+                approved_at=approved_at,
+                compliance_approved_at=approved_at,
+                review_notes=request_data.get("review_notes", "")
+            )
+            .returning(models.OnboardingApproval.id)
+        ).scalar_one_or_none()
         
-        if not approval:
+        if approval_id is None:
+            employee = self.db.get(models.Employee, employee_id)
+            if not employee:
+                return {"success": False, "message": "Employee not found"}
             return {"success": False, "message": "No compliance review record found"}
         
-        # Approve compliance
-        approval.status = "approved"
-        approval.reviewed_by = reviewer_id
-        approval.approved_at = datetime.utcnow()
-        approval.compliance_approved_at = datetime.utcnow()
-        approval.review_notes = request_data.get("review_notes", "")
-        
         # Generate IT ticket number
         ticket_number = self._generate_ticket_number()
         
-        # Create IT provisioning ticket
-        it_ticket = models.ITProvisioningTicket(
-            ticket_number=ticket_number,
-            employee_id=employee_id,
-            approval_id=approval.id,
-            verified_full_name=request_data["verified_full_name"],
-            verified_email_prefix=request_data["verified_email_prefix"],
-            verified_department=request_data["verified_department"],
-            verified_position=request_data["verified_position"],
-            priority=request_data.get("priority", "normal"),
-            requested_resources={
-                "email": True,
-                "vpn": True,
-                "access_card": True,
-                "hardware": True
-            },
-            status="open"
-        )
-        
-        self.db.add(it_ticket)
-        self.db.commit()
-        self.db.refresh(it_ticket)
+        # Create IT provisioning ticket; RETURNING replaces the refresh
+        ticket_id = self.db.execute(
+            insert(models.ITProvisioningTicket).values(
+                ticket_number=ticket_number,
+                employee_id=employee_id,
+                approval_id=approval_id,
+                verified_full_name=request_data["verified_full_name"],
+                verified_email_prefix=request_data["verified_email_prefix"],
+                verified_department=request_data["verified_department"],
+                verified_position=request_data["verified_position"],
+                priority=request_data.get("priority", "normal"),
+                requested_resources={
+                    "email": True,
+                    "vpn": True,
+                    "access_card": True,
+                    "hardware": True
+                },
+                status="open"
+            ).returning(models.ITProvisioningTicket.id)
+        ).scalar_one()
         
         return {
             "success": True,
             "message": f"Compliance approved and IT ticket {ticket_number} created",
             "ticket_number": ticket_number,
-            "ticket_id": it_ticket.id
+            "ticket_id": ticket_id
         }
     
+    @transactional
     def process_it_provisioning(self, ticket_id: int, it_admin_id: int) -> Dict:
         """Process IT provisioning ticket"""
         ticket = self.db.query(models.ITProvisioningTicket).filter(
@@ -197,8 +203,6 @@ class OnboardingApprovalService:
             ticket.status = "failed"
             ticket.it_notes = f"Provisioning failed: {provisioning_result['message']}"
         
-        self.db.commit()
-        
         return {
             "success": provisioning_result["success"],
             "message": provisioning_result["message"],
@@ -207,39 +211,41 @@ class OnboardingApprovalService:
             "failed_resources": provisioning_result.get("failed_resources", [])
         }
     
+    @transactional
     def get_onboarding_progress(self, employee_id: int) -> Dict:
         """Get detailed onboarding progress"""
-        employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+        # Approvals and IT tickets ride along with the employee
+        employee = self.db.get(
+            models.Employee,
+            employee_id,
+            options=[
+                joinedload(models.Employee.onboarding_approvals),
+                joinedload(models.Employee.it_tickets)
+            ]
+        )
         if not employee:
             return {"error": "Employee not found"}
         
-        # Calculate current phase based on completion status
-        current_phase = 1
-        phase_name = "Pre-Boarding"
-        
         # Check compliance status
-        compliance_status = self.get_compliance_status(employee_id)
-        
-        # Determine current phase
-        if employee.profile_summary and compliance_status["documents_verified"]:
-            if compliance_status["compliance_gate_status"] == "approved":
-                current_phase = 4
-                phase_name = "IT Provisioning"
-                
-                # Check if IT provisioning is complete
-                it_resources = self.it_service.get_employee_it_resources(employee_id)
-                if it_resources.get("email") and it_resources.get("vpn"):
-                    current_phase = 5
-                    phase_name = "Induction & Activation"
-            else:
-                current_phase = 3
-                phase_name = "Compliance Review"
-        elif employee.profile_summary:
-            current_phase = 3
-            phase_name = "Document Upload"
-        else:
-            current_phase = 2
-            phase_name = "Information Form"
+        approval = next(
+            (a for a in employee.onboarding_approvals if a.approval_stage == "compliance_review"),
+            None
+        ) or self._get_or_create_approval(employee_id)
+        compliance_status = self._compliance_status(employee, approval)
+        
+        # Determine current phase; each gate only counts once the previous one is met
+        form_completed = bool(employee.profile_summary)
+        documents_verified = form_completed and compliance_status["documents_verified"]
+        approved = documents_verified and compliance_status["compliance_gate_status"] == "approved"
+        it_done = False
+        if approved:
+            # Check if IT provisioning is complete
+            has_email, has_vpn = self.it_service.has_email_and_vpn(employee_id)
+            it_done = has_email and has_vpn
+        
+        current_phase, phase_name = ONBOARDING_PHASES[
+            (form_completed, documents_verified, approved, it_done)
+        ]
         
         # Calculate completion percentage
         completion_percentage = min(current_phase * 20, 100)
@@ -258,7 +264,8 @@ class OnboardingApprovalService:
             "is_immediate_joiner": employee.is_immediate_joiner or False,
             "compliance_gate_status": compliance_status["compliance_gate_status"],
             "form_data_locked": compliance_status["form_data_locked"],
-            "it_provisioning_status": self._get_it_provisioning_status(employee_id)
+            # Tickets are loaded newest first
+            "it_provisioning_status": employee.it_tickets[0].status if employee.it_tickets else "not_started"
         }
     
     def advance_to_next_phase(self, employee_id: int) -> Dict:
@@ -277,6 +284,7 @@ class OnboardingApprovalService:
             "new_phase": current_phase + 1
         }
     
+    @transactional
     def activate_employee(self, employee_id: int, admin_id: int) -> Dict:
         """Final employee activation"""
         employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
@@ -286,8 +294,6 @@ class OnboardingApprovalService:
         employee.onboarding_status = "completed"
         employee.is_active = True
         
-        self.db.commit()
-        
         return {
             "success": True,
             "message": f"Employee {employee.first_name} {employee.last_name} has been activated",
@@ -313,19 +319,45 @@ class OnboardingApprovalService:
             "prerequisites_met": can_proceed
         }
     
+    def _get_or_create_approval(
+        self,
+        employee_id: int,
+        stage: str = "compliance_review",
+        **updates
+    ) -> models.OnboardingApproval:
+        """Fetch an employee's approval record for a stage, creating it if missing
+        
+        With updates, the record is created or updated in a single upsert.
+        """
+        stmt = insert(models.OnboardingApproval).values(
+            employee_id=employee_id,
+            approval_stage=stage,
+            **{"status": "pending", **updates}
+        )
+        index_elements = ["employee_id", "approval_stage"]
+        
+        if updates:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=updates)
+            approval = self.db.scalars(
+                stmt.returning(models.OnboardingApproval),
+                execution_options={"populate_existing": True}
+            ).one()
+            return approval
+        
+        # Read path: the record usually exists, so look first rather than
+        # turning every status check into a write
+        query = self.db.query(models.OnboardingApproval).filter(
+            models.OnboardingApproval.employee_id == employee_id,
+            models.OnboardingApproval.approval_stage == stage
+        )
+        approval = query.first()
+        if not approval:
+            self.db.execute(stmt.on_conflict_do_nothing(index_elements=index_elements))
+            approval = query.one()
+        return approval
+    
     def _generate_ticket_number(self) -> str:
         """Generate unique IT ticket number"""
-        timestamp = datetime.now().strftime("%Y%m%d")
-        random_suffix = ''.join(secrets.choice(string.digits) for _ in range(4))
+        timestamp = _ticket_date(date.today().toordinal())
+        random_suffix = f"{secrets.randbelow(10000):04d}"
         return f"IT-{timestamp}-{random_suffix}"
-    
-    def _get_it_provisioning_status(self, employee_id: int) -> str:
-        """Get IT provisioning status for employee"""
-        ticket = self.db.query(models.ITProvisioningTicket).filter(
-            models.ITProvisioningTicket.employee_id == employee_id
-        ).first()
-        
-        if not ticket:
-            return "not_started"
-        
-        return ticket.status
\ No newline at end of file
@@ -1,40 +1,321 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, extract
-from typing import Dict, List, Optional, Any
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, case, extract, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field, fields
+from collections import OrderedDict
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
-import json
+from functools import lru_cache
+from html import escape
+import asyncio
 import logging
+import threading
+import numpy as np
+import orjson
 from app import models, schemas
 from app.attendance_service import AttendanceService
 from app.notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
 
+# Optional JIT for the statutory deduction kernel (pip install numba)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+_CENT = Decimal('0.01')
+
+# Salary structure components pro-rated by attendance, in earnings order
+_PRORATED_COMPONENTS = (
+    "basic_salary", "hra", "transport_allowance",
+    "medical_allowance", "special_allowance", "other_allowances"
+)
+
+# Attendance statuses that count towards worked days and overtime
+_WORKED_STATUSES = ('present', 'half_day')
+_STANDARD_DAY_HOURS = 8
+
+
+def _month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """[start, end) of a calendar month, so date filters can use an index"""
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def _statutory_deductions_numpy(basic: np.ndarray, gross: np.ndarray):
+    """Unrounded PF, ESI, professional tax and monthly income tax per employee
+
+    Same formulas as PayrollService._calculate_pf/_esi/_professional_tax/
+    _income_tax, one column per deduction.
+    """
+    taxable = np.maximum(0, gross * 12 - 50000)
+    annual_tax = np.select(
+        [taxable <= 250000, taxable <= 500000, taxable <= 1000000],
+        [0.0, (taxable - 250000) * 0.05, 12500 + (taxable - 500000) * 0.20],
+        112500 + (taxable - 1000000) * 0.30
+    )
+    return (
+        np.minimum(basic, 15000) * 0.12,
+        np.where(gross <= 25000, gross * 0.0075, 0.0),
+        np.select([gross <= 15000, gross <= 20000], [0.0, 150.0], 200.0),
+        annual_tax / 12
+    )
+
+
+if NUMBA_AVAILABLE:
+    # Loop form of the NumPy version above. No fastmath: reassociating these
+    # sums could move an amount across a rounding boundary
+    @njit(cache=True)
+    def _statutory_deductions(basic, gross):
+        count = gross.shape[0]
+        pf = np.empty(count)
+        esi = np.empty(count)
+        professional_tax = np.empty(count)
+        income_tax = np.empty(count)
+        for i in range(count):
+            pf[i] = min(basic[i], 15000.0) * 0.12
+            esi[i] = gross[i] * 0.0075 if gross[i] <= 25000 else 0.0
+            if gross[i] <= 15000:
+                professional_tax[i] = 0.0
+            elif gross[i] <= 20000:
+                professional_tax[i] = 150.0
+            else:
+                professional_tax[i] = 200.0
+            
+            taxable = max(0.0, gross[i] * 12 - 50000)
+            if taxable <= 250000:
+                tax = 0.0
+            elif taxable <= 500000:
+                tax = (taxable - 250000) * 0.05
+            elif taxable <= 1000000:
+                tax = 12500 + (taxable - 500000) * 0.20
+            else:
+                tax = 112500 + (taxable - 1000000) * 0.30
+            income_tax[i] = tax / 12
+        return pf, esi, professional_tax, income_tax
+else:
+    _statutory_deductions = _statutory_deductions_numpy
+
+
+def _round_amounts(values: np.ndarray) -> np.ndarray:
+    """Vector form of PayrollService._round_amount"""
+    rounded = np.round(values, 2)
+    # Same near-tie test as the scalar version; those go through Decimal
+    ties = (np.abs(values) >= 1e9) | (np.abs(np.abs(values * 100) % 1 - 0.5) <= 1e-6)
+    for i in np.flatnonzero(ties):
+        rounded[i] = float(Decimal(str(float(values[i]))).quantize(_CENT, rounding=ROUND_HALF_UP))
+    return rounded
+
+
+@dataclass(slots=True)
+class PayrollRow:
+    """Column values for one employee's calculated month, ready to upsert"""
+    employee_id: int
+    month: str
+    basic_salary: float
+    hra: float
+    transport_allowance: float
+    medical_allowance: float
+    special_allowance: float
+    other_allowances: float
+    bonus: float
+    overtime_amount: float
+    pf: float
+    esi: float
+    professional_tax: float
+    income_tax: float
+    loan_deduction: float
+    other_deductions: float
+    total_working_days: int
+    actual_working_days: float
+    leave_days: int
+    overtime_hours: float
+    gross_salary: float
+    total_deductions: float
+    net_salary: float
+    calculated_by: Optional[int]
+    calculation_notes: str
+    manual_adjustments: Dict[str, Any] = field(default_factory=dict)
+    status: str = "calculated"
+
+
+_PAYROLL_ROW_FIELDS = tuple(row_field.name for row_field in fields(PayrollRow))
+
+
+@lru_cache(maxsize=None)
+def _payroll_upsert(columns: Tuple[str, ...]):
+    """INSERT ... ON CONFLICT (employee_id, month) DO UPDATE over the given columns"""
+    stmt = insert(models.Payroll)
+    return stmt.on_conflict_do_update(
+        index_elements=["employee_id", "month"],
+        set_={column: stmt.excluded[column] for column in columns if column not in ("employee_id", "month")}
+    ).returning(models.Payroll, sort_by_parameter_order=True)
+
+# SMTP sessions used in parallel for a bulk payslip run; stays below the
+# notification service's EMAIL_CONCURRENCY
+PAYSLIP_EMAIL_SESSIONS = 4
+# Payslips rendered and sent per wave, bounding memory on large runs
+PAYSLIP_EMAIL_WAVE = 500
+# Progress is logged roughly this many times per bulk run, never per payslip
+PAYSLIP_PROGRESS_STEPS = 100
+
+# Serialised payslip figures for payrolls that can no longer change, keyed on
+# (payroll_id, updated_at) so any later write misses the cache. Only columns
+# of the payroll row are cached; employee details are encoded per request
+PAYSLIP_CACHE_SIZE = 4096
+_CACHEABLE_PAYSLIP_STATUSES = ("approved", "paid")
+_payslip_json_cache: "OrderedDict[Tuple[int, Optional[datetime]], bytes]" = OrderedDict()
+_payslip_json_lock = threading.Lock()
+
+# Payslip email body; only the fields are substituted per send
+_PAYSLIP_EMAIL_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; }}
+        .payslip-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
+        .payslip-table th, .payslip-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+        .payslip-table th {{ background-color: #f2f2f2; }}
+        .summary {{ background-color: #e9ecef; padding: 15px; margin: 20px 0; }}
+        .amount {{ text-align: right; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h2>Dhanush Healthcare Pvt. Ltd.</h2>
+        <h3>Payslip for {period[month]}</h3>
+    </div>
+    
+    <div>
+        <h4>Employee Details</h4>
+        <p><strong>Name:</strong> {employee[name]}</p>
+        <p><strong>Employee Code:</strong> {employee[employee_code]}</p>
+        <p><strong>Designation:</strong> {employee[designation]}</p>
+        <p><strong>Department:</strong> {employee[department]}</p>
+    </div>
+    
+    <div>
+        <h4>Attendance Summary</h4>
+        <p><strong>Total Working Days:</strong> {period[total_working_days]}</p>
+        <p><strong>Actual Working Days:</strong> {period[actual_working_days]}</p>
+        <p><strong>Leave Days:</strong> {period[leave_days]}</p>
+        <p><strong>Overtime Hours:</strong> {period[overtime_hours]}</p>
+    </div>
+    
+    <table class="payslip-table">
+        <tr>
+            <th colspan="2">Earnings</th>
+            <th colspan="2">Deductions</th>
+        </tr>
+        <tr>
+            <td>Basic Salary</td>
+            <td class="amount">₹{earnings[basic_salary]:,.2f}</td>
+            <td>PF</td>
+            <td class="amount">₹{deductions[pf]:,.2f}</td>
+        </tr>
+        <tr>
+            <td>HRA</td>
+            <td class="amount">₹{earnings[hra]:,.2f}</td>
+            <td>ESI</td>
+            <td class="amount">₹{deductions[esi]:,.2f}</td>
+        </tr>
+        <tr>
+            <td>Transport Allowance</td>
+            <td class="amount">₹{earnings[transport_allowance]:,.2f}</td>
+            <td>Professional Tax</td>
+            <td class="amount">₹{deductions[professional_tax]:,.2f}</td>
+        </tr>
+        <tr>
+            <td>Medical Allowance</td>
+            <td class="amount">₹{earnings[medical_allowance]:,.2f}</td>
+            <td>Income Tax</td>
+            <td class="amount">₹{deductions[income_tax]:,.2f}</td>
+        </tr>
+        <tr>
+            <td>Special Allowance</td>
+            <td class="amount">₹{earnings[special_allowance]:,.2f}</td>
+            <td>Loan Deduction</td>
+            <td class="amount">₹{deductions[loan_deduction]:,.2f}</td>
+        </tr>
+        <tr>
+            <td>Overtime Amount</td>
+            <td class="amount">₹{earnings[overtime_amount]:,.2f}</td>
+            <td>Other Deductions</td>
+            <td class="amount">₹{deductions[other_deductions]:,.2f}</td>
+        </tr>
+        <tr>
+            <td>Other Allowances</td>
+            <td class="amount">₹{earnings[other_allowances]:,.2f}</td>
+            <td></td>
+            <td></td>
+        </tr>
+        <tr style="font-weight: bold;">
+            <td>Total Earnings</td>
+            <td class="amount">₹{earnings[total]:,.2f}</td>
+            <td>Total Deductions</td>
+            <td class="amount">₹{deductions[total]:,.2f}</td>
+        </tr>
+    </table>
+    
+    <div class="summary">
+        <h4>Summary</h4>
+        <p><strong>Gross Salary:</strong> ₹{summary[gross_salary]:,.2f}</p>
+        <p><strong>Total Deductions:</strong> ₹{summary[total_deductions]:,.2f}</p>
+        <p style="font-size: 18px; color: #28a745;"><strong>Net Salary:</strong> ₹{summary[net_salary]:,.2f}</p>
+    </div>
+    
+    <div style="margin-top: 30px; font-size: 12px; color: #666;">
+        <p>This is a system-generated payslip. For any queries, please contact HR department.</p>
+        <p>Generated on: {generated_on}</p>
+    </div>
+</body>
+</html>
+"""
+
+
 class PayrollService:
     def __init__(self, db: Session):
         self.db = db
         self.attendance_service = AttendanceService(db)
         self.notification_service = NotificationService(db)
+        # (year, month) -> working days; identical for every employee in a run
+        self._working_days: Dict[Tuple[int, int], int] = {}
 
     def calculate_employee_payroll(
         self, 
         employee_id: int, 
         month: str, 
         manual_adjustments: Optional[Dict] = None,
-        calculated_by: int = None
+        calculated_by: int = None,
+        employee: Optional[models.Employee] = None,
+        salary_structure: Optional[models.SalaryStructure] = None,
+        attendance_totals: Optional[Tuple[float, float]] = None,
+        persist: bool = True
     ) -> Dict[str, Any]:
         """
         Calculate comprehensive payroll for an employee for a given month
+
+        Bulk callers pass the prefetched employee, salary structure and
+        attendance totals; anything left as None is looked up here. With
+        persist=False nothing is written and the result carries the row as
+        "payroll_data" for the caller to upsert with the rest of the batch.
         """
         try:
             # Get employee details
-            employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+            if employee is None:
+                employee = self.db.query(models.Employee).filter(models.Employee.id == employee_id).first()
             if not employee:
                 return {"success": False, "error": "Employee not found"}
 
             # Get salary structure
-            salary_structure = self._get_active_salary_structure(employee_id, month)
+            if salary_structure is None:
+                salary_structure = self._get_active_salary_structure(employee_id, month)
             if not salary_structure:
                 return {"success": False, "error": "No active salary structure found"}
 
@@ -42,7 +323,7 @@ class PayrollService:
             year, month_num = map(int, month.split('-'))
             
             # Get working days and attendance data
-            attendance_data = self._get_attendance_data(employee_id, year, month_num)
+            attendance_data = self._get_attendance_data(employee_id, year, month_num, attendance_totals)
             
             # Calculate earnings
             earnings = self._calculate_earnings(salary_structure, attendance_data, manual_adjustments)
@@ -50,74 +331,80 @@ class PayrollService:
             # Calculate deductions
             deductions = self._calculate_deductions(earnings, salary_structure, manual_adjustments)
             
-            # Calculate net salary
-            gross_salary = sum(earnings.values())
-            total_deductions = sum(deductions.values())
-            net_salary = gross_salary - total_deductions
-
-            # Create or update payroll record
-            payroll_data = {
-                "employee_id": employee_id,
-                "month": month,
-                "basic_salary": earnings.get("basic_salary", 0),
-                "hra": earnings.get("hra", 0),
-                "transport_allowance": earnings.get("transport_allowance", 0),
-                "medical_allowance": earnings.get("medical_allowance", 0),
-                "special_allowance": earnings.get("special_allowance", 0),
-                "bonus": earnings.get("bonus", 0),
-                "overtime_amount": earnings.get("overtime_amount", 0),
-                "other_allowances": earnings.get("other_allowances", 0),
-                "pf": deductions.get("pf", 0),
-                "esi": deductions.get("esi", 0),
-                "professional_tax": deductions.get("professional_tax", 0),
-                "income_tax": deductions.get("income_tax", 0),
-                "loan_deduction": deductions.get("loan_deduction", 0),
-                "other_deductions": deductions.get("other_deductions", 0),
-                "total_working_days": attendance_data["total_working_days"],
-                "actual_working_days": attendance_data["actual_working_days"],
-                "leave_days": attendance_data["leave_days"],
-                "overtime_hours": attendance_data["overtime_hours"],
-                "gross_salary": gross_salary,
-                "total_deductions": total_deductions,
-                "net_salary": net_salary,
-                "status": "calculated",
-                "calculated_by": calculated_by,
-                "manual_adjustments": manual_adjustments or {},
-                "calculation_notes": f"Calculated on {datetime.utcnow().isoformat()}"
-            }
-
-            # Check if payroll already exists
-            existing_payroll = self.db.query(models.Payroll).filter(
-                and_(models.Payroll.employee_id == employee_id, models.Payroll.month == month)
-            ).first()
-
-            if existing_payroll:
-                # Update existing record
-                for key, value in payroll_data.items():
-                    setattr(existing_payroll, key, value)
-                existing_payroll.updated_at = datetime.utcnow()
-                payroll = existing_payroll
-            else:
-                # Create new record
-                payroll = models.Payroll(**payroll_data)
-                self.db.add(payroll)
-
-            self.db.commit()
-            self.db.refresh(payroll)
+            payroll_data = self._build_payroll_row(
+                employee_id, month, earnings, deductions, attendance_data, calculated_by, manual_adjustments
+            )
 
-            return {
+            result = {
                 "success": True,
-                "payroll": payroll,
                 "earnings": earnings,
                 "deductions": deductions,
                 "attendance_data": attendance_data
             }
+            if not persist:
+                result["payroll_data"] = payroll_data
+                return result
+
+            # Create or update the payroll record in one statement
+            result["payroll"] = self._upsert_payrolls([payroll_data])[0]
+            self.db.commit()
+            return result
 
         except Exception as e:
             logger.error(f"Error calculating payroll for employee {employee_id}: {str(e)}")
-            self.db.rollback()
+            if persist:
+                self.db.rollback()
             return {"success": False, "error": str(e)}
 
+    def _build_payroll_row(
+        self,
+        employee_id: int,
+        month: str,
+        earnings: Dict[str, float],
+        deductions: Dict[str, float],
+        attendance_data: Dict[str, Any],
+        calculated_by: Optional[int],
+        manual_adjustments: Optional[Dict] = None
+    ) -> PayrollRow:
+        """Payroll column values for one employee's calculated month"""
+        # Calculate net salary
+        gross_salary = sum(earnings.values())
+        total_deductions = sum(deductions.values())
+
+        return PayrollRow(
+            **earnings,
+            **deductions,
+            employee_id=employee_id,
+            month=month,
+            total_working_days=attendance_data["total_working_days"],
+            actual_working_days=attendance_data["actual_working_days"],
+            leave_days=attendance_data["leave_days"],
+            overtime_hours=attendance_data["overtime_hours"],
+            gross_salary=gross_salary,
+            total_deductions=total_deductions,
+            net_salary=gross_salary - total_deductions,
+            calculated_by=calculated_by,
+            manual_adjustments=manual_adjustments or {},
+            calculation_notes=f"Calculated on {datetime.utcnow().isoformat()}"
+        )
+
+    def _upsert_payrolls(self, rows: List[PayrollRow]) -> List[models.Payroll]:
+        """Insert or update payroll rows keyed on (employee_id, month), in input order"""
+        if not rows:
+            return []
+        
+        # Rows only become dicts here, at the statement boundary
+        updated_at = datetime.utcnow()
+        params = [
+            {**{name: getattr(row, name) for name in _PAYROLL_ROW_FIELDS}, "updated_at": updated_at}
+            for row in rows
+        ]
+        return self.db.scalars(
+            _payroll_upsert(_PAYROLL_ROW_FIELDS + ("updated_at",)),
+            params,
+            execution_options={"populate_existing": True}
+        ).all()
+
     def _get_active_salary_structure(self, employee_id: int, month: str) -> Optional[models.SalaryStructure]:
         """Get the active salary structure for an employee for a given month"""
         month_date = datetime.strptime(f"{month}-01", "%Y-%m-%d").date()
@@ -129,35 +416,92 @@ class PayrollService:
             )
         ).order_by(models.SalaryStructure.effective_date.desc()).first()
 
-    def _get_attendance_data(self, employee_id: int, year: int, month: int) -> Dict[str, Any]:
+    def _bulk_get_active_salary_structures(
+        self,
+        employee_ids: List[int],
+        month: str
+    ) -> Dict[int, models.SalaryStructure]:
+        """Get the active salary structure of many employees in one query"""
+        month_date = datetime.strptime(f"{month}-01", "%Y-%m-%d").date()
+        
+        structures = self.db.query(models.SalaryStructure).filter(
+            and_(
+                models.SalaryStructure.employee_id.in_(employee_ids),
+                models.SalaryStructure.effective_date <= month_date
+            )
+        ).order_by(models.SalaryStructure.effective_date).all()
+        
+        # Oldest first, so the latest effective structure wins per employee
+        return {structure.employee_id: structure for structure in structures}
+
+    def _bulk_get_attendance_totals(
+        self,
+        employee_ids: List[int],
+        year: int,
+        month: int
+    ) -> Dict[int, Tuple[float, float]]:
+        """Sum worked days and overtime hours per employee with one GROUP BY query"""
+        month_start, month_end = _month_bounds(year, month)
+        attendance = models.Attendance
+        worked = attendance.status.in_(_WORKED_STATUSES)
+        # Hours beyond the 8 hour standard day, from the check-in/out timestamps
+        overtime = func.greatest(
+            extract('epoch', attendance.check_out - attendance.check_in) / 3600 - _STANDARD_DAY_HOURS, 0
+        )
+        stmt = select(
+            attendance.employee_id,
+            func.sum(case(
+                (attendance.status == 'present', 1),
+                (attendance.status == 'half_day', 0.5),
+                else_=0
+            )),
+            func.sum(case((worked, overtime), else_=0))
+        ).where(
+            attendance.employee_id.in_(employee_ids),
+            attendance.date >= month_start,
+            attendance.date < month_end
+        ).group_by(attendance.employee_id)
+        
+        return {
+            employee_id: (float(worked_days), float(overtime_hours))
+            for employee_id, worked_days, overtime_hours in self.db.execute(stmt)
+        }
+
+    def _prefetch_payroll_inputs(
+        self,
+        employee_ids: List[int],
+        month: str,
+        employees: Optional[List[models.Employee]] = None
+    ) -> Tuple[Dict[int, models.Employee], Dict[int, models.SalaryStructure], Dict[int, Tuple[float, float]]]:
+        """Load employees, salary structures and attendance for a batch up front"""
+        if employees is None:
+            employees = self.db.query(models.Employee).filter(models.Employee.id.in_(employee_ids)).all()
+        
+        year, month_num = map(int, month.split('-'))
+        return (
+            {employee.id: employee for employee in employees},
+            self._bulk_get_active_salary_structures(employee_ids, month),
+            self._bulk_get_attendance_totals(employee_ids, year, month_num)
+        )
+
+    def _get_attendance_data(
+        self,
+        employee_id: int,
+        year: int,
+        month: int,
+        attendance_totals: Optional[Tuple[float, float]] = None
+    ) -> Dict[str, Any]:
         """Get attendance data for payroll calculation"""
         try:
             # Get total working days in month (excluding weekends and holidays)
-            total_working_days = self.attendance_service.get_working_days_in_month(year, month)
-            
-            # Get employee attendance records for the month
-            attendance_records = self.db.query(models.Attendance).filter(
-                and_(
-                    models.Attendance.employee_id == employee_id,
-                    extract('year', models.Attendance.date) == year,
-                    extract('month', models.Attendance.date) == month
-                )
-            ).all()
-
-            # Calculate actual working days and overtime
-            actual_working_days = 0
-            overtime_hours = 0.0
-            
-            for record in attendance_records:
-                if record.status in ['present', 'half_day']:
-                    if record.status == 'present':
-                        actual_working_days += 1
-                    else:  # half_day
-                        actual_working_days += 0.5
-                    
-                    # Calculate overtime (assuming 8 hours standard work day)
-                    if record.total_hours and record.total_hours > 8:
-                        overtime_hours += record.total_hours - 8
+            total_working_days = self._get_working_days_in_month(year, month)
+            
+            # Worked days and overtime hours, summed in the database
+            if attendance_totals is None:
+                attendance_totals = self._bulk_get_attendance_totals(
+                    [employee_id], year, month
+                ).get(employee_id, (0.0, 0.0))
+            actual_working_days, overtime_hours = attendance_totals
 
             # Get leave days
             leave_days = self._get_leave_days(employee_id, year, month)
@@ -181,6 +525,13 @@ class PayrollService:
                 "attendance_percentage": 100.0
             }
 
+    def _get_working_days_in_month(self, year: int, month: int) -> int:
+        """Working days in a month, computed once per service instance"""
+        key = (year, month)
+        if key not in self._working_days:
+            self._working_days[key] = self.attendance_service.get_working_days_in_month(year, month)
+        return self._working_days[key]
+
     def _get_leave_days(self, employee_id: int, year: int, month: int) -> int:
         """Get leave days for an employee in a given month"""
         try:
@@ -199,8 +550,9 @@ class PayrollService:
         """Calculate all earnings components"""
         manual_adjustments = manual_adjustments or {}
         
-        # Calculate pro-rated salary based on attendance
-        attendance_ratio = attendance_data["actual_working_days"] / attendance_data["total_working_days"]
+        # Calculate pro-rated salary based on attendance. Multiplies by the
+        # reciprocal so results match the batch path, which divides once per month
+        attendance_ratio = attendance_data["actual_working_days"] * (1.0 / attendance_data["total_working_days"])
         
         earnings = {
             "basic_salary": self._round_amount(salary_structure.basic_salary * attendance_ratio),
@@ -304,8 +656,12 @@ class PayrollService:
         return self._round_amount(monthly_tax)
 
     def _round_amount(self, amount: float) -> float:
-        """Round amount to 2 decimal places"""
-        return float(Decimal(str(amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+        """Round amount to 2 decimal places (half up, as written)"""
+        # round() only disagrees with half-up on a tie at the third decimal,
+        # so only near-ties take the slower Decimal path
+        if abs(amount) < 1e9 and abs(abs(amount * 100) % 1 - 0.5) > 1e-6:
+            return round(amount, 2) + 0.0
+        return float(Decimal(str(amount)).quantize(_CENT, rounding=ROUND_HALF_UP))
 
     def bulk_calculate_payroll(
         self, 
@@ -315,20 +671,17 @@ class PayrollService:
     ) -> Dict[str, Any]:
         """Calculate payroll for multiple employees"""
         try:
+            employees = None
             if employee_ids is None:
                 # Get all active employees
                 employees = self.db.query(models.Employee).filter(models.Employee.status == 'active').all()
                 employee_ids = [emp.id for emp in employees]
 
-            results = []
-            errors = []
+            rows, errors = self._calculate_batch(employee_ids, month, calculated_by, employees)
 
-            for emp_id in employee_ids:
-                result = self.calculate_employee_payroll(emp_id, month, calculated_by=calculated_by)
-                if result["success"]:
-                    results.append(result["payroll"])
-                else:
-                    errors.append({"employee_id": emp_id, "error": result["error"]})
+            # One upsert and one transaction for the whole run
+            results = self._upsert_payrolls(list(rows.values()))
+            self.db.commit()
 
             return {
                 "success": True,
@@ -340,8 +693,126 @@ class PayrollService:
 
         except Exception as e:
             logger.error(f"Error in bulk payroll calculation: {str(e)}")
+            self.db.rollback()
             return {"success": False, "error": str(e)}
 
+    def _calculate_batch(
+        self,
+        employee_ids: List[int],
+        month: str,
+        calculated_by: Optional[int],
+        employees: Optional[List[models.Employee]] = None
+    ) -> Tuple[Dict[int, PayrollRow], List[Dict[str, Any]]]:
+        """Calculate payroll rows for many employees without writing them
+
+        Employees with complete inputs are computed together in NumPy; the
+        rest go through calculate_employee_payroll() so they fail with the
+        same errors as a single calculation.
+        """
+        employees_by_id, structures, attendance = self._prefetch_payroll_inputs(
+            employee_ids, month, employees
+        )
+        year, month_num = map(int, month.split('-'))
+        
+        rows = {}
+        errors = []
+        vector_ids, vector_structures, vector_attendance = [], [], []
+        
+        for employee_id in employee_ids:
+            structure = structures.get(employee_id)
+            totals = attendance.get(employee_id, (0.0, 0.0))
+            
+            if employee_id in employees_by_id and structure is not None:
+                attendance_data = self._get_attendance_data(employee_id, year, month_num, totals)
+                if attendance_data["total_working_days"] and all(
+                    getattr(structure, component, 0) is not None for component in _PRORATED_COMPONENTS
+                ):
+                    vector_ids.append(employee_id)
+                    vector_structures.append(structure)
+                    vector_attendance.append(attendance_data)
+                    continue
+            
+            result = self.calculate_employee_payroll(
+                employee_id,
+                month,
+                calculated_by=calculated_by,
+                employee=employees_by_id.get(employee_id),
+                salary_structure=structure,
+                attendance_totals=totals,
+                persist=False
+            )
+            if result["success"]:
+                rows[employee_id] = result["payroll_data"]
+            else:
+                errors.append({"employee_id": employee_id, "error": result["error"]})
+        
+        amounts = self._calculate_amounts_vectorized(vector_structures, vector_attendance)
+        for employee_id, attendance_data, (earnings, deductions) in zip(vector_ids, vector_attendance, amounts):
+            rows[employee_id] = self._build_payroll_row(
+                employee_id, month, earnings, deductions, attendance_data, calculated_by
+            )
+        
+        # Keep the caller's order
+        return {employee_id: rows[employee_id] for employee_id in employee_ids if employee_id in rows}, errors
+
+    def _calculate_amounts_vectorized(
+        self,
+        structures: List[models.SalaryStructure],
+        attendance_data: List[Dict[str, Any]]
+    ) -> List[Tuple[Dict[str, float], Dict[str, float]]]:
+        """Earnings and deductions for many employees at once
+
+        Column-wise equivalent of _calculate_earnings() and
+        _calculate_deductions() without manual adjustments.
+        """
+        if not structures:
+            return []
+        
+        count = len(structures)
+        actual_days = np.array([data["actual_working_days"] for data in attendance_data], dtype=float)
+        total_days = np.array([data["total_working_days"] for data in attendance_data], dtype=float)
+        overtime_hours = np.array([data["overtime_hours"] for data in attendance_data], dtype=float)
+        # Working days are the same for the whole month, so take the
+        # reciprocal once per distinct value and multiply
+        distinct_totals, total_index = np.unique(total_days, return_inverse=True)
+        ratio = actual_days * (1.0 / distinct_totals)[total_index]
+        
+        # Earnings, in the same order as _calculate_earnings()
+        earnings = {
+            component: _round_amounts(
+                np.array([getattr(structure, component, 0) for structure in structures], dtype=float) * ratio
+            )
+            for component in _PRORATED_COMPONENTS
+        }
+        earnings["bonus"] = np.zeros(count)
+        hourly_rate = np.array([structure.basic_salary for structure in structures], dtype=float) / (22 * 8)
+        earnings["overtime_amount"] = np.where(
+            overtime_hours > 0, _round_amounts(overtime_hours * (hourly_rate * 1.5)), 0.0
+        )
+        gross = sum(earnings.values())
+        
+        # Deductions
+        pf, esi, professional_tax, income_tax = _statutory_deductions(earnings["basic_salary"], gross)
+        deductions = {
+            "pf": _round_amounts(pf),
+            "esi": _round_amounts(esi),
+            "professional_tax": professional_tax,
+            "income_tax": _round_amounts(income_tax),
+            "loan_deduction": np.zeros(count),
+            "other_deductions": np.zeros(count)
+        }
+        
+        # Back to per-employee dicts of plain floats
+        earnings = {name: values.tolist() for name, values in earnings.items()}
+        deductions = {name: values.tolist() for name, values in deductions.items()}
+        return [
+            (
+                {name: values[i] for name, values in earnings.items()},
+                {name: values[i] for name, values in deductions.items()}
+            )
+            for i in range(count)
+        ]
+
     def approve_payroll(self, payroll_id: int, approved_by: int) -> Dict[str, Any]:
         """Approve a payroll record"""
         try:
@@ -375,73 +846,98 @@ class PayrollService:
             if not payroll:
                 return {"success": False, "error": "Payroll record not found"}
 
-            employee = payroll.employee
-            
-            # Calculate totals
-            total_earnings = (
-                payroll.basic_salary + payroll.hra + payroll.transport_allowance +
-                payroll.medical_allowance + payroll.special_allowance + payroll.bonus +
-                payroll.overtime_amount + payroll.other_allowances
-            )
-            
-            total_deductions = (
-                payroll.pf + payroll.esi + payroll.professional_tax +
-                payroll.income_tax + payroll.loan_deduction + payroll.other_deductions
-            )
-
-            payslip_data = {
-                "payroll_id": payroll.id,
-                "employee": {
-                    "id": employee.id,
-                    "name": f"{employee.first_name} {employee.last_name}",
-                    "employee_code": getattr(employee, 'employee_code', f"EMP{employee.id:04d}"),
-                    "designation": getattr(employee, 'designation', 'N/A'),
-                    "department": getattr(employee, 'department', 'N/A'),
-                    "joining_date": getattr(employee, 'joining_date', None)
-                },
-                "payroll_period": {
-                    "month": payroll.month,
-                    "total_working_days": payroll.total_working_days,
-                    "actual_working_days": payroll.actual_working_days,
-                    "leave_days": payroll.leave_days,
-                    "overtime_hours": payroll.overtime_hours
-                },
-                "earnings": {
-                    "basic_salary": payroll.basic_salary,
-                    "hra": payroll.hra,
-                    "transport_allowance": payroll.transport_allowance,
-                    "medical_allowance": payroll.medical_allowance,
-                    "special_allowance": payroll.special_allowance,
-                    "bonus": payroll.bonus,
-                    "overtime_amount": payroll.overtime_amount,
-                    "other_allowances": payroll.other_allowances,
-                    "total": total_earnings
-                },
-                "deductions": {
-                    "pf": payroll.pf,
-                    "esi": payroll.esi,
-                    "professional_tax": payroll.professional_tax,
-                    "income_tax": payroll.income_tax,
-                    "loan_deduction": payroll.loan_deduction,
-                    "other_deductions": payroll.other_deductions,
-                    "total": total_deductions
-                },
-                "summary": {
-                    "gross_salary": payroll.gross_salary,
-                    "total_deductions": payroll.total_deductions,
-                    "net_salary": payroll.net_salary
-                },
-                "status": payroll.status,
-                "generated_on": datetime.utcnow().isoformat(),
-                "manual_adjustments": payroll.manual_adjustments
-            }
-
-            return {"success": True, "payslip": payslip_data}
+            return {"success": True, "payslip": self._build_payslip_data(payroll)}
 
         except Exception as e:
             logger.error(f"Error generating payslip data: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def generate_payslip_json(self, payroll: models.Payroll) -> bytes:
+        """Payslip as JSON bytes, reusing the payroll figures once the payroll is approved"""
+        if payroll.status not in _CACHEABLE_PAYSLIP_STATUSES:
+            return orjson.dumps(self._build_payslip_data(payroll))
+        
+        key = (payroll.id, payroll.updated_at)
+        with _payslip_json_lock:
+            figures = _payslip_json_cache.get(key)
+            if figures is not None:
+                _payslip_json_cache.move_to_end(key)
+        
+        if figures is None:
+            figures = orjson.dumps(self._payslip_figures(payroll))
+            with _payslip_json_lock:
+                _payslip_json_cache[key] = figures
+                if len(_payslip_json_cache) > PAYSLIP_CACHE_SIZE:
+                    _payslip_json_cache.popitem(last=False)
+        
+        # Employee details and generated_on are current on every request;
+        # splice them into the cached object in front of the payroll figures
+        head = orjson.dumps(self._payslip_header(payroll))
+        return head[:-1] + b"," + figures[1:]
+
+    def _build_payslip_data(self, payroll: models.Payroll) -> Dict[str, Any]:
+        """Payslip contents for an already loaded payroll row"""
+        return {**self._payslip_header(payroll), **self._payslip_figures(payroll)}
+
+    def _payslip_header(self, payroll: models.Payroll) -> Dict[str, Any]:
+        """Payslip fields read from the employee or the clock, never cached"""
+        employee = payroll.employee
+        return {
+            "employee": {
+                "id": employee.id,
+                "name": f"{employee.first_name} {employee.last_name}",
+                "employee_code": getattr(employee, 'employee_code', f"EMP{employee.id:04d}"),
+                "designation": getattr(employee, 'designation', 'N/A'),
+                "department": getattr(employee, 'department', 'N/A'),
+                "joining_date": getattr(employee, 'joining_date', None)
+            },
+            "generated_on": datetime.utcnow().isoformat()
+        }
+
+    def _payslip_figures(self, payroll: models.Payroll) -> Dict[str, Any]:
+        """Payslip fields held on the payroll row itself"""
+        # Totals were stored alongside the components when the payroll was calculated
+        total_earnings = payroll.gross_salary
+        total_deductions = payroll.total_deductions
+
+        return {
+            "payroll_id": payroll.id,
+            "payroll_period": {
+                "month": payroll.month,
+                "total_working_days": payroll.total_working_days,
+                "actual_working_days": payroll.actual_working_days,
+                "leave_days": payroll.leave_days,
+                "overtime_hours": payroll.overtime_hours
+            },
+            "earnings": {
+                "basic_salary": payroll.basic_salary,
+                "hra": payroll.hra,
+                "transport_allowance": payroll.transport_allowance,
+                "medical_allowance": payroll.medical_allowance,
+                "special_allowance": payroll.special_allowance,
+                "bonus": payroll.bonus,
+                "overtime_amount": payroll.overtime_amount,
+                "other_allowances": payroll.other_allowances,
+                "total": total_earnings
+            },
+            "deductions": {
+                "pf": payroll.pf,
+                "esi": payroll.esi,
+                "professional_tax": payroll.professional_tax,
+                "income_tax": payroll.income_tax,
+                "loan_deduction": payroll.loan_deduction,
+                "other_deductions": payroll.other_deductions,
+                "total": total_deductions
+            },
+            "summary": {
+                "gross_salary": payroll.gross_salary,
+                "total_deductions": payroll.total_deductions,
+                "net_salary": payroll.net_salary
+            },
+            "status": payroll.status,
+            "manual_adjustments": payroll.manual_adjustments
+        }
+
     def _send_payroll_notification(self, payroll: models.Payroll, action: str):
         """Send payroll-related notifications"""
         try:
@@ -458,33 +954,87 @@ class PayrollService:
         except Exception as e:
             logger.error(f"Error sending payroll notification: {str(e)}")
 
+    def list_payrolls(
+        self,
+        employee_id: Optional[int] = None,
+        after_month: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[models.Payroll]:
+        """A page of payrolls, newest month first, continuing after (after_month, after_id)
+
+        Keyset rather than OFFSET pagination, so a deep page seeks straight to
+        its first row instead of skipping everything before it.
+        """
+        payroll = models.Payroll
+        stmt = select(payroll)
+        
+        if employee_id:
+            stmt = stmt.where(payroll.employee_id == employee_id)
+        
+        if after_month is not None:
+            if after_id is None:
+                stmt = stmt.where(payroll.month < after_month)
+            else:
+                stmt = stmt.where(or_(
+                    payroll.month < after_month,
+                    and_(payroll.month == after_month, payroll.id < after_id)
+                ))
+        
+        stmt = stmt.order_by(payroll.month.desc(), payroll.id.desc()).limit(limit)
+        return self.db.scalars(stmt).all()
+
     def get_payroll_summary(self, month: str) -> Dict[str, Any]:
         """Get payroll summary for a month"""
         try:
-            payrolls = self.db.query(models.Payroll).filter(models.Payroll.month == month).all()
+            payroll = models.Payroll
+            
+            def total(column):
+                return func.coalesce(func.sum(column), 0)
+            
+            # One aggregate row for the month instead of loading every payroll
+            totals = self.db.execute(
+                select(
+                    func.count(),
+                    total(payroll.gross_salary),
+                    total(payroll.total_deductions),
+                    total(payroll.net_salary),
+                    total(payroll.basic_salary),
+                    total(payroll.hra),
+                    total(payroll.transport_allowance + payroll.medical_allowance
+                          + payroll.special_allowance + payroll.other_allowances),
+                    total(payroll.pf),
+                    total(payroll.esi),
+                    total(payroll.professional_tax + payroll.income_tax)
+                ).where(payroll.month == month)
+            ).one()
+            
+            (total_employees, gross_salary, deductions, net_salary,
+             basic_salary, hra, allowances, pf, esi, tax) = totals
+            
+            status_counts = self.db.execute(
+                select(payroll.status, func.count())
+                .where(payroll.month == month)
+                .group_by(payroll.status)
+            ).all()
             
             summary = {
                 "month": month,
-                "total_employees": len(payrolls),
-                "total_gross_salary": sum(p.gross_salary for p in payrolls),
-                "total_deductions": sum(p.total_deductions for p in payrolls),
-                "total_net_salary": sum(p.net_salary for p in payrolls),
-                "status_breakdown": {},
+                "total_employees": total_employees,
+                "total_gross_salary": gross_salary,
+                "total_deductions": deductions,
+                "total_net_salary": net_salary,
+                "status_breakdown": dict(status_counts),
                 "component_breakdown": {
-                    "basic_salary": sum(p.basic_salary for p in payrolls),
-                    "hra": sum(p.hra for p in payrolls),
-                    "allowances": sum(p.transport_allowance + p.medical_allowance + p.special_allowance + p.other_allowances for p in payrolls),
-                    "pf": sum(p.pf for p in payrolls),
-                    "esi": sum(p.esi for p in payrolls),
-                    "tax": sum(p.professional_tax + p.income_tax for p in payrolls)
+                    "basic_salary": basic_salary,
+                    "hra": hra,
+                    "allowances": allowances,
+                    "pf": pf,
+                    "esi": esi,
+                    "tax": tax
                 }
             }
 
-            # Status breakdown
-            for payroll in payrolls:
-                status = payroll.status
-                summary["status_breakdown"][status] = summary["status_breakdown"].get(status, 0) + 1
-
             return {"success": True, "summary": summary}
 
         except Exception as e:
@@ -501,44 +1051,32 @@ class PayrollService:
             created_by=calculated_by
         )
         self.db.add(batch)
+        # The id comes back from the INSERT; read it before the commit expires it
+        self.db.flush()
+        batch_id = batch.id
         self.db.commit()
-        self.db.refresh(batch)
         
         results = {
-            "batch_id": batch.id,
+            "batch_id": batch_id,
             "successful": [],
             "failed": [],
             "total": len(employee_ids)
         }
         
         try:
-            for employee_id in employee_ids:
-                try:
-                    result = self.calculate_employee_payroll(
-                        employee_id=employee_id,
-                        month=month,
-                        calculated_by=calculated_by
-                    )
-                    
-                    if result["success"]:
-                        results["successful"].append({
-                            "employee_id": employee_id,
-                            "payroll_id": result["payroll"].id,
-                            "net_salary": result["payroll"].net_salary
-                        })
-                    else:
-                        results["failed"].append({
-                            "employee_id": employee_id,
-                            "error": result["error"]
-                        })
-                        
-                except Exception as e:
-                    results["failed"].append({
-                        "employee_id": employee_id,
-                        "error": str(e)
-                    })
+            rows, results["failed"] = self._calculate_batch(employee_ids, month, calculated_by)
             
-            # Update batch status
+            # One upsert for every calculated employee
+            results["successful"] = [
+                {
+                    "employee_id": payroll.employee_id,
+                    "payroll_id": payroll.id,
+                    "net_salary": payroll.net_salary
+                }
+                for payroll in self._upsert_payrolls(list(rows.values()))
+            ]
+            
+            # Update batch status; payroll rows and batch commit together
             batch.processed_employees = len(results["successful"])
             batch.failed_employees = len(results["failed"])
             batch.status = "completed" if len(results["failed"]) == 0 else "completed_with_errors"
@@ -552,6 +1090,7 @@ class PayrollService:
             }
             
         except Exception as e:
+            self.db.rollback()
             batch.status = "failed"
             batch.error_message = str(e)
             self.db.commit()
@@ -565,34 +1104,38 @@ class PayrollService:
     def distribute_payslip(self, payroll_id: int, distribution_method: str = "email") -> Dict[str, Any]:
         """Distribute payslip to employee"""
         
-        payroll = self.db.query(models.Payroll).filter(models.Payroll.id == payroll_id).first()
+        payroll = self._query_payrolls_for_distribution().filter(models.Payroll.id == payroll_id).first()
         if not payroll:
             return {"success": False, "error": "Payroll record not found"}
         
-        employee = self.db.query(models.Employee).filter(models.Employee.id == payroll.employee_id).first()
+        return self._distribute_payslip_prefetched(payroll, distribution_method)
+
+    def _distribute_payslip_prefetched(self, payroll: models.Payroll, distribution_method: str) -> Dict[str, Any]:
+        """Distribute a payslip whose payroll, employee and user are already loaded"""
+        
+        employee = payroll.employee
         if not employee or not employee.user:
             return {"success": False, "error": "Employee or user not found"}
         
-        # Generate payslip
-        payslip_result = self.generate_payslip_data(payroll_id)
-        if not payslip_result["success"]:
-            return payslip_result
+        # Generate payslip from the row already loaded
+        payslip_data = self._build_payslip_data(payroll)
         
         # Create distribution record
         distribution = models.PayslipDistribution(
-            payroll_id=payroll_id,
+            payroll_id=payroll.id,
             employee_id=payroll.employee_id,
             distribution_method=distribution_method,
             status="pending"
         )
         self.db.add(distribution)
+        self.db.flush()
+        distribution_id = distribution.id
         self.db.commit()
-        self.db.refresh(distribution)
         
         try:
             if distribution_method == "email":
                 # Send email with payslip
-                success = self._send_payslip_email(employee, payslip_result["payslip"])
+                success = self._send_payslip_email(employee, payslip_data)
                 if success:
                     distribution.status = "sent"
                     distribution.sent_at = datetime.utcnow()
@@ -611,15 +1154,16 @@ class PayrollService:
                     title="Payslip Available",
                     message=f"Your payslip for {payroll.month} is now available for download",
                     type="payslip_available",
-                    action_url=f"/payroll/payslip/{payroll_id}"
+                    action_url=f"/payroll/payslip/{payroll.id}"
                 )
             
+            status = distribution.status
             self.db.commit()
             
             return {
                 "success": True,
-                "distribution_id": distribution.id,
-                "status": distribution.status,
+                "distribution_id": distribution_id,
+                "status": status,
                 "message": f"Payslip distributed via {distribution_method}"
             }
             
@@ -633,181 +1177,223 @@ class PayrollService:
                 "error": f"Failed to distribute payslip: {str(e)}"
             }
 
-    def _send_payslip_email(self, employee: models.Employee, payslip_data: Dict[str, Any]) -> bool:
-        """Send payslip via email"""
+    def distribute_payslips_bulk(self, payroll_ids: List[int], distribution_method: str = "email") -> Dict[str, Any]:
+        """Distribute many payslips over one SMTP session, committing every distribution together"""
+        
+        payrolls = self._query_payrolls_for_distribution().filter(models.Payroll.id.in_(payroll_ids)).all()
+        payrolls_by_id = {payroll.id: payroll for payroll in payrolls}
+        
+        return self._distribute_payslips_prefetched(
+            [payrolls_by_id[payroll_id] for payroll_id in payroll_ids if payroll_id in payrolls_by_id],
+            distribution_method,
+            missing=[
+                {"payroll_id": payroll_id, "error": "Payroll record not found"}
+                for payroll_id in payroll_ids if payroll_id not in payrolls_by_id
+            ]
+        )
+
+    def _query_payrolls_for_distribution(self):
+        """Payroll query that brings each employee and user along in two extra SELECTs"""
+        return self.db.query(models.Payroll).options(
+            selectinload(models.Payroll.employee).selectinload(models.Employee.user)
+        )
+
+    def _distribute_payslips_prefetched(
+        self,
+        payrolls: List[models.Payroll],
+        distribution_method: str,
+        missing: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Distribute payslips for payrolls loaded by _query_payrolls_for_distribution()"""
+        
+        missing = missing or []
+        results = {
+            "successful": [],
+            "failed": list(missing),
+            "total": len(payrolls) + len(missing)
+        }
+        
         try:
-            # Generate email content
-            subject = f"Payslip for {payslip_data['payroll_period']['month']}"
+            pending = []
+            for payroll in payrolls:
+                if not payroll.employee or not payroll.employee.user:
+                    results["failed"].append({
+                        "payroll_id": payroll.id,
+                        "employee_id": payroll.employee_id,
+                        "error": "Employee or user not found"
+                    })
+                    continue
+                
+                distribution = models.PayslipDistribution(
+                    payroll_id=payroll.id,
+                    employee_id=payroll.employee_id,
+                    distribution_method=distribution_method,
+                    status="pending"
+                )
+                pending.append((payroll, distribution))
             
-            html_content = self._generate_payslip_email_template(payslip_data)
+            sent_at = datetime.utcnow()
+            if distribution_method == "email":
+                sent = self._send_payslip_emails([payroll for payroll, _ in pending])
+                for (_, distribution), success in zip(pending, sent):
+                    if success:
+                        distribution.status = "sent"
+                        distribution.sent_at = sent_at
+                    else:
+                        distribution.status = "failed"
+                        distribution.error_message = "Failed to send email"
+            
+            elif distribution_method == "portal":
+                for _, distribution in pending:
+                    distribution.status = "available"
+                    distribution.sent_at = sent_at
+                
+                # One multi-row insert for every portal notification
+                if pending:
+                    self.db.execute(insert(models.InAppNotification), [
+                        {
+                            "user_id": payroll.employee.user.id,
+                            "title": "Payslip Available",
+                            "message": f"Your payslip for {payroll.month} is now available for download",
+                            "type": "payslip_available",
+                            "action_url": f"/payroll/payslip/{payroll.id}",
+                            "notification_data": {},
+                            "created_at": sent_at
+                        }
+                        for payroll, _ in pending
+                    ])
+            
+            self.db.add_all([distribution for _, distribution in pending])
+            self.db.flush()
+            
+            for payroll, distribution in pending:
+                entry = {
+                    "payroll_id": payroll.id,
+                    "employee_id": payroll.employee_id,
+                    "distribution_id": distribution.id,
+                    "status": distribution.status
+                }
+                if distribution.status == "failed":
+                    entry["error"] = distribution.error_message
+                    results["failed"].append(entry)
+                else:
+                    results["successful"].append(entry)
+            
+            self.db.commit()
             
+            return {
+                "success": True,
+                "results": results,
+                "message": f"Distributed {len(results['successful'])} payslips via {distribution_method}"
+            }
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error distributing payslips: {str(e)}")
+            return {"success": False, "error": str(e), "results": results}
+
+    def _payslip_email(self, employee: models.Employee, payslip_data: Dict[str, Any]) -> Dict[str, Any]:
+        """send_email() keyword arguments for one payslip"""
+        month = payslip_data['payroll_period']['month']
+        return {
+            "to_email": employee.user.email,
+            "subject": f"Payslip for {month}",
+            "body": f"Dear {employee.first_name},\n\nYour payslip for {month} is attached.\n\nBest regards,\nHR Team",
+            "html_body": self._generate_payslip_email_template(payslip_data)
+        }
+
+    def _send_payslip_email(self, employee: models.Employee, payslip_data: Dict[str, Any]) -> bool:
+        """Send payslip via email"""
+        try:
             # Send email using notification service
-            return self.notification_service.send_email(
-                to_email=employee.user.email,
-                subject=subject,
-                body=f"Dear {employee.first_name},\n\nYour payslip for {payslip_data['payroll_period']['month']} is attached.\n\nBest regards,\nHR Team",
-                html_body=html_content
-            )
+            return self.notification_service.send_email(**self._payslip_email(employee, payslip_data))
         except Exception as e:
             logger.error(f"Failed to send payslip email: {str(e)}")
             return False
 
+    def _send_payslip_emails(self, payrolls: List[models.Payroll]) -> List[bool]:
+        """Send many payslips over a few SMTP sessions running side by side"""
+        sent = []
+        report_every = max(1, len(payrolls) // PAYSLIP_PROGRESS_STEPS)
+        
+        async def send_waves():
+            for wave_start in range(0, len(payrolls), PAYSLIP_EMAIL_WAVE):
+                # Render one wave at a time so a large run never holds every
+                # payslip body in memory at once
+                messages = [
+                    self._payslip_email(payroll.employee, self._build_payslip_data(payroll))
+                    for payroll in payrolls[wave_start:wave_start + PAYSLIP_EMAIL_WAVE]
+                ]
+                chunk_size = -(-len(messages) // PAYSLIP_EMAIL_SESSIONS)
+                
+                # Each send_email_batch() holds one session; results come back in order
+                for chunk_sent in await asyncio.gather(*[
+                    self.notification_service.send_email_batch(messages[start:start + chunk_size])
+                    for start in range(0, len(messages), chunk_size)
+                ]):
+                    reported = len(sent) // report_every
+                    sent.extend(chunk_sent)
+                    if len(sent) // report_every > reported:
+                        logger.info(f"Sent {len(sent)}/{len(payrolls)} payslip emails")
+        
+        try:
+            asyncio.run(send_waves())
+        except Exception as e:
+            logger.error(f"Failed to send payslip emails: {str(e)}")
+        return sent + [False] * (len(payrolls) - len(sent))
+
     def _generate_payslip_email_template(self, payslip_data: Dict[str, Any]) -> str:
         """Generate HTML email template for payslip"""
         
-        employee = payslip_data["employee"]
+        # Names and job details are user input; amounts are formatted numbers
+        employee = {key: escape(str(value)) for key, value in payslip_data["employee"].items()}
         period = payslip_data["payroll_period"]
         earnings = payslip_data["earnings"]
         deductions = payslip_data["deductions"]
         summary = payslip_data["summary"]
         
-        html_template = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; }}
-                .payslip-table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                .payslip-table th, .payslip-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                .payslip-table th {{ background-color: #f2f2f2; }}
-                .summary {{ background-color: #e9ecef; padding: 15px; margin: 20px 0; }}
-                .amount {{ text-align: right; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h2>Dhanush Healthcare Pvt. Ltd.</h2>
-                <h3>Payslip for {period['month']}</h3>
-            </div>
-            
-            <div>
-                <h4>Employee Details</h4>
-                <p><strong>Name:</strong> {employee['name']}</p>
-                <p><strong>Employee Code:</strong> {employee['employee_code']}</p>
-                <p><strong>Designation:</strong> {employee['designation']}</p>
-                <p><strong>Department:</strong> {employee['department']}</p>
-            </div>
-            
-            <div>
-                <h4>Attendance Summary</h4>
-                <p><strong>Total Working Days:</strong> {period['total_working_days']}</p>
-                <p><strong>Actual Working Days:</strong> {period['actual_working_days']}</p>
-                <p><strong>Leave Days:</strong> {period['leave_days']}</p>
-                <p><strong>Overtime Hours:</strong> {period['overtime_hours']}</p>
-            </div>
-            
-            <table class="payslip-table">
-                <tr>
-                    <th colspan="2">Earnings</th>
-                    <th colspan="2">Deductions</th>
-                </tr>
-                <tr>
-                    <td>Basic Salary</td>
-                    <td class="amount">₹{earnings['basic_salary']:,.2f}</td>
-                    <td>PF</td>
-                    <td class="amount">₹{deductions['pf']:,.2f}</td>
-                </tr>
-                <tr>
-                    <td>HRA</td>
-                    <td class="amount">₹{earnings['hra']:,.2f}</td>
-                    <td>ESI</td>
-                    <td class="amount">₹{deductions['esi']:,.2f}</td>
-                </tr>
-                <tr>
-                    <td>Transport Allowance</td>
-                    <td class="amount">₹{earnings['transport_allowance']:,.2f}</td>
-                    <td>Professional Tax</td>
-                    <td class="amount">₹{deductions['professional_tax']:,.2f}</td>
-                </tr>
-                <tr>
-                    <td>Medical Allowance</td>
-                    <td class="amount">₹{earnings['medical_allowance']:,.2f}</td>
-                    <td>Income Tax</td>
-                    <td class="amount">₹{deductions['income_tax']:,.2f}</td>
-                </tr>
-                <tr>
-                    <td>Special Allowance</td>
-                    <td class="amount">₹{earnings['special_allowance']:,.2f}</td>
-                    <td>Loan Deduction</td>
-                    <td class="amount">₹{deductions['loan_deduction']:,.2f}</td>
-                </tr>
-                <tr>
-                    <td>Overtime Amount</td>
-                    <td class="amount">₹{earnings['overtime_amount']:,.2f}</td>
-                    <td>Other Deductions</td>
-                    <td class="amount">₹{deductions['other_deductions']:,.2f}</td>
-                </tr>
-                <tr>
-                    <td>Other Allowances</td>
-                    <td class="amount">₹{earnings['other_allowances']:,.2f}</td>
-                    <td></td>
-                    <td></td>
-                </tr>
-                <tr style="font-weight: bold;">
-                    <td>Total Earnings</td>
-                    <td class="amount">₹{earnings['total']:,.2f}</td>
-                    <td>Total Deductions</td>
-                    <td class="amount">₹{deductions['total']:,.2f}</td>
-                </tr>
-            </table>
-            
-            <div class="summary">
-                <h4>Summary</h4>
-                <p><strong>Gross Salary:</strong> ₹{summary['gross_salary']:,.2f}</p>
-                <p><strong>Total Deductions:</strong> ₹{summary['total_deductions']:,.2f}</p>
-                <p style="font-size: 18px; color: #28a745;"><strong>Net Salary:</strong> ₹{summary['net_salary']:,.2f}</p>
-            </div>
-            
-            <div style="margin-top: 30px; font-size: 12px; color: #666;">
-                <p>This is a system-generated payslip. For any queries, please contact HR department.</p>
-                <p>Generated on: {payslip_data['generated_on']}</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_template
+        return _PAYSLIP_EMAIL_HTML.format(
+            employee=employee,
+            period=period,
+            earnings=earnings,
+            deductions=deductions,
+            summary=summary,
+            generated_on=payslip_data["generated_on"]
+        )
 
     def get_payroll_trends(self, employee_id: Optional[int] = None, months: int = 12) -> Dict[str, Any]:
         """Get payroll trends analysis"""
         try:
-            query = self.db.query(models.Payroll)
+            payroll = models.Payroll
             
-            if employee_id:
-                query = query.filter(models.Payroll.employee_id == employee_id)
-            
-            # Get last N months of payroll data
-            payrolls = query.order_by(models.Payroll.month.desc()).limit(months * 100).all()
+            # Totals and averages for the last N months, one row per month
+            stmt = select(
+                payroll.month,
+                func.count(),
+                func.sum(payroll.gross_salary),
+                func.sum(payroll.net_salary),
+                func.sum(payroll.total_deductions),
+                func.avg(payroll.gross_salary),
+                func.avg(payroll.net_salary)
+            ).group_by(payroll.month).order_by(payroll.month.desc()).limit(months)
             
-            # Group by month
-            monthly_data = {}
-            for payroll in payrolls:
-                month = payroll.month
-                if month not in monthly_data:
-                    monthly_data[month] = {
-                        "month": month,
-                        "total_employees": 0,
-                        "total_gross": 0,
-                        "total_net": 0,
-                        "total_deductions": 0,
-                        "avg_gross": 0,
-                        "avg_net": 0
-                    }
-                
-                monthly_data[month]["total_employees"] += 1
-                monthly_data[month]["total_gross"] += payroll.gross_salary
-                monthly_data[month]["total_net"] += payroll.net_salary
-                monthly_data[month]["total_deductions"] += payroll.total_deductions
-            
-            # Calculate averages
-            for month_data in monthly_data.values():
-                if month_data["total_employees"] > 0:
-                    month_data["avg_gross"] = month_data["total_gross"] / month_data["total_employees"]
-                    month_data["avg_net"] = month_data["total_net"] / month_data["total_employees"]
+            if employee_id:
+                stmt = stmt.where(payroll.employee_id == employee_id)
             
-            # Sort by month
-            trends = sorted(monthly_data.values(), key=lambda x: x["month"])
+            # Newest months come back first; report oldest to newest
+            trends = [
+                {
+                    "month": month,
+                    "total_employees": total_employees,
+                    "total_gross": total_gross,
+                    "total_net": total_net,
+                    "total_deductions": total_deductions,
+                    "avg_gross": avg_gross,
+                    "avg_net": avg_net
+                }
+                for month, total_employees, total_gross, total_net, total_deductions, avg_gross, avg_net
+                in reversed(self.db.execute(stmt).all())
+            ]
             
             return {
                 "success": True,
@@ -827,7 +1413,7 @@ class PayrollService:
         """Distribute payslips for all employees in a month"""
         try:
             # Get all approved payrolls for the month
-            payrolls = self.db.query(models.Payroll).filter(
+            payrolls = self._query_payrolls_for_distribution().filter(
                 models.Payroll.month == month,
                 models.Payroll.status == "approved"
             ).all()
@@ -835,39 +1421,7 @@ class PayrollService:
             if not payrolls:
                 return {"success": False, "error": "No approved payrolls found for the month"}
             
-            results = {
-                "successful": [],
-                "failed": [],
-                "total": len(payrolls)
-            }
-            
-            for payroll in payrolls:
-                try:
-                    result = self.distribute_payslip(payroll.id, distribution_method)
-                    if result["success"]:
-                        results["successful"].append({
-                            "payroll_id": payroll.id,
-                            "employee_id": payroll.employee_id,
-                            "distribution_id": result["distribution_id"]
-                        })
-                    else:
-                        results["failed"].append({
-                            "payroll_id": payroll.id,
-                            "employee_id": payroll.employee_id,
-                            "error": result["error"]
-                        })
-                except Exception as e:
-                    results["failed"].append({
-                        "payroll_id": payroll.id,
-                        "employee_id": payroll.employee_id,
-                        "error": str(e)
-                    })
-            
-            return {
-                "success": True,
-                "results": results,
-                "message": f"Distributed {len(results['successful'])} payslips successfully"
-            }
+            return self._distribute_payslips_prefetched(payrolls, distribution_method)
             
         except Exception as e:
             logger.error(f"Error in bulk payslip distribution: {str(e)}")
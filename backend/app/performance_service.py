@@ -4,147 +4,264 @@ Handles KPI tracking, performance metrics calculation, and analytics
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, extract
+from sqlalchemy import func, and_, extract, case, or_
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 from typing import Dict, List, Optional
 from app import models, database
+import bisect
+import heapq
 import json
+import math
+
+# Score cut-offs and the (category, color) each band maps to, lowest first
+_CATEGORY_THRESHOLDS = (60, 70, 80, 90)
+_CATEGORIES = (
+    ("Unsatisfactory", "red"),
+    ("Needs Improvement", "orange"),
+    ("Meets Expectations", "yellow"),
+    ("Exceeds Expectations", "blue"),
+    ("Outstanding", "green")
+)
+
+# Weights for goals, reviews, attendance, feedback sentiment and learning, in that order
+_WEIGHTS = (0.30, 0.25, 0.20, 0.15, 0.10)
+
+
+@dataclass(slots=True)
+class PerformanceContext:
+    """Aggregates prefetched once for a set of employees, shared by every score computed from them"""
+    period_months: int
+    start_date: datetime
+    end_date: datetime
+    aggregates: Dict[int, Dict]  # employee_id -> goal/review/attendance/feedback aggregates
+
+
+def _empty_aggregates() -> Dict:
+    """Aggregates for an employee with no activity in the period"""
+    return {
+        "total_goals": 0,
+        "completed_goals": 0,
+        "total_reviews": 0,
+        "avg_rating": None,
+        "attendance_days": 0,
+        "present_days": 0,
+        "feedback_count": 0,
+        "positive_feedback": 0
+    }
+
+
+def _performance_aggregates(employee_ids: List[int], db: Session, start_date: datetime) -> Dict[int, Dict]:
+    """Goal, review, attendance and feedback aggregates for many employees,
+    one GROUP BY query per source"""
+    aggregates = {employee_id: _empty_aggregates() for employee_id in employee_ids}
+    
+    goals = db.query(
+        models.Goal.employee_id,
+        func.count(),
+        func.sum(case((models.Goal.status == "completed", 1), else_=0))
+    ).filter(
+        models.Goal.employee_id.in_(employee_ids),
+        models.Goal.due_date >= start_date  # goals have no creation time; count those due in the period
+    ).group_by(models.Goal.employee_id)
+    for employee_id, total, completed in goals:
+        aggregates[employee_id].update(total_goals=total, completed_goals=completed)
+    
+    reviews = db.query(
+        models.PerformanceReview.employee_id,
+        func.count(),
+        func.avg(models.PerformanceReview.rating)
+    ).filter(
+        models.PerformanceReview.employee_id.in_(employee_ids),
+        models.PerformanceReview.review_date >= start_date
+    ).group_by(models.PerformanceReview.employee_id)
+    for employee_id, total, avg_rating in reviews:
+        aggregates[employee_id].update(total_reviews=total, avg_rating=avg_rating)
+    
+    attendance = db.query(
+        models.Attendance.employee_id,
+        func.count(),
+        func.sum(case((models.Attendance.status == "present", 1), else_=0))
+    ).filter(
+        models.Attendance.employee_id.in_(employee_ids),
+        models.Attendance.date >= start_date.date()
+    ).group_by(models.Attendance.employee_id)
+    for employee_id, total, present in attendance:
+        aggregates[employee_id].update(attendance_days=total, present_days=present)
+    
+    feedback = db.query(
+        models.Feedback.employee_id,
+        func.count(),
+        func.sum(case((models.Feedback.type.ilike("%positive%"), 1), else_=0))
+    ).filter(
+        models.Feedback.employee_id.in_(employee_ids),
+        models.Feedback.created_at >= start_date
+    ).group_by(models.Feedback.employee_id)
+    for employee_id, total, positive in feedback:
+        aggregates[employee_id].update(feedback_count=total, positive_feedback=positive)
+    
+    return aggregates
+
+
+def _score_from_aggregates(
+    employee: models.Employee,
+    aggregates: Dict,
+    start_date: datetime,
+    end_date: datetime
+) -> Dict:
+    """Weighted performance score from precomputed aggregates, without touching the DB"""
+    
+    # 1. Goal Achievement Score (30% weight)
+    goal_score = 0
+    if aggregates["total_goals"]:
+        goal_score = (aggregates["completed_goals"] / aggregates["total_goals"]) * 100
+    
+    # 2. Performance Review Score (25% weight)
+    review_score = 0
+    if aggregates["total_reviews"]:
+        review_score = (aggregates["avg_rating"] / 5.0) * 100  # Convert to percentage
+    
+    # 3. Attendance Score (20% weight)
+    attendance_score = 0
+    if aggregates["attendance_days"]:
+        attendance_score = (aggregates["present_days"] / aggregates["attendance_days"]) * 100
+    
+    # 4. Feedback Sentiment Score (15% weight)
+    sentiment_score = 50  # Neutral baseline
+    if aggregates["feedback_count"]:
+        sentiment_score = (aggregates["positive_feedback"] / aggregates["feedback_count"]) * 100
+    
+    # 5. Learning & Development Score (10% weight)
+    # This would integrate with learning system - using mock for now
+    learning_score = 75  # Mock score
+    
+    # Calculate weighted final score
+    final_score = math.fsum(
+        score * weight
+        for score, weight in zip(
+            (goal_score, review_score, attendance_score, sentiment_score, learning_score),
+            _WEIGHTS
+        )
+    )
+    
+    # Determine performance category
+    category, color = _CATEGORIES[bisect.bisect_right(_CATEGORY_THRESHOLDS, final_score)]
+    
+    return {
+        "employee_id": employee.id,
+        "employee_name": f"{employee.first_name} {employee.last_name}",
+        "final_score": round(final_score, 1),
+        "category": category,
+        "color": color,
+        "breakdown": {
+            "goal_achievement": round(goal_score, 1),
+            "performance_reviews": round(review_score, 1),
+            "attendance": round(attendance_score, 1),
+            "feedback_sentiment": round(sentiment_score, 1),
+            "learning_development": round(learning_score, 1)
+        },
+        "metrics": {
+            "total_goals": aggregates["total_goals"],
+            "completed_goals": aggregates["completed_goals"],
+            "total_reviews": aggregates["total_reviews"],
+            "attendance_days": aggregates["attendance_days"],
+            "feedback_count": aggregates["feedback_count"]
+        },
+        "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    }
+
 
 class PerformanceService:
     
     @staticmethod
-    def calculate_employee_performance_score(employee_id: int, db: Session, period_months: int = 12) -> Dict:
+    def build_context(db: Session, employee_ids: List[int], period_months: int = 12) -> PerformanceContext:
         """
-        Calculate comprehensive performance score for an employee
-        Based on multiple factors: KPIs, goals, feedback, attendance, etc.
+        Prefetch performance aggregates for many employees with four grouped queries
         """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=period_months * 30)
+        return PerformanceContext(
+            period_months=period_months,
+            start_date=start_date,
+            end_date=end_date,
+            aggregates=_performance_aggregates(employee_ids, db, start_date)
+        )
+    
+    @staticmethod
+    def calculate_employee_performance_score(
+        employee_id: int,
+        db: Session,
+        period_months: int = 12,
+        *,
+        employee: Optional[models.Employee] = None,
+        ctx: Optional[PerformanceContext] = None
+    ) -> Dict:
+        """
+        Calculate comprehensive performance score for an employee
+        Based on multiple factors: KPIs, goals, feedback, attendance, etc.
+        Callers that already hold the Employee row can pass it to skip the lookup,
+        and a context from build_context() replaces the aggregate queries.
+        """
+        if ctx is not None and employee_id not in ctx.aggregates:
+            ctx = None
+        if ctx is not None:
+            period_months = ctx.period_months
+        
+        # Memoised on the session, so it lives exactly as long as the request
+        scores = db.info.setdefault("performance_scores", {})
+        key = (employee_id, period_months)
+        if key in scores:
+            return scores[key]
         
         # Get employee
-        employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+        if employee is None:
+            employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
         if not employee:
             return {"error": "Employee not found"}
         
-        # 1. Goal Achievement Score (30% weight)
-        goals = db.query(models.Goal).filter(
-            models.Goal.employee_id == employee_id,
-            models.Goal.created_at >= start_date
-        ).all()
-        
-        goal_score = 0
-        if goals:
-            completed_goals = [g for g in goals if g.status == "completed"]
-            goal_score = (len(completed_goals) / len(goals)) * 100
-        
-        # 2. Performance Review Score (25% weight)
-        reviews = db.query(models.PerformanceReview).filter(
-            models.PerformanceReview.employee_id == employee_id,
-            models.PerformanceReview.review_date >= start_date
-        ).all()
-        
-        review_score = 0
-        if reviews:
-            avg_rating = sum(r.rating for r in reviews) / len(reviews)
-            review_score = (avg_rating / 5.0) * 100  # Convert to percentage
+        # Counts and averages come back from the database; no rows are loaded
+        if ctx is None:
+            ctx = PerformanceService.build_context(db, [employee_id], period_months)
         
-        # 3. Attendance Score (20% weight)
-        attendance_records = db.query(models.Attendance).filter(
-            models.Attendance.employee_id == employee_id,
-            models.Attendance.date >= start_date.date()
-        ).all()
-        
-        attendance_score = 0
-        if attendance_records:
-            present_days = len([a for a in attendance_records if a.status == "present"])
-            attendance_score = (present_days / len(attendance_records)) * 100
-        
-        # 4. Feedback Sentiment Score (15% weight)
-        feedbacks = db.query(models.Feedback).filter(
-            models.Feedback.employee_id == employee_id,
-            models.Feedback.created_at >= start_date
-        ).all()
-        
-        sentiment_score = 50  # Neutral baseline
-        if feedbacks:
-            # Calculate average sentiment (assuming sentiment analysis is done)
-            positive_feedback = len([f for f in feedbacks if "positive" in f.type.lower()])
-            sentiment_score = (positive_feedback / len(feedbacks)) * 100
-        
-        # 5. Learning & Development Score (10% weight)
-        # This would integrate with learning system - using mock for now
-        learning_score = 75  # Mock score
-        
-        # Calculate weighted final score
-        final_score = (
-            goal_score * 0.30 +
-            review_score * 0.25 +
-            attendance_score * 0.20 +
-            sentiment_score * 0.15 +
-            learning_score * 0.10
+        scores[key] = _score_from_aggregates(
+            employee, ctx.aggregates[employee_id], ctx.start_date, ctx.end_date
         )
-        
-        # Determine performance category
-        if final_score >= 90:
-            category = "Outstanding"
-            color = "green"
-        elif final_score >= 80:
-            category = "Exceeds Expectations"
-            color = "blue"
-        elif final_score >= 70:
-            category = "Meets Expectations"
-            color = "yellow"
-        elif final_score >= 60:
-            category = "Needs Improvement"
-            color = "orange"
-        else:
-            category = "Unsatisfactory"
-            color = "red"
-        
-        return {
-            "employee_id": employee_id,
-            "employee_name": f"{employee.first_name} {employee.last_name}",
-            "final_score": round(final_score, 1),
-            "category": category,
-            "color": color,
-            "breakdown": {
-                "goal_achievement": round(goal_score, 1),
-                "performance_reviews": round(review_score, 1),
-                "attendance": round(attendance_score, 1),
-                "feedback_sentiment": round(sentiment_score, 1),
-                "learning_development": round(learning_score, 1)
-            },
-            "metrics": {
-                "total_goals": len(goals),
-                "completed_goals": len([g for g in goals if g.status == "completed"]),
-                "total_reviews": len(reviews),
-                "attendance_days": len(attendance_records),
-                "feedback_count": len(feedbacks)
-            },
-            "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-        }
+        return scores[key]
     
     @staticmethod
     def get_team_performance_analytics(manager_id: int, db: Session) -> Dict:
         """
         Get performance analytics for a manager's team
         """
-        # Get team members
-        team_members = db.query(models.Employee).filter(
-            models.Employee.manager_id == manager_id
-        ).all()
+        # Get team members: current reporting lines from the hierarchy table
+        today = datetime.now().date()
+        team_members = db.query(models.Employee).join(
+            models.EmployeeHierarchy,
+            models.EmployeeHierarchy.employee_id == models.Employee.id
+        ).filter(
+            models.EmployeeHierarchy.manager_id == manager_id,
+            or_(
+                models.EmployeeHierarchy.effective_to.is_(None),
+                models.EmployeeHierarchy.effective_to >= today
+            )
+        ).distinct().all()
         
         if not team_members:
             return {"error": "No team members found"}
         
+        # Four grouped queries for the whole team instead of five per member
+        ctx = PerformanceService.build_context(db, [member.id for member in team_members])
+        
         team_performance = []
         total_score = 0
         
         for member in team_members:
-            perf = PerformanceService.calculate_employee_performance_score(member.id, db)
-            if "error" not in perf:
-                team_performance.append(perf)
-                total_score += perf["final_score"]
+            perf = PerformanceService.calculate_employee_performance_score(
+                member.id, db, employee=member, ctx=ctx
+            )
+            team_performance.append(perf)
+            total_score += perf["final_score"]
         
         avg_team_score = total_score / len(team_performance) if team_performance else 0
         
@@ -161,7 +278,7 @@ class PerformanceService:
             "average_score": round(avg_team_score, 1),
             "performance_distribution": categories,
             "team_performance": team_performance,
-            "top_performers": sorted(team_performance, key=lambda x: x["final_score"], reverse=True)[:3],
+            "top_performers": heapq.nlargest(3, team_performance, key=lambda x: x["final_score"]),
             "improvement_needed": [p for p in team_performance if p["final_score"] < 70]
         }
     
@@ -172,39 +289,58 @@ class PerformanceService:
         """
         trends = []
         current_date = datetime.now()
+        # Month boundaries back from today: boundaries[i + 1] <= month i < boundaries[i]
+        boundaries = [current_date - relativedelta(months=i) for i in range(months + 1)]
         
-        for i in range(months):
-            month_start = current_date - timedelta(days=(i+1)*30)
-            month_end = current_date - timedelta(days=i*30)
-            
-            # Get performance data for this month
-            reviews = db.query(models.PerformanceReview).filter(
+        def window_index(column):
+            """Which month back from now a timestamp falls in (0 = latest)"""
+            return case(*[(column >= boundaries[i + 1], i) for i in range(months)])
+        
+        # One grouped query per source instead of two queries per month
+        review_window = window_index(models.PerformanceReview.review_date).label("window")
+        reviews_by_window = {
+            index: (count, avg_rating)
+            for index, count, avg_rating in db.query(
+                review_window,
+                func.count(),
+                func.avg(models.PerformanceReview.rating)
+            ).filter(
                 models.PerformanceReview.employee_id == employee_id,
-                models.PerformanceReview.review_date >= month_start,
-                models.PerformanceReview.review_date < month_end
-            ).all()
-            
-            goals = db.query(models.Goal).filter(
+                models.PerformanceReview.review_date >= boundaries[-1],
+                models.PerformanceReview.review_date < current_date
+            ).group_by(review_window)
+        }
+        
+        # Goals are bucketed by the month they fall due in
+        goal_window = window_index(models.Goal.due_date).label("window")
+        goals_by_window = {
+            index: (count, completed)
+            for index, count, completed in db.query(
+                goal_window,
+                func.count(),
+                func.sum(case((models.Goal.status == "completed", 1), else_=0))
+            ).filter(
                 models.Goal.employee_id == employee_id,
-                models.Goal.created_at >= month_start,
-                models.Goal.created_at < month_end
-            ).all()
-            
-            avg_rating = 0
-            if reviews:
-                avg_rating = sum(r.rating for r in reviews) / len(reviews)
+                models.Goal.due_date >= boundaries[-1],
+                models.Goal.due_date < current_date
+            ).group_by(goal_window)
+        }
+        
+        for i in range(months):
+            month_start = boundaries[i + 1]
+            review_count, avg_rating = reviews_by_window.get(i, (0, 0))
+            goal_count, completed = goals_by_window.get(i, (0, 0))
             
             goal_completion = 0
-            if goals:
-                completed = len([g for g in goals if g.status == "completed"])
-                goal_completion = (completed / len(goals)) * 100
+            if goal_count:
+                goal_completion = (completed / goal_count) * 100
             
             trends.append({
                 "month": month_start.strftime("%Y-%m"),
                 "performance_rating": round(avg_rating, 1),
                 "goal_completion": round(goal_completion, 1),
-                "review_count": len(reviews),
-                "goal_count": len(goals)
+                "review_count": review_count,
+                "goal_count": goal_count
             })
         
         trends.reverse()  # Show oldest to newest
@@ -215,11 +351,15 @@ class PerformanceService:
         }
     
     @staticmethod
-    def generate_performance_insights(employee_id: int, db: Session) -> Dict:
+    def generate_performance_insights(
+        employee_id: int,
+        db: Session,
+        ctx: Optional[PerformanceContext] = None
+    ) -> Dict:
         """
         Generate AI-powered insights and recommendations for employee performance
         """
-        perf_data = PerformanceService.calculate_employee_performance_score(employee_id, db)
+        perf_data = PerformanceService.calculate_employee_performance_score(employee_id, db, ctx=ctx)
         
         if "error" in perf_data:
             return perf_data
@@ -259,12 +399,20 @@ class PerformanceService:
             recommendations.append("Develop a performance improvement plan")
             recommendations.append("Increase coaching and mentoring support")
         
+        # Sort each component into strengths / improvement areas in one pass
+        strengths, improvement_areas = [], []
+        for component, score in breakdown.items():
+            if score >= 80:
+                strengths.append(component)
+            elif score < 70:
+                improvement_areas.append(component)
+        
         return {
             "employee_id": employee_id,
             "performance_score": perf_data["final_score"],
             "insights": insights,
             "recommendations": recommendations,
-            "strengths": [k for k, v in breakdown.items() if v >= 80],
-            "improvement_areas": [k for k, v in breakdown.items() if v < 70],
+            "strengths": strengths,
+            "improvement_areas": improvement_areas,
             "generated_at": datetime.now().isoformat()
         }
\ No newline at end of file
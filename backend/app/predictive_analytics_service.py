@@ -10,7 +10,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, mean_squared_error, classification_report
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
+from sqlalchemy import func, and_, desc, case, extract
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Any, Optional, Tuple
 import json
@@ -18,9 +18,35 @@ import logging
 from . import models
 import joblib
 import os
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Fitted models stay loaded for the life of the process; the mtime in the key
+# means a retrained file on disk is picked up on the next request
+MODEL_CACHE_SIZE = 8
+
+
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def _load_model(model_path: str, mtime: float):
+    """Unpickle a saved model once per (path, mtime)"""
+    return joblib.load(model_path)
+
+
+# Departments one-hot encoded into the attrition features, in column order
+ATTRITION_DEPARTMENTS = ["Engineering", "Sales", "HR"]
+
+# Pulse survey moods on the 1-5 satisfaction scale engagement is built from
+MOOD_SCORES = {"terrible": 1, "bad": 2, "okay": 3, "good": 4, "amazing": 5}
+
+
+def _years_of_service(employee: models.Employee) -> float:
+    """Tenure in years from the joining date, standing in for experience"""
+    if not employee.date_of_joining:
+        return 0.0
+    return max((datetime.now() - employee.date_of_joining).days / 365.25, 0.0)
+
+
 class PredictiveAnalyticsService:
     """Advanced predictive analytics for HR management"""
     
@@ -28,6 +54,17 @@ class PredictiveAnalyticsService:
         self.db = db
         self.models_dir = "ml_models"
         os.makedirs(self.models_dir, exist_ok=True)
+        self._attrition_model = None
+        self._performance_model = None
+        self._recruitment_model = None
+        # Per-employee values filled in bulk by the _prefetch_* methods
+        self._attrition_feature_cache: Dict[int, np.ndarray] = {}
+        self._performance_feature_cache: Dict[int, List[float]] = {}
+        self._current_ratings: Dict[int, float] = {}
+        self._current_salaries: Dict[int, float] = {}
+        self._engagement_scores: Dict[int, float] = {}
+        self._attendance_rates: Dict[int, float] = {}
+        self._course_completion_rates: Dict[int, float] = {}
     
     # ============================================
     # EMPLOYEE ATTRITION PREDICTION
@@ -42,17 +79,20 @@ class PredictiveAnalyticsService:
                 query = query.filter(models.Employee.id.in_(employee_ids))
             
             employees = query.all()
+            if not employees:
+                return []
+            
+            # Extract features for attrition prediction
+            features_matrix = self._build_attrition_feature_matrix(employees)
+            
+            # Load or train attrition model
+            model = self._get_or_train_attrition_model()
+            
+            # One predict_proba over every employee instead of one call per row
+            probabilities = model.predict_proba(features_matrix)[:, 1]  # Probability of leaving
             predictions = []
             
-            for employee in employees:
-                # Extract features for attrition prediction
-                features = self._extract_attrition_features(employee)
-                
-                # Load or train attrition model
-                model = self._get_or_train_attrition_model()
-                
-                # Make prediction
-                probability = model.predict_proba([features])[0][1]  # Probability of leaving
+            for employee, features, probability in zip(employees, features_matrix, probabilities):
                 risk_level = self._categorize_attrition_risk(probability)
                 contributing_factors = self._identify_attrition_factors(employee, features)
                 
@@ -84,83 +124,102 @@ class PredictiveAnalyticsService:
             logger.error(f"Error in attrition prediction: {str(e)}")
             return []
     
-    def _extract_attrition_features(self, employee: models.Employee) -> List[float]:
+    def _extract_attrition_features(self, employee: models.Employee) -> np.ndarray:
         """Extract features for attrition prediction"""
-        features = []
-        
-        # Basic employee info
-        features.append(employee.years_of_experience or 0)
-        features.append(1 if employee.department == "Engineering" else 0)
-        features.append(1 if employee.department == "Sales" else 0)
-        features.append(1 if employee.department == "HR" else 0)
-        
-        # Performance metrics
-        latest_review = self.db.query(models.PerformanceReview)\
-            .filter(models.PerformanceReview.employee_id == employee.id)\
-            .order_by(desc(models.PerformanceReview.review_date))\
-            .first()
-        
-        features.append(latest_review.overall_rating if latest_review else 3.0)
-        features.append(latest_review.manager_rating if latest_review else 3.0)
+        if employee.id not in self._attrition_feature_cache:
+            self._build_attrition_feature_matrix([employee])
+        return self._attrition_feature_cache[employee.id]
+    
+    def _build_attrition_feature_matrix(self, employees: List[models.Employee]) -> np.ndarray:
+        """Attrition features for many employees as one (N, 10) matrix, one grouped query per source"""
+        employee_ids = [employee.id for employee in employees]
+        
+        # Performance metrics: latest rating overall and latest from a manager review
+        self._prefetch_current_ratings(employee_ids)
+        latest_manager_reviews = self._latest_rows_by_employee(
+            employee_ids,
+            models.PerformanceReview.employee_id,
+            models.PerformanceReview.review_date,
+            1,
+            models.PerformanceReview.rating,
+            where=(
+                models.PerformanceReview.review_type == "manager",
+                models.PerformanceReview.rating.isnot(None)
+            )
+        )
         
         # Attendance patterns
-        attendance_count = self.db.query(func.count(models.Attendance.id))\
+        attendance_counts = dict(
+            self.db.query(models.Attendance.employee_id, func.count(models.Attendance.id))
             .filter(
-                models.Attendance.employee_id == employee.id,
+                models.Attendance.employee_id.in_(employee_ids),
                 models.Attendance.date >= datetime.now() - timedelta(days=90)
-            ).scalar() or 0
-        
-        features.append(attendance_count)
-        
-        # Leave usage
-        leave_days = self.db.query(func.sum(models.LeaveRequest.days_requested))\
-            .filter(
-                models.LeaveRequest.employee_id == employee.id,
-                models.LeaveRequest.status == "approved",
-                models.LeaveRequest.start_date >= datetime.now() - timedelta(days=365)
-            ).scalar() or 0
-        
-        features.append(leave_days)
-        
-        # Salary information
-        salary_structure = self.db.query(models.SalaryStructure)\
-            .filter(models.SalaryStructure.employee_id == employee.id)\
-            .order_by(desc(models.SalaryStructure.effective_date))\
-            .first()
-        
-        features.append(salary_structure.basic_salary if salary_structure else 50000)
+            ).group_by(models.Attendance.employee_id).all()
+        )
         
-        # Engagement metrics
-        engagement_score = self._calculate_engagement_score(employee.id)
-        features.append(engagement_score)
+        # Leave usage: inclusive days between start and end of each approved request
+        leave_request = models.LeaveRequest
+        leave_days = {
+            employee_id: float(days or 0)  # Postgres sums this as NUMERIC
+            for employee_id, days in self.db.query(
+                leave_request.employee_id,
+                func.sum(extract('epoch', leave_request.end_date - leave_request.start_date) / 86400 + 1)
+            ).filter(
+                leave_request.employee_id.in_(employee_ids),
+                leave_request.status == "approved",
+                leave_request.start_date >= datetime.now() - timedelta(days=365)
+            ).group_by(leave_request.employee_id)
+        }
         
-        return features
+        # Salary information and engagement metrics
+        self._prefetch_current_salaries(employee_ids)
+        self._prefetch_engagement_scores(employee_ids)
+        
+        # Basic employee info, then every per-employee aggregate joined on by id
+        df = pd.DataFrame({
+            "employee_id": employee_ids,
+            "years_of_service": [_years_of_service(employee) for employee in employees],
+            "department": [employee.department for employee in employees]
+        })
+        ids = df["employee_id"]
+        features = pd.concat([
+            df["years_of_service"],
+            pd.get_dummies(df["department"]).reindex(columns=ATTRITION_DEPARTMENTS, fill_value=0),
+            ids.map(self._current_ratings),
+            ids.map({employee_id: reviews[0].rating for employee_id, reviews in latest_manager_reviews.items()}).fillna(3.0),
+            ids.map(attendance_counts).fillna(0),
+            ids.map(leave_days).fillna(0),
+            ids.map(self._current_salaries),
+            ids.map(self._engagement_scores)
+        ], axis=1)
+        
+        # Tree ensembles compare features as float32, so hand them that directly
+        matrix = features.to_numpy(dtype=np.float32)
+        self._attrition_feature_cache.update(zip(employee_ids, matrix))
+        return matrix
     
     def _get_or_train_attrition_model(self):
         """Get existing attrition model or train a new one"""
+        if self._attrition_model is not None:
+            return self._attrition_model
+        
         model_path = os.path.join(self.models_dir, "attrition_model.joblib")
         
         if os.path.exists(model_path):
-            return joblib.load(model_path)
-        
-        # Train new model with historical data
-        return self._train_attrition_model()
+            self._attrition_model = _load_model(model_path, os.path.getmtime(model_path))
+        else:
+            # Train new model with historical data
+            self._attrition_model = self._train_attrition_model()
+        return self._attrition_model
     
     def _train_attrition_model(self):
         """Train attrition prediction model"""
         # Get historical employee data
         employees = self.db.query(models.Employee).all()
         
-        X = []
-        y = []
-        
-        for employee in employees:
-            features = self._extract_attrition_features(employee)
-            # For demo, use random attrition labels (in real scenario, use actual historical data)
-            attrition = np.random.choice([0, 1], p=[0.8, 0.2])  # 20% attrition rate
-            
-            X.append(features)
-            y.append(attrition)
+        X = self._build_attrition_feature_matrix(employees) if employees else []
+        # For demo, use random attrition labels (in real scenario, use actual historical data)
+        y = np.random.choice([0, 1], len(employees), p=[0.8, 0.2])  # 20% attrition rate
         
         if len(X) < 10:  # Not enough data, return dummy model
             model = RandomForestClassifier(n_estimators=10, random_state=42)
@@ -251,17 +310,21 @@ class PredictiveAnalyticsService:
                 query = query.filter(models.Employee.id.in_(employee_ids))
             
             employees = query.all()
+            if not employees:
+                return []
+            
+            # Extract performance features
+            self._prefetch_performance_features(employees)
+            features_list = [self._extract_performance_features(employee) for employee in employees]
+            
+            # Load or train performance model
+            model = self._get_or_train_performance_model()
+            
+            # One predict over every employee instead of one call per row
+            predicted_ratings = model.predict(np.asarray(features_list, dtype=np.float32))
             forecasts = []
             
-            for employee in employees:
-                # Extract performance features
-                features = self._extract_performance_features(employee)
-                
-                # Load or train performance model
-                model = self._get_or_train_performance_model()
-                
-                # Make prediction
-                predicted_rating = model.predict([features])[0]
+            for employee, features, predicted_rating in zip(employees, features_list, predicted_ratings):
                 predicted_kpi_score = min(max(predicted_rating * 20, 0), 100)  # Convert to 0-100 scale
                 
                 growth_trajectory = self._determine_growth_trajectory(employee, predicted_rating)
@@ -299,62 +362,82 @@ class PredictiveAnalyticsService:
     
     def _extract_performance_features(self, employee: models.Employee) -> List[float]:
         """Extract features for performance prediction"""
-        features = []
+        if employee.id not in self._performance_feature_cache:
+            self._prefetch_performance_features([employee])
+        return self._performance_feature_cache[employee.id]
+    
+    def _prefetch_performance_features(self, employees: List[models.Employee]) -> None:
+        """Build performance features for many employees with one query per source"""
+        employee_ids = [employee.id for employee in employees]
         
         # Historical performance ratings
-        reviews = self.db.query(models.PerformanceReview)\
-            .filter(models.PerformanceReview.employee_id == employee.id)\
-            .order_by(desc(models.PerformanceReview.review_date))\
-            .limit(3).all()
-        
-        # Average ratings from last 3 reviews
-        if reviews:
-            avg_rating = sum(r.overall_rating for r in reviews) / len(reviews)
-            rating_trend = self._calculate_rating_trend(reviews)
-        else:
-            avg_rating = 3.0
-            rating_trend = 0.0
-        
-        features.extend([avg_rating, rating_trend])
-        
-        # KPI performance
-        kpi_scores = self.db.query(models.KPIProgress)\
-            .filter(models.KPIProgress.employee_id == employee.id)\
-            .order_by(desc(models.KPIProgress.updated_at))\
-            .limit(5).all()
-        
-        avg_kpi = sum(k.progress_percentage for k in kpi_scores) / len(kpi_scores) if kpi_scores else 75.0
-        features.append(avg_kpi / 100.0)  # Normalize to 0-1
-        
-        # Attendance consistency
-        attendance_rate = self._calculate_attendance_rate(employee.id)
-        features.append(attendance_rate)
-        
-        # Learning and development
-        course_completion = self._calculate_course_completion_rate(employee.id)
-        features.append(course_completion)
-        
-        # Engagement metrics
-        engagement_score = self._calculate_engagement_score(employee.id)
-        features.append(engagement_score)
+        recent_reviews = self._latest_rows_by_employee(
+            employee_ids,
+            models.PerformanceReview.employee_id,
+            models.PerformanceReview.review_date,
+            3,
+            models.PerformanceReview.rating,
+            where=(models.PerformanceReview.rating.isnot(None),)
+        )
+        for employee_id in employee_ids:
+            reviews = recent_reviews.get(employee_id)
+            self._current_ratings[employee_id] = reviews[0].rating if reviews else 3.0
+        
+        # KPI performance: the employee's most recently updated KPIs
+        recent_kpis = self._latest_rows_by_employee(
+            employee_ids,
+            models.KPI.employee_id,
+            models.KPI.updated_at,
+            5,
+            models.KPI.progress_percentage,
+            where=(models.KPI.progress_percentage.isnot(None),)
+        )
         
-        # Experience and tenure
-        features.append(employee.years_of_experience or 0)
+        # Attendance consistency, learning and development, engagement metrics
+        self._prefetch_attendance_rates(employee_ids)
+        self._prefetch_course_completion_rates(employee_ids)
+        self._prefetch_engagement_scores(employee_ids)
         
-        return features
+        for employee in employees:
+            # Average ratings from last 3 reviews
+            reviews = recent_reviews.get(employee.id)
+            if reviews:
+                avg_rating = sum(r.rating for r in reviews) / len(reviews)
+                rating_trend = self._calculate_rating_trend(reviews)
+            else:
+                avg_rating = 3.0
+                rating_trend = 0.0
+            
+            kpi_scores = recent_kpis.get(employee.id)
+            avg_kpi = sum(k.progress_percentage for k in kpi_scores) / len(kpi_scores) if kpi_scores else 75.0
+            
+            self._performance_feature_cache[employee.id] = [
+                avg_rating,
+                rating_trend,
+                avg_kpi / 100.0,  # Normalize to 0-1
+                self._attendance_rates[employee.id],
+                self._course_completion_rates[employee.id],
+                self._engagement_scores[employee.id],
+                _years_of_service(employee)  # Experience and tenure
+            ]
     
     def _get_or_train_performance_model(self):
         """Get existing performance model or train a new one"""
+        if self._performance_model is not None:
+            return self._performance_model
+        
         model_path = os.path.join(self.models_dir, "performance_model.joblib")
         
         if os.path.exists(model_path):
-            return joblib.load(model_path)
-        
-        return self._train_performance_model()
+            self._performance_model = _load_model(model_path, os.path.getmtime(model_path))
+        else:
+            self._performance_model = self._train_performance_model()
+        return self._performance_model
     
     def _train_performance_model(self):
         """Train performance prediction model"""
         employees = self.db.query(models.Employee).all()
+        self._prefetch_performance_features(employees)
         
         X = []
         y = []
@@ -399,6 +482,10 @@ class PredictiveAnalyticsService:
             employees = query.all()
             optimizations = []
             
+            employee_ids = [employee.id for employee in employees]
+            self._prefetch_current_salaries(employee_ids)
+            self._prefetch_current_ratings(employee_ids)
+            
             for employee in employees:
                 current_salary = self._get_current_salary(employee.id)
                 market_data = self._get_market_salary_data(employee)
@@ -459,17 +546,20 @@ class PredictiveAnalyticsService:
                 query = query.filter(models.Application.id.in_(application_ids))
             
             applications = query.all()
+            if not applications:
+                return []
+            
+            # Extract candidate features
+            features_list = [self._extract_candidate_features(application) for application in applications]
+            
+            # Load or train recruitment model
+            model = self._get_or_train_recruitment_model()
+            
+            # One predict_proba over every candidate instead of one call per row
+            success_probs = model.predict_proba(np.asarray(features_list, dtype=np.float32))[:, 1]
             predictions = []
             
-            for application in applications:
-                # Extract candidate features
-                features = self._extract_candidate_features(application)
-                
-                # Load or train recruitment model
-                model = self._get_or_train_recruitment_model()
-                
-                # Make predictions
-                success_prob = model.predict_proba([features])[0][1]
+            for application, features, success_prob in zip(applications, features_list, success_probs):
                 performance_pred = self._predict_candidate_performance(features)
                 cultural_fit = self._assess_cultural_fit(application)
                 retention_likelihood = self._predict_retention_likelihood(features)
@@ -582,60 +672,141 @@ class PredictiveAnalyticsService:
     # HELPER METHODS
     # ============================================
     
+    def _latest_rows_by_employee(self, employee_ids: List[int], employee_column, order_column,
+                                 limit: int, *columns, where: Tuple = ()) -> Dict[int, List[Any]]:
+        """Newest `limit` rows per employee, newest first, from one window-function query"""
+        if not employee_ids:
+            return {}
+        
+        ranked = self.db.query(
+            employee_column.label("employee_id"),
+            *columns,
+            func.row_number().over(
+                partition_by=employee_column,
+                order_by=desc(order_column)
+            ).label("row_rank")
+        ).filter(employee_column.in_(employee_ids), *where).subquery()
+        
+        rows_by_employee = {}
+        for row in self.db.query(*ranked.c)\
+                .filter(ranked.c.row_rank <= limit)\
+                .order_by(ranked.c.employee_id, ranked.c.row_rank):
+            rows_by_employee.setdefault(row.employee_id, []).append(row)
+        return rows_by_employee
+    
     def _calculate_engagement_score(self, employee_id: int) -> float:
         """Calculate employee engagement score"""
+        if employee_id not in self._engagement_scores:
+            self._prefetch_engagement_scores([employee_id])
+        return self._engagement_scores[employee_id]
+    
+    def _prefetch_engagement_scores(self, employee_ids: List[int]) -> None:
+        """Engagement scores for many employees from one query"""
         # Get recent pulse survey responses
-        surveys = self.db.query(models.PulseSurvey)\
-            .filter(models.PulseSurvey.employee_id == employee_id)\
-            .order_by(desc(models.PulseSurvey.created_at))\
-            .limit(3).all()
-        
-        if surveys:
-            avg_score = sum(s.satisfaction_score for s in surveys) / len(surveys)
-            return avg_score / 5.0  # Normalize to 0-1
+        recent_surveys = self._latest_rows_by_employee(
+            employee_ids,
+            models.PulseSurvey.employee_id,
+            models.PulseSurvey.submitted_at,
+            3,
+            models.PulseSurvey.mood
+        )
         
-        return 0.7  # Default engagement score
+        for employee_id in employee_ids:
+            surveys = recent_surveys.get(employee_id)
+            if surveys:
+                avg_score = sum(MOOD_SCORES.get(s.mood, 3) for s in surveys) / len(surveys)
+                self._engagement_scores[employee_id] = avg_score / 5.0  # Normalize to 0-1
+            else:
+                self._engagement_scores[employee_id] = 0.7  # Default engagement score
     
     def _calculate_attendance_rate(self, employee_id: int) -> float:
         """Calculate attendance rate for last 90 days"""
+        if employee_id not in self._attendance_rates:
+            self._prefetch_attendance_rates([employee_id])
+        return self._attendance_rates[employee_id]
+    
+    def _prefetch_attendance_rates(self, employee_ids: List[int]) -> None:
+        """Attendance rates for many employees from one grouped query"""
         total_days = 90
-        attended_days = self.db.query(func.count(models.Attendance.id))\
+        attended_days = dict(
+            self.db.query(models.Attendance.employee_id, func.count(models.Attendance.id))
             .filter(
-                models.Attendance.employee_id == employee_id,
+                models.Attendance.employee_id.in_(employee_ids),
                 models.Attendance.date >= datetime.now() - timedelta(days=total_days),
                 models.Attendance.status == "present"
-            ).scalar() or 0
+            ).group_by(models.Attendance.employee_id).all()
+        )
         
-        return min(attended_days / (total_days * 0.7), 1.0)  # Assuming 5 working days per week
+        for employee_id in employee_ids:
+            # Assuming 5 working days per week
+            self._attendance_rates[employee_id] = min(
+                attended_days.get(employee_id, 0) / (total_days * 0.7), 1.0
+            )
     
     def _calculate_course_completion_rate(self, employee_id: int) -> float:
         """Calculate learning course completion rate"""
-        enrollments = self.db.query(models.Enrollment)\
-            .filter(models.Enrollment.employee_id == employee_id).all()
-        
-        if not enrollments:
-            return 0.5  # Default completion rate
+        if employee_id not in self._course_completion_rates:
+            self._prefetch_course_completion_rates([employee_id])
+        return self._course_completion_rates[employee_id]
+    
+    def _prefetch_course_completion_rates(self, employee_ids: List[int]) -> None:
+        """Course completion rates for many employees from one grouped query"""
+        enrollments = {
+            employee_id: (total, completed)
+            for employee_id, total, completed in self.db.query(
+                models.Enrollment.employee_id,
+                func.count(models.Enrollment.id),
+                func.sum(case((models.Enrollment.progress >= 100, 1), else_=0))
+            ).filter(
+                models.Enrollment.employee_id.in_(employee_ids)
+            ).group_by(models.Enrollment.employee_id)
+        }
         
-        completed = sum(1 for e in enrollments if e.completion_status == "completed")
-        return completed / len(enrollments)
+        for employee_id in employee_ids:
+            total, completed = enrollments.get(employee_id, (0, 0))
+            # Default completion rate without enrollments
+            self._course_completion_rates[employee_id] = completed / total if total else 0.5
     
     def _get_current_rating(self, employee_id: int) -> float:
         """Get current performance rating"""
-        latest_review = self.db.query(models.PerformanceReview)\
-            .filter(models.PerformanceReview.employee_id == employee_id)\
-            .order_by(desc(models.PerformanceReview.review_date))\
-            .first()
+        if employee_id not in self._current_ratings:
+            self._prefetch_current_ratings([employee_id])
+        return self._current_ratings[employee_id]
+    
+    def _prefetch_current_ratings(self, employee_ids: List[int]) -> None:
+        """Latest performance rating for many employees from one query"""
+        latest_reviews = self._latest_rows_by_employee(
+            employee_ids,
+            models.PerformanceReview.employee_id,
+            models.PerformanceReview.review_date,
+            1,
+            models.PerformanceReview.rating,
+            where=(models.PerformanceReview.rating.isnot(None),)
+        )
         
-        return latest_review.overall_rating if latest_review else 3.0
+        for employee_id in employee_ids:
+            reviews = latest_reviews.get(employee_id)
+            self._current_ratings[employee_id] = reviews[0].rating if reviews else 3.0
     
     def _get_current_salary(self, employee_id: int) -> float:
         """Get current salary for employee"""
-        salary_structure = self.db.query(models.SalaryStructure)\
-            .filter(models.SalaryStructure.employee_id == employee_id)\
-            .order_by(desc(models.SalaryStructure.effective_date))\
-            .first()
+        if employee_id not in self._current_salaries:
+            self._prefetch_current_salaries([employee_id])
+        return self._current_salaries[employee_id]
+    
+    def _prefetch_current_salaries(self, employee_ids: List[int]) -> None:
+        """Current basic salary for many employees from one query"""
+        latest_structures = self._latest_rows_by_employee(
+            employee_ids,
+            models.SalaryStructure.employee_id,
+            models.SalaryStructure.effective_date,
+            1,
+            models.SalaryStructure.basic_salary
+        )
         
-        return salary_structure.basic_salary if salary_structure else 50000.0
+        for employee_id in employee_ids:
+            structures = latest_structures.get(employee_id)
+            self._current_salaries[employee_id] = structures[0].basic_salary if structures else 50000.0
     
     # Additional helper methods would be implemented here...
     # (Truncated for brevity, but would include all the referenced helper methods)
@@ -645,7 +816,7 @@ class PredictiveAnalyticsService:
         if len(reviews) < 2:
             return 0.0
         
-        ratings = [r.overall_rating for r in reversed(reviews)]
+        ratings = [r.rating for r in reversed(reviews)]
         return (ratings[-1] - ratings[0]) / len(ratings)
     
     def _determine_growth_trajectory(self, employee: models.Employee, predicted_rating: float) -> str:
@@ -723,7 +894,7 @@ class PredictiveAnalyticsService:
         }.get(employee.department, 60000)
         
         # Adjust for experience
-        experience_multiplier = 1 + (employee.years_of_experience or 0) * 0.05
+        experience_multiplier = 1 + _years_of_service(employee) * 0.05
         market_salary = base_market_salary * experience_multiplier
         
         return {
@@ -886,12 +1057,16 @@ class PredictiveAnalyticsService:
     
     def _get_or_train_recruitment_model(self):
         """Get existing recruitment model or train a new one"""
+        if self._recruitment_model is not None:
+            return self._recruitment_model
+        
         model_path = os.path.join(self.models_dir, "recruitment_model.joblib")
         
         if os.path.exists(model_path):
-            return joblib.load(model_path)
-        
-        return self._train_recruitment_model()
+            self._recruitment_model = _load_model(model_path, os.path.getmtime(model_path))
+        else:
+            self._recruitment_model = self._train_recruitment_model()
+        return self._recruitment_model
     
     def _train_recruitment_model(self):
         """Train recruitment success prediction model"""
@@ -1036,8 +1211,8 @@ class PredictiveAnalyticsService:
                 .order_by(desc(models.PerformanceReview.review_date))\
                 .first()
             
-            if latest_review:
-                total_rating += latest_review.overall_rating
+            if latest_review and latest_review.rating is not None:
+                total_rating += latest_review.rating
                 rating_count += 1
         
         avg_performance = total_rating / rating_count if rating_count > 0 else 3.0
@@ -1161,7 +1336,7 @@ class PredictiveAnalyticsService:
         # Identify based on experience and performance
         for member in team_members:
             rating = self._get_current_rating(member.id)
-            experience = member.years_of_experience or 0
+            experience = _years_of_service(member)
             
             # Key influencer criteria: high performance + experience OR senior position
             if (rating >= 4.0 and experience >= 5) or "Senior" in (member.position or ""):
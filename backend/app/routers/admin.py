@@ -5,6 +5,7 @@ from datetime import datetime
 from app import database, models
 from app.dependencies import get_current_user
 from app.admin_service import AdminService
+from app.notification_service import invalidate_recipient_cache
 from app.role_utils import require_roles
 from pydantic import BaseModel
 import json
@@ -295,6 +296,7 @@ async def activate_user(
     
     user.is_active = True
     db.commit()
+    invalidate_recipient_cache()
     
     # Log the activation
     admin_service = AdminService(db)
@@ -336,6 +338,7 @@ async def deactivate_user(
     
     user.is_active = False
     db.commit()
+    invalidate_recipient_cache()
     
     # Log the deactivation
     admin_service = AdminService(db)
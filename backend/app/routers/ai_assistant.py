@@ -611,10 +611,12 @@ class AIAssistantService:
             ""
         ]
         
+        # Count goals once; the summary and the response data share the counts
+        completed_goals = sum(1 for g in goals if g.status == 'completed')
+        
         # Add goals information
         if goals:
-            completed_goals = len([g for g in goals if g.status == 'completed'])
-            in_progress_goals = len([g for g in goals if g.status == 'in_progress'])
+            in_progress_goals = sum(1 for g in goals if g.status == 'in_progress')
             
             response_parts.extend([
                 "🎯 **Goals Progress:**",
@@ -641,7 +643,7 @@ class AIAssistantService:
                 "latest_rating": latest_review.rating,
                 "average_rating": round(avg_rating, 1),
                 "total_reviews": len(reviews),
-                "completed_goals": len([g for g in goals if g.status == 'completed']) if goals else 0,
+                "completed_goals": completed_goals,
                 "total_goals": len(goals) if goals else 0
             },
             suggestions=[
@@ -6,6 +6,7 @@ import os
 from datetime import datetime
 from app import database, models, schemas
 from app.employee_service import EmployeeService
+from app.notification_service import invalidate_recipient_cache
 from app.role_utils import require_roles
 
 router = APIRouter(
@@ -213,6 +214,7 @@ def update_employee_status(
         if new_status in ['active', 'inactive']:
             user.is_active = (new_status == 'active')
             db.commit()
+            invalidate_recipient_cache()
             return {"message": f"Employee status updated to {new_status}"}
     
     raise HTTPException(status_code=400, detail="Invalid status")
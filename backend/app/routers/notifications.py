@@ -4,7 +4,9 @@ from typing import List, Dict
 from app import database, models, schemas
 from app.dependencies import get_current_user
 from datetime import datetime
+import asyncio
 import json
+from app.notification_service import get_redis_client, REALTIME_CHANNEL
 
 router = APIRouter(
     prefix="/notifications",
@@ -45,10 +47,28 @@ class NotificationManager:
 # Global notification manager instance
 notification_manager = NotificationManager()
 
+async def forward_published_notifications(websocket: WebSocket, user_id: int, redis):
+    """Relay notifications published for this user on Redis to their socket"""
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(REALTIME_CHANNEL.format(user_id=user_id))
+    try:
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                await websocket.send_text(message["data"].decode())
+    finally:
+        await pubsub.reset()
+
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
     """WebSocket endpoint for real-time notifications"""
     await notification_manager.connect(websocket, user_id)
+    
+    # Push notifications as they are created instead of waiting for a poll
+    redis = get_redis_client()
+    forwarder = None
+    if redis is not None:
+        forwarder = asyncio.create_task(forward_published_notifications(websocket, user_id, redis))
+    
     try:
         while True:
             # Keep connection alive and listen for client messages
@@ -57,6 +77,9 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
             await websocket.send_text(f"Heartbeat: {data}")
     except WebSocketDisconnect:
         notification_manager.disconnect(user_id)
+    finally:
+        if forwarder is not None:
+            forwarder.cancel()
 
 @router.get("/", response_model=List[dict])
 def get_user_notifications(
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from typing import List
 from app import database, models, schemas
 from app.dependencies import get_current_user
@@ -646,7 +646,9 @@ def get_pending_compliance_approvals(
     pending_approvals = db.query(models.OnboardingApproval).filter(
         models.OnboardingApproval.approval_stage == "compliance_review",
         models.OnboardingApproval.status == "pending"
-    ).join(models.Employee).all()
+    ).join(models.Employee).options(
+        contains_eager(models.OnboardingApproval.employee)
+    ).all()
     
     return [
         {
@@ -9,7 +9,7 @@ from app.role_utils import require_role
 from pydantic import BaseModel
 import io
 import pandas as pd
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 
 router = APIRouter(
     prefix="/payroll",
@@ -81,12 +81,13 @@ def get_my_payslip(
         raise HTTPException(status_code=404, detail="Payslip not found")
     
     payroll_service = PayrollService(db)
-    result = payroll_service.generate_payslip_data(payroll_id)
+    try:
+        payslip = payroll_service.generate_payslip_json(payroll)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["error"])
-    
-    return result["payslip"]
+    # Already serialised (and cached once approved), so skip response encoding
+    return Response(content=payslip, media_type="application/json")
 
 # HR/Admin Payroll Management Endpoints
 
@@ -107,6 +108,23 @@ def get_employee_payroll(
     
     return payrolls
 
+@router.get("/records", response_model=List[schemas.PayrollOut])
+def list_payroll_records(
+    employee_id: Optional[int] = None,
+    after_month: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(require_role(["admin", "hr", "hr_manager", "super_admin"]))
+):
+    """Page through payroll records, newest month first (HR/Admin only)
+
+    Pass the month and id of the last record received as after_month and
+    after_id to fetch the next page.
+    """
+    payroll_service = PayrollService(db)
+    return payroll_service.list_payrolls(employee_id, after_month, after_id, limit)
+
 @router.post("/calculate")
 def calculate_payroll(
     request: PayrollCalculationRequest,
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List
 from datetime import datetime
+import orjson
 from app import database, models, schemas
 from app.dependencies import get_current_user
 
@@ -202,29 +203,33 @@ def analyze_engagement(data: schemas.EngagementAnalysisRequest):
 
 # --- Advanced Performance Analytics ---
 
+def _analytics_response(data: Any) -> Response:
+    """Serialise a float-heavy analytics payload directly, skipping jsonable_encoder"""
+    return Response(content=orjson.dumps(data), media_type="application/json")
+
 @router.get("/employee/{employee_id}/score")
 def get_employee_performance_score(employee_id: int, db: Session = Depends(database.get_db)):
     """Get comprehensive performance score for an employee"""
     from app.performance_service import PerformanceService
-    return PerformanceService.calculate_employee_performance_score(employee_id, db)
+    return _analytics_response(PerformanceService.calculate_employee_performance_score(employee_id, db))
 
 @router.get("/employee/{employee_id}/trends")
 def get_performance_trends(employee_id: int, months: int = 12, db: Session = Depends(database.get_db)):
     """Get performance trends over time"""
     from app.performance_service import PerformanceService
-    return PerformanceService.get_performance_trends(employee_id, db, months)
+    return _analytics_response(PerformanceService.get_performance_trends(employee_id, db, months))
 
 @router.get("/employee/{employee_id}/insights")
 def get_performance_insights(employee_id: int, db: Session = Depends(database.get_db)):
     """Get AI-powered performance insights and recommendations"""
     from app.performance_service import PerformanceService
-    return PerformanceService.generate_performance_insights(employee_id, db)
+    return _analytics_response(PerformanceService.generate_performance_insights(employee_id, db))
 
 @router.get("/team/{manager_id}/analytics")
 def get_team_performance_analytics(manager_id: int, db: Session = Depends(database.get_db)):
     """Get performance analytics for a manager's team"""
     from app.performance_service import PerformanceService
-    return PerformanceService.get_team_performance_analytics(manager_id, db)
+    return _analytics_response(PerformanceService.get_team_performance_analytics(manager_id, db))
 
 @router.get("/kpis/employee/{employee_id}")
 def get_employee_kpis(employee_id: int, db: Session = Depends(database.get_db)):
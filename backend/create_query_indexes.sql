@@ -0,0 +1,69 @@
+-- Indexes for hot notification/reporting queries
+-- Safe to re-run. CONCURRENTLY avoids locking writes, so run this file
+-- outside a transaction block (e.g. psql -f create_query_indexes.sql).
+
+-- ============================================
+-- NOTIFICATIONS
+-- ============================================
+
+-- WHERE role IN (...) AND is_active = true (HR/approver recipient lists)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_role_active
+    ON users(role, is_active) WHERE is_active = true;
+
+-- Daily application summary: applied_date >= now() - 1 day
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_applications_applied_date
+    ON applications(applied_date);
+
+-- ============================================
+-- ONBOARDING
+-- ============================================
+
+-- ON CONFLICT (employee_id, approval_stage) for the approval get-or-create.
+-- Remove any duplicate (employee_id, approval_stage) rows before running.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_onboarding_approvals_employee_stage
+    ON onboarding_approvals(employee_id, approval_stage);
+
+-- Pending compliance reviews: approval_stage = ... AND status = 'pending'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_onboarding_approvals_pending_stage
+    ON onboarding_approvals(approval_stage) WHERE status = 'pending';
+
+-- Latest IT provisioning ticket per employee (onboarding progress)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_it_tickets_employee_id
+    ON it_provisioning_tickets(employee_id, id);
+
+-- ============================================
+-- PAYROLL
+-- ============================================
+
+-- ON CONFLICT (employee_id, month) for the payroll upsert.
+-- Remove any duplicate (employee_id, month) rows before running.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_payroll_employee_month
+    ON payroll(employee_id, month);
+
+-- Month of attendance per employee: employee_id IN (...) AND date >= ... AND date < ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_attendance_employee_date
+    ON attendance(employee_id, date);
+
+-- Approved payrolls for a month: month = ... AND status = 'approved'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payroll_month_status
+    ON payroll(month, status);
+
+-- Payroll listing pages: ORDER BY month DESC, id DESC after a (month, id) cursor
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payroll_month_id
+    ON payroll(month, id);
+
+-- ============================================
+-- PERFORMANCE
+-- ============================================
+
+-- Review aggregates per employee: employee_id = ... AND review_date >= ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_performance_reviews_employee_date
+    ON performance_reviews(employee_id, review_date);
+
+-- Goal counts per employee, split by status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_goals_employee_status
+    ON goals(employee_id, status);
+
+-- Feedback aggregates per employee: employee_id = ... AND created_at >= ...
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_feedbacks_employee_created
+    ON feedbacks(employee_id, created_at);
@@ -1,7 +1,9 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.database import engine, Base
+from app.notification_service import start_email_queue, stop_email_queue
 from datetime import datetime
 import os
 from app.routers import (
@@ -45,7 +47,14 @@ from app.routers import (
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="AI HR Management System API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Outbound email workers run on the server's event loop
+    start_email_queue()
+    yield
+    await stop_email_queue()
+
+app = FastAPI(title="AI HR Management System API", lifespan=lifespan)
 
 # CORS setup
 origins = [
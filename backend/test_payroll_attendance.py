@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Payroll attendance amounts: worked days and overtime from the attendance totals
+
+Before these were used, any employee with a present or half-day row was paid
+from the 22/22-day fallback with no overtime. The cases below pin the
+amounts paid now and the cases that did not change.
+"""
+
+from types import SimpleNamespace
+
+from app.payroll_service import PayrollService
+
+YEAR, MONTH = 2026, 3
+
+# 125.00 an hour (22 days x 8 hours), 187.50 an hour of overtime
+STRUCTURE = SimpleNamespace(
+    basic_salary=22000.0,
+    hra=8800.0,
+    transport_allowance=1100.0,
+    medical_allowance=1100.0,
+    special_allowance=4400.0,
+    other_allowances=0.0
+)
+
+
+def make_service(working_days=22):
+    """PayrollService without a database; working days are preset for the month"""
+    service = PayrollService.__new__(PayrollService)
+    service._working_days = {(YEAR, MONTH): working_days}
+    return service
+
+
+def test_worked_days_prorate_earnings():
+    """Half a month worked pays half, where the fallback paid the full month"""
+    service = make_service()
+    attendance = service._get_attendance_data(1, YEAR, MONTH, (11.0, 0.0))
+
+    assert attendance["total_working_days"] == 22
+    assert attendance["actual_working_days"] == 11.0
+    assert attendance["attendance_percentage"] == 50.0
+
+    earnings = service._calculate_earnings(STRUCTURE, attendance)
+    assert earnings["basic_salary"] == 11000.0  # was 22000.00
+    assert earnings["hra"] == 4400.0  # was 8800.00
+    assert earnings["special_allowance"] == 2200.0  # was 4400.00
+
+
+def test_overtime_hours_are_paid():
+    """Overtime from check-in/out is paid at 1.5x, where the fallback paid none"""
+    service = make_service()
+    attendance = service._get_attendance_data(1, YEAR, MONTH, (22.0, 4.0))
+
+    assert attendance["overtime_hours"] == 4.0
+
+    earnings = service._calculate_earnings(STRUCTURE, attendance)
+    assert earnings["basic_salary"] == 22000.0
+    assert earnings["overtime_amount"] == 750.0  # was 0.00
+
+
+def test_half_days_count_as_half():
+    """Totals carry half days through as 0.5"""
+    service = make_service(working_days=20)
+    attendance = service._get_attendance_data(1, YEAR, MONTH, (19.5, 0.0))
+
+    earnings = service._calculate_earnings(STRUCTURE, attendance)
+    assert earnings["basic_salary"] == 21450.0  # was 22000.00
+
+
+def test_no_worked_days_unchanged():
+    """No present or half-day rows paid nothing before and still does"""
+    service = make_service()
+    attendance = service._get_attendance_data(1, YEAR, MONTH, (0.0, 0.0))
+
+    earnings = service._calculate_earnings(STRUCTURE, attendance)
+    assert earnings["basic_salary"] == 0.0
+    assert earnings["overtime_amount"] == 0.0
+
+
+def test_lookup_failure_falls_back_to_full_month():
+    """An attendance lookup error still pays the 22/22-day default"""
+    service = make_service()
+    service._working_days = {}
+    service.attendance_service = SimpleNamespace(get_working_days_in_month=None)  # not callable
+
+    attendance = service._get_attendance_data(1, YEAR, MONTH, (11.0, 4.0))
+    assert attendance["total_working_days"] == 22
+    assert attendance["actual_working_days"] == 22
+    assert attendance["overtime_hours"] == 0.0
+
+
+def test_batch_matches_single_calculation():
+    """The vectorised batch path pays the same amounts from the same totals"""
+    service = make_service()
+    totals = [(11.0, 0.0), (22.0, 4.0), (19.5, 2.5), (0.0, 0.0)]
+    attendance = [service._get_attendance_data(1, YEAR, MONTH, t) for t in totals]
+
+    batch = service._calculate_amounts_vectorized([STRUCTURE] * len(totals), attendance)
+    for data, (earnings, deductions) in zip(attendance, batch):
+        single = service._calculate_earnings(STRUCTURE, data)
+        assert earnings == single
+        assert deductions == service._calculate_deductions(single, STRUCTURE)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Scalar, NumPy and Numba payroll amounts must agree to the paisa
+
+Covers exact .xx5 rounding ties and the PF, ESI, professional tax and
+income tax slab edges. The Numba cases are skipped when numba is missing.
+"""
+
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import app.payroll_service as payroll_service
+from app.payroll_service import PayrollService
+
+KERNELS = {"numpy": payroll_service._statutory_deductions_numpy}
+if payroll_service.NUMBA_AVAILABLE:
+    KERNELS["numba"] = payroll_service._statutory_deductions
+    KERNELS["numba_python"] = payroll_service._statutory_deductions.py_func
+
+# Monthly gross at every threshold: PT 15000/20000, ESI 25000, and the
+# income tax slabs at taxable 250000 (25000), 500000 (45833.33) and
+# 1000000 (87500), each with a paisa either side
+EDGE_GROSS = [0.0, 4166.66, 4166.67, 14999.99, 15000.0, 15000.01, 19999.99, 20000.0, 20000.01,
+              24999.99, 25000.0, 25000.01, 45833.33, 45833.34, 550000 / 12,
+              87499.99, 87500.0, 87500.01, 900000.0, 1000000.0]
+EDGE_BASIC = [0.0, 14999.99, 15000.0, 15000.01, 100000.0]
+
+# Half-paisa ties, including amounts where float error hides the tie
+TIES = [0.005, 0.015, 0.125, 1.005, 1.115, 2.675, 50.005, 1234.565, 12345.675,
+        900000.005, 900000.015, 999999.995, -1.005, 1e9 + 0.125]
+
+
+def decimal_half_up(value):
+    """Reference rounding: half up on the amount as written"""
+    return float(Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+def make_service():
+    """PayrollService without a database; only the pure calculations are used"""
+    return PayrollService.__new__(PayrollService)
+
+
+def make_structure(rng):
+    """Salary structure with random paisa amounts"""
+    return SimpleNamespace(
+        basic_salary=round(rng.uniform(5000, 200000), 2),
+        hra=round(rng.uniform(0, 50000), 2),
+        transport_allowance=round(rng.uniform(0, 5000), 2),
+        medical_allowance=round(rng.uniform(0, 5000), 2),
+        special_allowance=round(rng.uniform(0, 20000), 2),
+        other_allowances=round(rng.uniform(0, 5000), 2)
+    )
+
+
+def test_round_amount_ties():
+    """Scalar and vector rounding both round exact ties half up"""
+    service = make_service()
+    rounded = payroll_service._round_amounts(np.array(TIES))
+
+    for value, vector in zip(TIES, rounded.tolist()):
+        assert service._round_amount(value) == decimal_half_up(value)
+        assert vector == decimal_half_up(value)
+
+
+@pytest.mark.parametrize("kernel", KERNELS.values(), ids=KERNELS.keys())
+def test_statutory_deductions_at_slab_edges(kernel):
+    """Each kernel matches the scalar deduction methods at every threshold"""
+    service = make_service()
+    basic, gross = np.array([
+        (b, g) for b in EDGE_BASIC for g in EDGE_GROSS
+    ]).T.copy()
+
+    pf, esi, professional_tax, income_tax = kernel(basic, gross)
+    pf = payroll_service._round_amounts(pf)
+    esi = payroll_service._round_amounts(esi)
+    income_tax = payroll_service._round_amounts(income_tax)
+
+    for i, (b, g) in enumerate(zip(basic.tolist(), gross.tolist())):
+        assert pf[i] == service._calculate_pf(b)
+        assert esi[i] == service._calculate_esi(g)
+        assert professional_tax[i] == service._calculate_professional_tax(g)
+        assert income_tax[i] == service._calculate_income_tax(g)
+
+
+@pytest.mark.skipif(not payroll_service.NUMBA_AVAILABLE, reason="numba not installed")
+def test_numba_and_numpy_kernels_bit_identical():
+    """The JIT loop and the NumPy columns give the same unrounded floats"""
+    rng = np.random.default_rng(8)
+    basic = np.concatenate([np.array(EDGE_BASIC * 4), rng.uniform(0, 200000, 5000).round(2)])
+    gross = np.concatenate([np.array(EDGE_GROSS), rng.uniform(0, 300000, 5000).round(2)])
+
+    for numpy_column, numba_column in zip(
+        payroll_service._statutory_deductions_numpy(basic, gross),
+        payroll_service._statutory_deductions(basic, gross)
+    ):
+        assert np.array_equal(numpy_column, numba_column)
+
+
+@pytest.mark.parametrize("kernel", KERNELS.values(), ids=KERNELS.keys())
+def test_vectorized_amounts_match_scalar(monkeypatch, kernel):
+    """_calculate_amounts_vectorized() equals the per-employee calculation"""
+    monkeypatch.setattr(payroll_service, "_statutory_deductions", kernel)
+    service = make_service()
+    rng = random.Random(6)
+
+    # Half a month of 100.01 pro-rates to a 50.005 tie; the rest are random
+    structures = [SimpleNamespace(
+        basic_salary=100.01, hra=2.01, transport_allowance=0.03,
+        medical_allowance=1000.01, special_allowance=24690.13, other_allowances=0.0
+    )]
+    attendance = [{"actual_working_days": 11, "total_working_days": 22, "overtime_hours": 2.5, "leave_days": 0}]
+    for _ in range(2000):
+        structures.append(make_structure(rng))
+        attendance.append({
+            "actual_working_days": rng.randint(0, 46) / 2,
+            "total_working_days": rng.choice([20, 21, 22, 23]),
+            "overtime_hours": rng.choice([0.0, round(rng.uniform(0, 40), 2)]),
+            "leave_days": 0
+        })
+
+    vectorized = service._calculate_amounts_vectorized(structures, attendance)
+    for structure, data, (earnings, deductions) in zip(structures, attendance, vectorized):
+        expected_earnings = service._calculate_earnings(structure, data)
+        assert earnings == expected_earnings
+        assert deductions == service._calculate_deductions(expected_earnings, structure)